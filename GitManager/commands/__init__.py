@@ -1,9 +1,95 @@
 from typing import List
 
+import threading
 import typing
 
-from ..utils import format
-from ..repo import description
+from ..utils import format, executor
+from ..repo import description, implementation
+
+
+class Snapshot(object):
+    """ An immutable snapshot of the repositories subject to a Command,
+    resolved exactly once. Repositories are resolved lazily, so that work
+    on the first ones can start before all others are known. """
+
+    def __init__(self, repos: typing.Iterable[
+                    description.RepositoryDescription],
+                 check: typing.Optional[typing.Callable[
+                     [description.RepositoryDescription], typing.Any]]):
+        """ Creates a new Snapshot object
+
+        :param repos: Candidate repositories
+        :param check: If not None, a function checking if a candidate exists
+        locally. Only candidates for which it returns a truthy value are
+        kept, and the results are retained.
+        """
+
+        self.__source = iter(repos)
+        self.__check = check
+
+        self.__repos = []
+        self.__results = {}
+
+    def __resolve(self) -> bool:
+        """ Resolves the next repository of this snapshot, if any.
+
+        :return: True if a repository was resolved, False if all
+        repositories are known
+        """
+
+        if self.__source is None:
+            return False
+
+        for repo in self.__source:
+            if self.__check is not None:
+                if repo not in self.__results:
+                    self.__results[repo] = self.__check(repo)
+                if not self.__results[repo]:
+                    continue
+
+            self.__repos.append(repo)
+            return True
+
+        self.__source = None
+        return False
+
+    @property
+    def total(self) -> typing.Optional[int]:
+        """ The number of repositories in this snapshot, or None if they have
+        not all been resolved yet """
+
+        if self.__source is not None:
+            return None
+
+        return len(self.__repos)
+
+    def exists(self, repo: description.RepositoryDescription) \
+            -> typing.Optional[bool]:
+        """ Returns the cached result of the existence check of a repository
+        or None if it was not checked """
+
+        if repo not in self.__results:
+            return None
+
+        return bool(self.__results[repo])
+
+    def __len__(self) -> int:
+        while self.__resolve():
+            pass
+
+        return len(self.__repos)
+
+    def __iter__(self) -> typing.Iterator[description.RepositoryDescription]:
+        i = 0
+        while i < len(self.__repos) or self.__resolve():
+            yield self.__repos[i]
+            i += 1
+
+    def __getitem__(self, idx: int) -> description.RepositoryDescription:
+        while idx >= len(self.__repos) and self.__resolve():
+            pass
+
+        return self.__repos[idx]
 
 
 class Command(object):
@@ -13,41 +99,210 @@ class Command(object):
     LOCAL = False
     FILTER = False
 
+    """ Flag indicating if this command talks to remote repositories, and
+    hence accepts limits on the number of jobs per host and can share SSH
+    connections. """
+    NETWORK = False
+
     def __init__(self, line: format.TerminalLine,
-                 repos: List[description.RepositoryDescription],
+                 repos: typing.Iterable[description.RepositoryDescription],
                  *args: str):
         self.__line = line
         self.__repos = repos
+        self.__snapshot = None
+
+        (self.__jobs, args) = self.parse_jobs(*args)
+        if self.__class__.NETWORK:
+            (self.__host_jobs, self.__hosts, args) = \
+                self.parse_host_jobs(*args)
+            (self.__multiplex, args) = self.parse_multiplex(*args)
+        else:
+            (self.__host_jobs, self.__hosts) = (None, {})
+            self.__multiplex = False
         self.__args = self.parse(*args)
 
+        # environment of git calls while running, see environment
+        self.__environment = None
+
         # current state when running this command
         self.__idx = None
         self.__repo = None
+        self.__lock = threading.RLock()
+
+        # the index and repository each thread is running on
+        self.__current = threading.local()
+
+    @staticmethod
+    def parse_jobs(*args: str) -> typing.Tuple[int, List[str]]:
+        """ Extracts the '-j'/'--jobs' option from the arguments given to
+        this Command
+
+        :return: a pair of (number of jobs, remaining arguments)
+        """
+
+        jobs = 1
+        remaining = []
+
+        args_iter = iter(args)
+        for arg in args_iter:
+            if arg == '-j' or arg == '--jobs':
+                value = next(args_iter, None)
+            elif arg.startswith('--jobs='):
+                value = arg[len('--jobs='):]
+            elif arg.startswith('-j') and arg[2:].isdigit():
+                value = arg[2:]
+            else:
+                remaining.append(arg)
+                continue
+
+            try:
+                jobs = int(value)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid number of jobs: {}'.format(value))
+
+            if jobs < 1:
+                raise ValueError('Number of jobs must be at least 1')
+
+        return jobs, remaining
+
+    @staticmethod
+    def parse_host_jobs(*args: str) -> typing.Tuple[
+            typing.Optional[int], typing.Dict[str, int], List[str]]:
+        """ Extracts the '--host-jobs' options from the arguments given to
+        this Command. Each option either is a number of jobs for every host
+        or of the form HOST=N, giving the number of jobs for a single host.
+
+        :return: a triple of (number of jobs for every host or None, numbers
+        of jobs for single hosts, remaining arguments)
+        """
+
+        host_jobs = None
+        hosts = {}
+        remaining = []
+
+        args_iter = iter(args)
+        for arg in args_iter:
+            if arg == '--host-jobs':
+                value = next(args_iter, None)
+            elif arg.startswith('--host-jobs='):
+                value = arg[len('--host-jobs='):]
+            else:
+                remaining.append(arg)
+                continue
+
+            (host, _, jobs) = (value or '').rpartition('=')
+            try:
+                jobs = int(jobs)
+            except ValueError:
+                raise ValueError(
+                    'Invalid number of jobs per host: {}'.format(value))
+
+            if jobs < 1:
+                raise ValueError('Number of jobs per host must be at least 1')
+
+            if host != '':
+                hosts[host.lower()] = jobs
+            else:
+                host_jobs = jobs
+
+        return host_jobs, hosts, remaining
+
+    @staticmethod
+    def parse_multiplex(*args: str) -> typing.Tuple[bool, List[str]]:
+        """ Extracts the '--ssh-multiplex' flag from the arguments given to
+        this Command
+
+        :return: a pair of (flag, remaining arguments)
+        """
+
+        remaining = [arg for arg in args if arg != '--ssh-multiplex']
+        return len(remaining) != len(args), remaining
 
     def parse(self, *args: str) -> typing.Any:
         """ Parses arguments given to this Command """
 
-        # if we support filtering, set the filter
+        # if we support filtering, each argument is a pattern
         if self.__class__.FILTER and len(args) > 0:
-            self.__repos = list(
-                filter(lambda d: d.remote.matches(args[0]), self.__repos))
+
+            # but a misspelled option would silently match nothing
+            for arg in args:
+                if arg.startswith('-'):
+                    raise ValueError('Unknown option: {}'.format(arg))
+
+            self.__repos = implementation.PatternMatcher(*args).filter(
+                self.__repos)
 
     @property
     def args(self) -> typing.Any:
         """ Arguments passed to this instance"""
         return self.__args
 
+    @property
+    def jobs(self) -> int:
+        """ Number of repositories to run this command on at the same time
+        """
+        return self.__jobs
+
+    def host(self, repo: description.RepositoryDescription) -> str:
+        """ Returns the host a repository is cloned from """
+
+        return repo.remote.components()[0].lower()
+
+    def host_jobs(self, host: str) -> typing.Optional[int]:
+        """ Returns the number of repositories from a given host to run this
+        command on at the same time, or None if only the number of jobs
+        limits it """
+
+        return self.__hosts.get(host, self.__host_jobs)
+
+    @property
+    def multiplex(self) -> bool:
+        """ If SSH connections to the same host are shared between git calls
+        while running this command """
+        return self.__multiplex
+
+    @property
+    def environment(self) -> typing.Optional[dict]:
+        """ The environment for git calls that talk to remote repositories
+        while running this command, or None if they should inherit the
+        environment of this process """
+        return self.__environment
+
+    @property
+    def snapshot(self) -> Snapshot:
+        """ A snapshot of the repositories subject to this command. Computed
+        upon first access. """
+
+        # resolve the repositories only once
+        if self.__snapshot is None:
+            check = self.check if self.__class__.LOCAL else None
+            self.__snapshot = Snapshot(self.__repos, check)
+
+        return self.__snapshot
+
     @property
     def repos(self) -> List[description.RepositoryDescription]:
         """ A list of repositories subject to this command. """
 
-        # if we are a local command, we only use local repositories
-        if self.__class__.LOCAL:
-            return list(filter(lambda ds: ds.local.exists(), self.__repos))
+        return list(self.snapshot)
 
-        # else we return all the repositories
-        else:
-            return list(self.__repos)
+    def check(self, repo: description.RepositoryDescription) -> typing.Any:
+        """ Checks if a repository exists locally when creating the snapshot
+        of a LOCAL command. May return any value, with falsy values
+        indicating non-existence. """
+
+        return repo.local.exists()
+
+    def exists(self, repo: description.RepositoryDescription) -> bool:
+        """ Checks if a repository exists locally, re-using the result from
+        the snapshot where possible. """
+
+        if self.__snapshot is not None:
+            exists = self.__snapshot.exists(repo)
+            if exists is not None:
+                return exists
+
+        return repo.local.exists()
 
     @property
     def line(self) -> format.TerminalLine:
@@ -59,38 +314,89 @@ class Command(object):
 
         raise NotImplementedError
 
-    def write(self, message: typing.Any):
-        """ Writes text from this command. """
+    @property
+    def output(self) -> typing.Optional[typing.Callable[[str], None]]:
+        """ Function to pass the output of git calls to, or None if they
+        should write to the terminal directly. Output is only collected when
+        running on several repositories at the same time, so that the output
+        for different repositories does not interleave. """
+
+        if self.jobs > 1:
+            return self.write_block
+
+        return None
+
+    def linebreak(self):
+        """ Breaks the line before git calls write to the terminal directly
+        """
+
+        if self.output is None:
+            with self.__lock:
+                self.line.linebreak()
+
+    def __start_block(self):
+        """ Prepares the line for writing text from this command. When
+        running in parallel, the current line may belong to a different
+        repository, so it is replaced by the one the text belongs to. """
+
+        if self.__class__.PLAIN:
+            return
+
+        idx = getattr(self.__current, 'idx', None)
+        if self.jobs > 1 and idx is not None:
+            self.line.clean()
+            self.line.write('{}{}'.format(self.__counter(idx),
+                                          self.__current.repo.local.path))
+
         self.line.linebreak()
-        print(message)
 
-    def write_with_counter(self, message: str):
-        """ Writes a message together with a counter into the line """
+    def write(self, message: typing.Any):
+        """ Writes text from this command, on a new line unless this is a
+        plain command """
+
+        with self.__lock:
+            self.__start_block()
+            print(message)
+
+    def write_block(self, text: str):
+        """ Writes the output of a git call at once """
+
+        with self.__lock:
+            self.__start_block()
+            print(text, end='' if text.endswith('\n') else '\n', flush=True)
+
+    def __counter(self, idx: typing.Optional[int] = None) -> str:
+        """ Returns the counter to prefix messages with. As long as the
+        number of repositories is not known, it is shown as '?'.
+
+        :param idx: Index of the repository, defaults to the one started
+        last
+        """
+
+        if idx is None:
+            idx = self.__idx
 
         # repo count and number of zeros for it
-        repo_count = len(self.repos)
+        repo_count = self.snapshot.total
+        if repo_count is None:
+            repo_count = '?'
         zcount = len(str(repo_count))
 
-        # the prefix - a counter
-        prefix = "[{}/{}] ".format(
-            str(self.__idx + 1).zfill(zcount),
+        return "[{}/{}] ".format(
+            str(idx + 1).zfill(zcount),
             repo_count,
         )
 
-        self.line.write("{}{}".format(prefix, message))
+    def write_with_counter(self, message: str):
+        """ Writes a message together with a counter into the line """
+
+        self.line.write("{}{}".format(self.__counter(), message))
 
     def write_path_with_counter(self, path: str):
         """ Writes a path with a counter"""
 
-        # repo count and number of zeros for it
-        repo_count = len(self.repos)
-        zcount = len(str(repo_count))
-
         # the prefix - a counter
-        prefix = "[{}/{}] ".format(
-            str(self.__idx + 1).zfill(zcount),
-            repo_count,
-        )
+        prefix = self.__counter()
 
         # and write the message to the output
         message = format.Format.short_path(path, self.line.width - len(prefix))
@@ -98,15 +404,50 @@ class Command(object):
 
     def __call__(self, *args: str) -> int:
         """ Runs this command on a set of repositories """
-        counter = 0
-        for (i, repo) in enumerate(self.repos):
-            self.__idx = i
-            self.__repo = repo
 
-            if not self.__class__.PLAIN:
-                self.write_path_with_counter(repo.local.path)
+        if not self.multiplex:
+            return self.__run()
+
+        # imported here, as it is only needed when sharing connections
+        from ..utils import ssh
+
+        with ssh.Multiplexer() as multiplexer:
+            self.__environment = multiplexer.environment()
+            try:
+                return self.__run()
+            finally:
+                self.__environment = None
+
+    def __run(self) -> int:
+        """ Runs this command on all repositories of the snapshot """
 
-            if self.run(repo):
+        def task(i: int, repo: description.RepositoryDescription) -> bool:
+            # progress output is shared between all running tasks
+            with self.__lock:
+                self.__idx = i
+                self.__repo = repo
+
+                if not self.__class__.PLAIN:
+                    self.write_path_with_counter(repo.local.path)
+
+            self.__current.idx = i
+            self.__current.repo = repo
+            try:
+                return self.run(repo)
+            finally:
+                self.__current.idx = None
+
+        # only group by host when there is a limit for some host, as
+        # interleaving the hosts is pointless otherwise
+        if self.__host_jobs is not None or len(self.__hosts) > 0:
+            runner = executor.Executor.create(self.jobs, self.host,
+                                              self.host_jobs)
+        else:
+            runner = executor.Executor.create(self.jobs)
+
+        counter = 0
+        for result in runner.map(task, self.snapshot):
+            if result:
                 counter += 1
 
         self.line.clean()
@@ -27,6 +27,13 @@ class Clone(object):
             -> description.RepositoryDescription:
         """ Turns a URL into a repository description """
 
+        # clone into the folder of the repository if it is already
+        # configured, even using a different url, but keep the given url
+        existing = self.config.find_remote(url)
+        if existing is not None:
+            return description.RepositoryDescription(url,
+                                                     existing.local.path)
+
         remote = implementation.RemoteRepository(url)
         local = implementation.LocalRepository(
             os.path.join(self.config.root, *remote.components()))
@@ -41,9 +48,12 @@ class Clone(object):
             self.line.write('Repository already exists, nothing to clone. ')
             return
 
-        # if requested, save it
+        # if requested, save it unless it is already configured
         if self.args.save:
-            self.config.insert_repo_or_get(desc)
-            self.config.write()
+            if self.config.find_remote(desc.remote.url) is not None:
+                self.line.write('Repository already configured, not saving. ')
+            else:
+                self.config.insert_repo_or_get(desc)
+                self.config.write()
 
         desc.remote.clone(desc.local, *self.args.arguments)
@@ -9,9 +9,23 @@ class Fetch(Command):
 
     LOCAL = True
     FILTER = True
+    NETWORK = True
+
+    def parse(self, *args: str) -> typing.Any:
+        """ Parses arguments given to this Command """
+
+        self.__if_changed = '--if-changed' in args
+        super(Fetch, self).parse(*[a for a in args if a != '--if-changed'])
+
+    @property
+    def if_changed(self) -> bool:
+        """ If repositories are only fetched when a remote changed """
+        return self.__if_changed
 
     def run(self, repo: description.RepositoryDescription) -> bool:
-        if not repo.local.exists():
+        if not self.exists(repo):
             return False
 
-        return repo.local.fetch()
+        return repo.local.fetch(environment=self.environment,
+                                if_changed=self.if_changed,
+                                output=self.output)
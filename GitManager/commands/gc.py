@@ -20,8 +20,8 @@ class GC(Command):
             self.__args = args
 
     def run(self, repo: description.RepositoryDescription) -> bool:
-        if not repo.local.exists():
+        if not self.exists(repo):
             return False
 
-        self.line.linebreak()
-        return repo.local.gc(*self.__args)
+        self.linebreak()
+        return repo.local.gc(*self.__args, output=self.output)
@@ -12,7 +12,7 @@ class LsLocal(Command):
     FILTER = True
 
     def run(self, repo: description.RepositoryDescription) -> bool:
-        if repo.local.exists():
-            print(repo.local.path)
+        if self.exists(repo):
+            self.write(repo.local.path)
 
         return True
@@ -9,10 +9,12 @@ class Pull(Command):
 
     LOCAL = True
     FILTER = True
+    NETWORK = True
 
     def run(self, repo: description.RepositoryDescription) -> bool:
-        if not repo.local.exists():
+        if not self.exists(repo):
             return False
 
-        self.line.linebreak()
-        return repo.local.pull()
+        self.linebreak()
+        return repo.local.pull(environment=self.environment,
+                               output=self.output)
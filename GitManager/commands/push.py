@@ -9,10 +9,12 @@ class Push(Command):
 
     LOCAL = True
     FILTER = True
+    NETWORK = True
 
     def run(self, repo: description.RepositoryDescription) -> bool:
-        if not repo.local.exists():
+        if not self.exists(repo):
             return False
 
-        self.line.linebreak()
-        return repo.local.push()
+        self.linebreak()
+        return repo.local.push(environment=self.environment,
+                               output=self.output)
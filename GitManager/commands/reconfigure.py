@@ -2,10 +2,12 @@ import typing
 import argparse
 
 from ..config import file
+from ..config.line import IgnoreLine
 from ..repo import finder
 from ..repo.implementation import LocalRepository
 from ..utils import format
 
+import hashlib
 import os
 import sys
 
@@ -48,9 +50,9 @@ class Reconfigure(object):
         parser.add_argument('--follow-symlinks', '-f', dest='follow_symlinks',
                             action='store_true', default=False,
                             help='When looking for repositories to add, '
-                                 'automatically follow symlinks. Use with '
-                                 'caution, as there are no checks for '
-                                 'circularity. ')
+                                 'automatically follow symlinks. Directories '
+                                 'reachable via several links are only '
+                                 'searched once. ')
         parser.add_argument('--allow-subrepositories', '-a',
                             dest='allow_subrepositories',
                             action='store_true', default=False,
@@ -58,11 +60,49 @@ class Reconfigure(object):
                                  'keep searching within folders of existing '
                                  'repositories. ')
 
+        parser.add_argument('--ignore', '-i', dest='ignore',
+                            action='append', default=[], metavar='PATTERN',
+                            help='When looking for repositories to add, do '
+                                 'not search directories matching PATTERN. '
+                                 'In addition to the patterns given by '
+                                 '"#ignore:" lines in the configuration '
+                                 'file. ')
+        parser.add_argument('--max-depth', dest='max_depth', type=int,
+                            default=None,
+                            help='When looking for repositories to add, '
+                                 'only search this many levels of '
+                                 'sub-directories. ')
+        parser.add_argument('--one-file-system', '-x',
+                            dest='one_file_system',
+                            action='store_true', default=False,
+                            help='When looking for repositories to add, do '
+                                 'not search directories on other file '
+                                 'systems. ')
+
+        parser.add_argument('--rescan', dest='rescan',
+                            action='store_true', default=False,
+                            help='When looking for repositories to add, '
+                                 'search all directories again instead of '
+                                 'only those that changed since the last '
+                                 'search. ')
+
+        parser.add_argument('--jobs', '-j', dest='jobs', type=int,
+                            default=1,
+                            help='Number of directories to scan at the same '
+                                 'time when looking for repositories. Useful '
+                                 'on network filesystems. ')
+
         parser.add_argument('path', nargs='?', default=None,
                             help='Rebuild and clean up the configuration '
                                  'file, removing empty groups. ')
 
-        return parser.parse_args(args)
+        args = parser.parse_args(args)
+        if args.jobs < 1:
+            parser.error('argument --jobs/-j: must be at least 1')
+        if args.max_depth is not None and args.max_depth < 0:
+            parser.error('argument --max-depth: must not be negative')
+
+        return args
 
     def __call__(self):
 
@@ -84,21 +124,48 @@ class Reconfigure(object):
                         self.line.write('Not Found: {}'.format(path))
                     self.line.linebreak()
 
-        # clear the existing list if asked
+        # clear the existing list if asked, keeping the ignored patterns
         if self.args.clear:
-            self.file.lines = []
+            self.file.lines = [l for l in self.file.lines
+                               if isinstance(l, IgnoreLine)]
 
         if self.args.path is not None:
+            duplicates = []
+
+            # number of directories and repositories found so far
+            counts = [0, 0]
+            progress = format.ProgressLine(
+                self.line, 'Scanned {} directories, found {} repositories: ')
+
+            def scanned(pth: str):
+                counts[0] += 1
+                progress.update(pth, *counts)
+
+            # remember previous scans, to only search changed directories.
+            # Each directory scanned from has its own cache, so that
+            # scans of different directories do not rewrite each other.
+            cache = finder.ScanCache(os.path.join(
+                file.File.cache_directory(), 'scan-{}'.format(
+                    hashlib.sha1(os.path.realpath(self.args.path)
+                                 .encode('utf-8')).hexdigest())))
+            if not self.args.rescan:
+                cache.read()
+
             # find repositories in the given path add them
             for desc in finder.Finder.find_recursive(
                     self.args.path,
                     allow_links=self.args.follow_symlinks,
                     continue_in_repository=self.args.allow_subrepositories,
-                    callback=lambda s: self.line.write(
-                        format.Format.short_path(s, self.line.width))
+                    jobs=self.args.jobs,
+                    callback=scanned,
+                    duplicate_callback=duplicates.append,
+                    prune=finder.Prune(
+                        self.file.ignores + self.args.ignore,
+                        max_depth=self.args.max_depth,
+                        one_file_system=self.args.one_file_system),
+                    cache=cache
             ):
-                if not self.args.simulate:
-                    self.line.linebreak()
+                counts[1] += 1
 
                 # print if we found a new repository
                 if not self.file.contains(desc):
@@ -109,6 +176,22 @@ class Reconfigure(object):
 
                 self.file.insert_repo_or_get(desc)
 
+            # a simulated run does not change anything on disk
+            if not self.args.simulate:
+                cache.write(self.args.path)
+            progress.finish()
+
+            if not self.args.simulate:
+                self.line.write('Scanned {} directories, found {} '
+                                'repositories. '.format(*counts))
+                self.line.linebreak()
+
+                if duplicates:
+                    self.line.write('Skipped {} duplicate director{}'.format(
+                        len(duplicates),
+                        'y' if len(duplicates) == 1 else 'ies'))
+                    self.line.linebreak()
+
         # if the rebuild flag is set, rebuild all the repos
         if self.args.rebuild:
             self.file.rebuild()
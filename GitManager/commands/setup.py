@@ -7,11 +7,13 @@ from . import Command
 class Setup(Command):
 
     FILTER = True
+    NETWORK = True
 
     def run(self, repo: description.RepositoryDescription) -> bool:
         """ Sets up all repositories locally """
-        if repo.local.exists():
+        if self.exists(repo):
             return True
 
-        self.line.linebreak()
-        return repo.remote.clone(repo.local)
+        self.linebreak()
+        return repo.remote.clone(repo.local, environment=self.environment,
+                                 output=self.output)
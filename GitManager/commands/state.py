@@ -15,7 +15,12 @@ class State(Command):
     def parse(self, *args: str) -> typing.Any:
         """ Parses arguments given to this Command """
         parser = argparse.ArgumentParser(prog='git-manager state')
-        parser.add_argument('pattern', nargs='?')
+        parser.add_argument('pattern', nargs='*')
+
+        # only listed for the help, extracted by parse_jobs() beforehand
+        parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1,
+                            help='Check up to N repositories at the same '
+                                 'time. ')
 
         group = parser.add_mutually_exclusive_group()
         group.add_argument('--update', dest='update',
@@ -31,29 +36,34 @@ class State(Command):
 
         targs = parser.parse_args(args)
         if targs.pattern:
-            super(State, self).parse(targs.pattern)
+            super(State, self).parse(*targs.pattern)
 
         return targs
 
     def run(self, repo: description.RepositoryDescription) -> bool:
 
-        if not repo.local.exists():
-            return False
+        if self.args.update:
+            if not self.exists(repo):
+                return False
+
+            status = repo.local.remote_status(True)
+        else:
+            probe = repo.local.probe()
+            if probe is None:
+                return False
 
-        status = repo.local.remote_status(self.args.update)
+            status = probe.remote_status
 
         if status == implementation.RemoteStatus.REMOTE_NEWER:
-            self.line.linebreak()
-            print(format.Format.yellow('Upstream is ahead of your branch, '
-                                       'pull required. '))
+            self.write(format.Format.yellow('Upstream is ahead of your '
+                                            'branch, pull required. '))
 
         elif status == implementation.RemoteStatus.LOCAL_NEWER:
-            self.line.linebreak()
-            print(format.Format.green('Your branch is ahead of upstream, '
-                                      'push required.'))
+            self.write(format.Format.green('Your branch is ahead of '
+                                           'upstream, push required.'))
         elif status == implementation.RemoteStatus.DIVERGENCE:
-            self.line.linebreak()
-            print(format.Format.red('Your branch and upstream have diverged, '
-                                    'merge or rebase required. '))
+            self.write(format.Format.red('Your branch and upstream have '
+                                         'diverged, merge or rebase '
+                                         'required. '))
 
         return status == implementation.RemoteStatus.UP_TO_DATE
@@ -12,13 +12,14 @@ class Status(Command):
 
     def run(self, repo: description.RepositoryDescription) -> bool:
 
-        if not repo.local.exists():
+        # probed here rather than in check(), so that probes run in parallel
+        probe = repo.local.probe()
+        if probe is None:
             return False
 
-        status = repo.local.local_status()
+        if probe.dirty:
+            self.linebreak()
+            run.GitRun("status", cwd=repo.local.path,
+                       pipe_stdout=self.output is None).finish(self.output)
 
-        if status is not None and status != '':
-            self.line.linebreak()
-            run.GitRun("status", cwd=repo.local.path, pipe_stdout=True).wait()
-
-        return status == ''
+        return not probe.dirty
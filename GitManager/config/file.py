@@ -1,12 +1,23 @@
 import typing
 import os.path
+import hashlib
+import marshal
+import time
 
 from . import line, tree
+from ..repo import description
 
 
 class File(tree.Tree):
     """ Methods for parsing and reading configuration file. """
 
+    # version of the cache format, to be increased whenever it changes
+    CACHE_VERSION = 2
+
+    # files modified less than this many seconds before they are read are
+    # not cached, as further changes might not update their mtime
+    RACY_SECONDS = 2
+
     def __init__(self, fn: str):
         """ Creates a new File object"""
 
@@ -15,11 +26,22 @@ class File(tree.Tree):
         self.__fn = fn
 
     def read(self):
-        """ Re-reads the lines currently contained in this file """
+        """ Re-reads the lines currently contained in this file. If the file
+        has not changed since it was last read, the lines are only parsed when
+        they are needed. """
+
+        key = self.__cache_key()
+        if key is not None and self.__read_cache(key):
+            return
 
         with open(self.__fn, "r") as fp:
-            self.lines = [line.ConfigLine.parse(l.rstrip('\n')) for l in
-                          fp.readlines()]
+            contents = [l.rstrip('\n') for l in fp.readlines()]
+
+        self.lines = [line.ConfigLine.parse(l) for l in contents]
+
+        racy = int((time.time() - File.RACY_SECONDS) * 10 ** 9)
+        if key is not None and key[2] < racy:
+            self.__write_cache(key, contents)
 
     def write(self):
 
@@ -29,6 +51,93 @@ class File(tree.Tree):
             for l in self.lines:
                 fp.write("{}\n".format(l.write()))
 
+    def __cache_key(self) -> typing.Optional[tuple]:
+        """ Returns a key identifying the current version of this file, or
+        None if it can not be found """
+
+        try:
+            stat = os.stat(self.__fn)
+        except OSError:
+            return None
+
+        return (File.CACHE_VERSION, os.path.abspath(self.__fn),
+                stat.st_mtime_ns, stat.st_size, stat.st_ino,
+                os.path.expanduser('~'))
+
+    def __cache_path(self) -> str:
+        """ Returns the path to the cache of this file """
+
+        name = hashlib.sha1(
+            os.path.abspath(self.__fn).encode('utf-8')).hexdigest()
+        return os.path.join(File.cache_directory(), name)
+
+    def __read_cache(self, key: tuple) -> bool:
+        """ Reads this file from the cache
+
+        :param key: Key of the current version of this file
+        :return: a boolean indicating if the cache could be used
+        """
+
+        try:
+            with open(self.__cache_path(), "rb") as fp:
+                (cache_key, contents, root, repos) = marshal.loads(fp.read())
+
+            if tuple(cache_key) != key:
+                return False
+
+            repositories = [description.RepositoryDescription(source, path)
+                            for (source, path) in repos]
+
+        # a missing or corrupted cache can not be used
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+
+        self.defer(lambda: [line.ConfigLine.parse(l) for l in contents],
+                   root, repositories)
+        return True
+
+    def __write_cache(self, key: tuple, contents: typing.List[str]):
+        """ Writes this file into the cache
+
+        :param key: Key of the version of this file that was read
+        :param contents: Unparsed lines of the file
+        """
+
+        data = marshal.dumps((key, contents, self.root,
+                              [tuple(r) for r in self.repositories]))
+
+        # only imported when needed, as it is slow to import
+        import tempfile
+
+        # write to a temporary file first, so that the cache is never
+        # partially written
+        try:
+            directory = File.cache_directory()
+            os.makedirs(directory, exist_ok=True)
+
+            (fd, tmp) = tempfile.mkstemp(dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as fp:
+                    fp.write(data)
+                os.replace(tmp, self.__cache_path())
+            except OSError:
+                os.remove(tmp)
+                raise
+        except OSError:
+            pass
+
+    @staticmethod
+    def cache_directory() -> str:
+        """ finds the directory to cache configuration files in """
+
+        # $XDG_CACHE_HOME/gitmanager or ~/.cache/gitmanager
+        if "XDG_CACHE_HOME" in os.environ:
+            xdg_cache_home = os.environ["XDG_CACHE_HOME"]
+        else:
+            xdg_cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+
+        return os.path.join(xdg_cache_home, "gitmanager")
+
     @staticmethod
     def find() -> typing.Optional[str]:
         """finds the location of the configuration file"""
@@ -1,15 +1,27 @@
 import re
 import typing
 
+from sys import intern
+
 
 class ConfigLine(object):
     """ A single line in the configuration file """
 
-    DIRECTIVE_ROOT = re.compile(r'^(\s*)##(\s*)([^\s]+)(\s*)$')
-    DIRECTIVE_NOP = re.compile(r'^((\s*)#(.*))|(\s*)$')
-    DIRECTIVE_BASE = re.compile(
-        r'(\s*)(>+)(\s+)([^\s]+)(\s*)$')
-    DIRECTIVE_REPO = re.compile(r'^(\s*)([^>\s]+)(?:(\s+)([^\s]+))?(\s*)$')
+    # a single expression for all kinds of lines. After the indent, the
+    # first character decides which of the alternatives can match, and the
+    # name of the alternative is the last group of the match.
+    DIRECTIVE = re.compile(r'''^(?P<indent>\s*)(?:
+        (?P<root>\#\#(?P<root_1>\s*)(?P<root_path>[^\s]+)(?P<root_2>\s*)$) |
+        (?P<ignore>\#ignore:(?P<ignore_1>\s*)(?P<ignore_pattern>[^\s]+)
+            (?P<ignore_2>\s*)$) |
+        (?P<nop>\#|$) |
+        (?P<base>(?P<base_depth>>+)(?P<base_1>\s+)(?P<base_path>[^\s]+)
+            (?P<base_2>\s*)$) |
+        (?P<repo>(?P<repo_url>[^>\s]+)
+            (?:(?P<repo_1>\s+)(?P<repo_path>[^\s]+))?(?P<repo_2>\s*)$)
+    )''', re.VERBOSE)
+
+    __slots__ = ('__indent',)
 
     def __init__(self, indent: str):
         """ Creates a new ConfigLine object
@@ -34,34 +46,41 @@ class ConfigLine(object):
         """ Parses a string into a ConfigLine
         :rtype: ConfigLine"""
 
-        root_match = ConfigLine.DIRECTIVE_ROOT.match(s)
-        if root_match:
-            return RootLine(root_match.group(1), root_match.group(2),
-                            root_match.group(3), root_match.group(4))
+        match = ConfigLine.DIRECTIVE.match(s)
+        if match is None:
+            raise ValueError("Input does not represent a ConfigLine")
 
-        nop_match = ConfigLine.DIRECTIVE_NOP.match(s)
-        if nop_match:
-            return NOPLine(s)
+        kind = match.lastgroup
+
+        # the same whitespace occurs on almost every line, so we intern it
+        if kind == 'repo':
+            (indent, url, space_1, path, space_2) = match.group(
+                'indent', 'repo_url', 'repo_1', 'repo_path', 'repo_2')
+            return RepoLine(intern(indent), url, intern(space_1 or ''),
+                            path or '', intern(space_2))
 
-        base_match = ConfigLine.DIRECTIVE_BASE.match(s)
-        if base_match:
-            return BaseLine(base_match.group(1), len(base_match.group(2)),
-                            base_match.group(3), base_match.group(4),
-                            base_match.group(5) or '')
+        if kind == 'base':
+            (indent, depth, space_1, path, space_2) = match.group(
+                'indent', 'base_depth', 'base_1', 'base_path', 'base_2')
+            return BaseLine(intern(indent), len(depth), intern(space_1), path,
+                            intern(space_2))
+
+        if kind == 'nop':
+            return NOPLine(s)
 
-        repo_match = ConfigLine.DIRECTIVE_REPO.match(s)
-        if repo_match:
-            return RepoLine(repo_match.group(1), repo_match.group(2),
-                            repo_match.group(3) or '',
-                            repo_match.group(4) or '',
-                            repo_match.group(5))
+        if kind == 'ignore':
+            return IgnoreLine(*match.group('indent', 'ignore_1',
+                                           'ignore_pattern', 'ignore_2'))
 
-        raise ValueError("Input does not represent a ConfigLine")
+        return RootLine(*match.group('indent', 'root_1', 'root_path',
+                                     'root_2'))
 
 
 class NOPLine(ConfigLine):
     """ A line without meaning inside the Configuration File """
 
+    __slots__ = ('__line',)
+
     def __init__(self, line: str):
         """ Creates a new NopLine instance """
         super().__init__('')
@@ -87,6 +106,8 @@ class NOPLine(ConfigLine):
 class RootLine(ConfigLine):
     """ A line defining the root of all repositories """
 
+    __slots__ = ('__space_1', '__root', '__space_2')
+
     def __init__(self, indent: str, space_1: str, root: str, space_2: str):
         super().__init__(indent)
         self.__space_1 = space_1
@@ -117,9 +138,48 @@ class RootLine(ConfigLine):
         return False
 
 
+class IgnoreLine(ConfigLine):
+    """ A line defining a pattern of directories not to search for
+    repositories """
+
+    __slots__ = ('__space_1', '__pattern', '__space_2')
+
+    def __init__(self, indent: str, space_1: str, pattern: str,
+                 space_2: str):
+        super().__init__(indent)
+        self.__space_1 = space_1
+        self.__pattern = pattern
+        self.__space_2 = space_2
+
+    @property
+    def pattern(self) -> str:
+        """ The pattern of directories to ignore """
+
+        return self.__pattern
+
+    def write(self) -> str:
+        """ Turns this ConfigLine into a string that can be re-parsed """
+
+        return "{}#ignore:{}{}{}".format(
+            self.indent, self.__space_1, self.pattern, self.__space_2)
+
+    def __eq__(self, other: typing.Any) -> bool:
+        """ Checks that this line is equal to another line """
+
+        if isinstance(other, IgnoreLine):
+            return self.indent == other.indent and \
+                   self.pattern == other.pattern and \
+                   self.__space_1 == other.__space_1 and \
+                   self.__space_2 == other.__space_2
+
+        return False
+
+
 class BaseLine(ConfigLine):
     """ A line introducing a new BaseLine """
 
+    __slots__ = ('__depth', '__space_1', '__path', '__space_2')
+
     def __init__(self, indent: str, depth: int, space_1: str, path: str,
                  space_2: str):
         """ Creates a new BaseLine instance """
@@ -164,6 +224,8 @@ class BaseLine(ConfigLine):
 class RepoLine(ConfigLine):
     """ a line representing a single repository """
 
+    __slots__ = ('__url', '__space_1', '__path', '__space_2')
+
     def __init__(self, indent: str, url: str, space_1: str, path: str,
                  space_2: str):
         """ Creates a new RepoLine instance """
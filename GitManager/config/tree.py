@@ -6,6 +6,90 @@ from ..repo import description as desc
 from ..repo import implementation as impl
 
 
+class Group(object):
+    """ A group of lines inside a Tree, consisting of a base line (except for
+    the top-level group), the lines following it up to the next base line,
+    and the groups nested in it.
+
+    The numbers of lines of the nested groups are kept in a Fenwick tree, so
+    that the index of a line can be found, and updated, without counting all
+    the lines before it. """
+
+    __slots__ = ('parent', 'line', 'stack', 'lines', 'children', 'number',
+                 'indent', 'size', '__sizes')
+
+    def __init__(self, parent: typing.Optional['Group'],
+                 l: typing.Optional[line.BaseLine],
+                 stack: typing.Tuple[str, ...]):
+        """ Creates a new Group object
+
+        :param parent: Group this group is nested in, None for the top-level
+        :param l: The base line of this group, None for the top-level
+        :param stack: Stack of base paths inside this group
+        """
+
+        self.parent = parent
+        self.line = l
+        self.stack = stack
+
+        # the lines following the base line, the nested groups, and the
+        # position of this group inside its parent
+        self.lines = []  # type: typing.List[line.ConfigLine]
+        self.children = []  # type: typing.List[Group]
+        self.number = None  # type: typing.Optional[int]
+
+        # indent of the last repository line, if any
+        self.indent = None  # type: typing.Optional[str]
+
+        # total number of lines in this group, including nested groups
+        self.size = 0 if l is None else 1
+
+        # Fenwick tree of the sizes of the nested groups
+        self.__sizes = [0]
+
+    @property
+    def depth(self) -> int:
+        """ The depth of this group, 0 for the top-level """
+        return len(self.stack) - 1
+
+    def first(self) -> int:
+        """ The number of lines before the first line following the base
+        line, relative to the start of this group """
+
+        return 0 if self.line is None else 1
+
+    def append(self, child: 'Group'):
+        """ Appends a nested group, with its current size """
+
+        self.children.append(child)
+        i = len(self.children)
+        child.number = i - 1
+
+        self.__sizes.append(child.size + self.before(i - 1) -
+                            self.before(i - (i & -i)))
+
+    def resize(self, number: int, n: int):
+        """ Changes the size of a nested group
+
+        :param number: Position of the nested group
+        :param n: Number of lines added, negative if removed
+        """
+
+        i = number + 1
+        while i < len(self.__sizes):
+            self.__sizes[i] += n
+            i += i & -i
+
+    def before(self, number: int) -> int:
+        """ The number of lines in the nested groups before a given one """
+
+        total = 0
+        while number > 0:
+            total += self.__sizes[number]
+            number -= number & -number
+        return total
+
+
 class Tree(object):
     """ Represents a Tree of Repositories """
 
@@ -16,71 +100,258 @@ class Tree(object):
         self.__base_directory = os.path.expanduser('~').rstrip("/")
         self.__root = self.__base_directory
 
+        # the lines split into groups, and a cache mapping descriptions to
+        # the first line they are found in, given as a pair of the group and
+        # the position in the lines of the group, or -1 for the base line.
+        # Created upon first use and updated incrementally afterwards, with
+        # the lines being re-created from the groups when needed.
+        self.__top = None  # type: typing.Optional[Group]
+        self.__index = None
+        self.__stale = False
+
+        # the repositories described by the lines, and a function to load
+        # the lines with, if they have not been loaded yet. See defer().
+        self.__repositories = None
+        self.__load = None
+
+        # cache mapping remote keys to the first repository using them
+        self.__remotes = None
+
     @property
     def lines(self) -> typing.List[line.ConfigLine]:
         """ the lines currently contained in this File """
+
+        if self.__load is not None:
+            (load, self.__load) = (self.__load, None)
+            self.__lines = load()
+
+        if self.__stale:
+            self.__lines[:] = [l for (_, _, l) in self.__walk(self.__top)]
+            self.__stale = False
+
         return self.__lines
 
+    def defer(self, load: typing.Callable[[], typing.List[line.ConfigLine]],
+              root: str,
+              repositories: typing.List[desc.RepositoryDescription]):
+        """ Sets the lines contained in this file without loading them.
+
+        :param load: Function that returns the lines once they are needed
+        :param root: The root set by the lines
+        :param repositories: The repositories described by the lines
+        """
+
+        self.__lines = []
+        self.__load = load
+        self.__root = root
+        self.__repositories = list(repositories)
+        self.__remotes = None
+
+        self.__top = None
+        self.__index = None
+        self.__stale = False
+
+    def __step(self, i: int, l: line.ConfigLine,
+               path_stack: typing.Tuple[str, ...]) -> \
+            typing.Tuple[typing.Tuple[str, ...],
+                         typing.Optional[desc.Description]]:
+        """ Processes a single line
+
+        :param i: Index of the line
+        :param l: Line to process
+        :param path_stack: Stack of base paths before the line
+        :return: a pair of the stack of base paths after the line and the
+        description of the line, if any
+        """
+
+        if isinstance(l, line.BaseLine):
+
+            # extract the current and new order of the lines
+            current_order = len(path_stack)
+            new_order = l.depth
+
+            # we can not have a new order lower than 1 depth of the
+            # current level
+            if new_order > current_order:
+                raise Exception(
+                    'Error in line {}: Missing base sublevel. '.format(
+                        i + 1))
+
+            # Read the sub-directory to be added and the old one
+            sub_dir = os.path.expanduser(l.path)
+            previous_item = path_stack[new_order - 1]
+
+            # add the new sub-directory
+            new_sub_dir = os.path.join(previous_item, sub_dir)
+            path_stack = path_stack[:new_order] + (new_sub_dir,)
+
+            return path_stack, desc.BaseDescription(new_sub_dir)
+
+        if isinstance(l, line.RepoLine):
+            # Extract the base directory and the source url
+            stack_loc = path_stack[-1]
+            source_uri = l.url
+
+            # And the path to clone to
+            folder = os.path.expanduser(l.path) or None
+            path = os.path.join(stack_loc, folder) \
+                if folder is not None else None
+
+            name = path if path is not None else \
+                impl.RemoteRepository(source_uri).humanish_part()
+
+            # and return the actual repository
+            return path_stack, desc.RepositoryDescription(
+                source_uri, os.path.join(stack_loc, name))
+
+        return path_stack, None
+
     @property
     def descriptions(self) -> \
             typing.Generator[typing.Tuple[int, desc.Description], None, None]:
         """ an iterator for pairs of (line, description) """
 
         # A stack for repo folders
-        path_stack = [self.__base_directory]
+        path_stack = (self.__base_directory,)
+
+        for (i, l) in enumerate(self.lines):
+            (path_stack, d) = self.__step(i, l, path_stack)
+            if d is not None:
+                yield i, d
+
+    def __build(self):
+        """ Creates the groups and the cache of descriptions, unless they
+        already exist """
+
+        if self.__top is not None:
+            return
+
+        top = Group(None, None, (self.__base_directory,))
+        groups = [top]
+        index = {}
 
+        current = top
         for (i, l) in enumerate(self.lines):
+            (path_stack, d) = self.__step(i, l, current.stack)
 
             if isinstance(l, line.BaseLine):
+                parent = current
+                while parent.depth >= l.depth:
+                    parent = parent.parent
+
+                current = Group(parent, l, path_stack)
+                groups.append(current)
+                loc = (current, -1)
+            else:
+                loc = (current, len(current.lines))
+                current.lines.append(l)
+                if isinstance(l, line.RepoLine):
+                    current.indent = l.indent
+
+            if d is not None and d not in index:
+                index[d] = loc
+
+        # count the lines of each group, nested groups first
+        for g in groups:
+            g.size += len(g.lines)
+        for g in reversed(groups[1:]):
+            g.parent.size += g.size
+        for g in groups[1:]:
+            g.parent.append(g)
+
+        self.__top = top
+        self.__index = index
+
+    def __walk(self, g: Group) -> typing.Generator[
+            typing.Tuple[Group, int, line.ConfigLine], None, None]:
+        """ Iterates over the lines of a group and its nested groups, as
+        triples of (group, position, line) """
+
+        if g.line is not None:
+            yield g, -1, g.line
+
+        for (k, l) in enumerate(g.lines):
+            yield g, k, l
+
+        for c in g.children:
+            yield from self.__walk(c)
+
+    def __following(self, g: Group, k: int) -> typing.Generator[
+            typing.Tuple[Group, int, line.ConfigLine], None, None]:
+        """ Iterates over all lines starting at a position in a group, see
+        __walk() """
+
+        for k in range(k, len(g.lines)):
+            yield g, k, g.lines[k]
 
-                # extract the current and new order of the lines
-                current_order = len(path_stack)
-                new_order = l.depth
+        for c in g.children:
+            yield from self.__walk(c)
 
-                # we can not have a new order lower than 1 depth of the
-                # current level
-                if new_order > current_order:
-                    raise Exception(
-                        'Error in line {}: Missing base sublevel. '.format(
-                            i + 1))
+        while g.parent is not None:
+            for c in g.parent.children[g.number + 1:]:
+                yield from self.__walk(c)
+            g = g.parent
 
-                # Read the sub-directory to be added and the old one
-                sub_dir = os.path.expanduser(l.path)
-                previous_item = path_stack[new_order - 1]
+    @staticmethod
+    def __position(loc: typing.Tuple[Group, int]) -> int:
+        """ Returns the index of the line at a position in a group """
 
-                # add the new sub-directory
-                new_sub_dir = os.path.join(previous_item, sub_dir)
-                path_stack[new_order:] = [new_sub_dir]
+        (g, k) = loc
 
-                # and yield it
-                yield i, desc.BaseDescription(new_sub_dir)
+        index = 0 if k < 0 else g.first() + k
+        while g.parent is not None:
+            p = g.parent
+            index += p.first() + len(p.lines) + p.before(g.number)
+            g = p
 
-            if isinstance(l, line.RepoLine):
-                # Extract the base directory and the source url
-                stack_loc = path_stack[-1]
-                source_uri = l.url
+        return index
 
-                # And the path to clone to
-                folder = os.path.expanduser(l.path) or None
-                path = os.path.join(stack_loc, folder) \
-                    if folder is not None else None
+    @staticmethod
+    def __grow(g: Group, n: int):
+        """ Changes the size of a group and all groups it is nested in
 
-                name = path if path is not None else \
-                    impl.RemoteRepository(source_uri).humanish_part()
+        :param g: Group to change the size of
+        :param n: Number of lines added, negative if removed
+        """
 
-                # and yield the actual repository
-                yield i, desc.RepositoryDescription(
-                    source_uri, os.path.join(stack_loc, name))
+        while True:
+            g.size += n
+            if g.parent is None:
+                break
+            g.parent.resize(g.number, n)
+            g = g.parent
 
     @property
     def repositories(self) -> typing.Generator[desc.RepositoryDescription,
                                                None, None]:
-        """ an iterator for all repositories  """
+        """ an iterator for all repositories. Repositories are produced while
+        the lines are read, and remembered once all of them have been. """
 
+        if self.__repositories is not None:
+            yield from self.__repositories
+            return
+
+        repositories = []
         for (i, d) in self.descriptions:
             if isinstance(d, desc.RepositoryDescription):
+                repositories.append(d)
                 yield d
 
+        self.__repositories = repositories
+
+    def find_remote(self, url: str) -> \
+            typing.Optional[desc.RepositoryDescription]:
+        """ Finds the first repository cloned from a given url, or from any
+        other url for the same remote repository """
+
+        if self.__remotes is None:
+            remotes = {}
+            for r in self.repositories:
+                remotes.setdefault(r.remote.key(), r)
+            self.__remotes = remotes
+
+        return self.__remotes.get(impl.RemoteRepository(url).key())
+
     @property
     def locals(self) -> typing.Generator[impl.LocalRepository, None,
                                          None]:
@@ -99,6 +370,14 @@ class Tree(object):
                 break
 
         self.__lines = ll
+        self.__load = None
+
+        # the caches will be re-created when needed
+        self.__top = None
+        self.__index = None
+        self.__stale = False
+        self.__repositories = None
+        self.__remotes = None
 
     @property
     def root(self) -> str:
@@ -106,19 +385,30 @@ class Tree(object):
 
         return self.__root
 
+    @property
+    def ignores(self) -> typing.List[str]:
+        """ The patterns of directories not to search for repositories """
+
+        return [l.pattern for l in self.lines
+                if isinstance(l, line.IgnoreLine)]
+
     def index(self, d: desc.Description) -> typing.Optional[int]:
         """ Finds the index of a specific description inside of this Tree"""
 
-        for (i, dd) in self.descriptions:
-            if dd == d:
-                return i
+        self.__build()
+
+        loc = self.__index.get(d)
+        if loc is None:
+            return None
 
-        return None
+        return self.__position(loc)
 
     def contains(self, d: desc.Description) -> bool:
         """ Checks if this repository contains a specific description """
 
-        return self.index(d) is not None
+        self.__build()
+
+        return d in self.__index
 
     def insert_at(self, parent: typing.Optional[desc.BaseDescription],
                   d: desc.Description) -> int:
@@ -128,87 +418,38 @@ class Tree(object):
         :param d: Repository to insert
         """
 
+        return self.__position(self.__insert(parent, d))
+
+    def __insert(self, parent: typing.Optional[desc.BaseDescription],
+                 d: desc.Description) -> typing.Tuple[Group, int]:
+        """ Implementation of insert_at(), returning the group and position
+        of the inserted line """
+
+        self.__build()
+
         # are we inserting a base?
         insert_base = isinstance(d, desc.BaseDescription)
 
-        # find the index to insert in
-        # in the empty case, start at the top
+        # find the group to insert in
+        # in the empty case, use the top-level
         if parent is None:
-            index = 0
-            pdepth = 0
-
+            group = self.__top
             indent = " "
         else:
-            index = self.index(parent)
-            if index is None:
+            loc = self.__index.get(parent)
+            if loc is None or loc[1] >= 0:
                 raise ValueError("Parent does not exist in Tree()")
-            pdepth = self.lines[index].depth
-            indent = self.lines[index].indent + " "
-            index += 1
-
-        # index to insert into
-        insert_index = 0
-
-        # A stack for repository patchs
-        path_stack = [self.__base_directory]
-
-        target_level = None
-
-        # iterate through the lines
-        # and find the last line
-        for (i, l) in enumerate(self.lines):
-
-            # only do thing for indexes below index
-            if i >= index:
-
-                # if we have a base line we might have to quit
-                if isinstance(l, line.BaseLine):
-
-                    # if we are not inserting a base, break
-                    if not insert_base:
-                        break
-
-                    # if we do not know our target level yet, we need to
-                    # find it
-                    if target_level is None:
-                        target_level = len(path_stack)
-
-                    # we need to break upon our target level
-                    if l.depth < target_level:
-                        break
-
-                # if we have a repo line and have not reached our target
-                # level, we can save the indent
-                if isinstance(l, line.RepoLine) and target_level is None:
-                    indent = l.indent
-
-            # else we might need to update our path
-            elif isinstance(l, line.BaseLine):
-
-                # extract the current and new order of the lines
-                current_order = len(path_stack)
-                new_order = l.depth
+            group = loc[0]
+            indent = group.line.indent + " "
 
-                # we can not have a new order lower than 1 depth of the
-                # current level
-                if new_order > current_order:
-                    raise Exception(
-                        'Error in line {}: Missing base sublevel. '.format(
-                            i + 1))
-
-                # Read the sub-directory to be added and the old one
-                sub_dir = os.path.expanduser(l.path)
-                previous_item = path_stack[new_order - 1]
-
-                # add the new sub-directory
-                new_sub_dir = os.path.join(previous_item, sub_dir)
-                path_stack[new_order:] = [new_sub_dir]
-
-            # and up the index to insert into
-            insert_index = i + 1
+        # repositories are inserted after the last line of the group before
+        # any nested group, and take the indent of the last repository in
+        # it. Bases are inserted after all of the nested groups.
+        if group.indent is not None:
+            indent = group.indent
 
         # the parent path is the path that is at the right most position
-        ppath = path_stack[-1]
+        ppath = group.stack[-1]
 
         # if we are inserting a repository, create an appropriate repo line
         if not insert_base:
@@ -222,21 +463,51 @@ class Tree(object):
             npath = os.path.relpath(d.folder, ppath)
             if (npath == '..' or npath.startswith('../')):
                 npath = d.folder
-            item = line.BaseLine(indent, pdepth + 1, " ", npath, "")
+            item = line.BaseLine(indent, group.depth + 1, " ", npath, "")
 
         # finally insert the item itself
-        self.__lines.insert(insert_index, item)
+        # the new line does not change the paths of any of the following
+        # lines, as it is always inserted at the end of a group.
+        (item_stack, item_desc) = self.__step(0, item, group.stack)
+
+        if not insert_base:
+            loc = (group, len(group.lines))
+            group.lines.append(item)
+            group.indent = item.indent
+        else:
+            child = Group(group, item, item_stack)
+            group.append(child)
+            loc = (child, -1)
+
+        self.__grow(group, 1)
+        self.__stale = True
+        self.__repositories = None
+        self.__remotes = None
+
+        # and update the cache
+        existing = self.__index.get(item_desc)
+        if existing is None or \
+                self.__position(existing) > self.__position(loc):
+            self.__index[item_desc] = loc
 
-        # and return the inserted index
-        return insert_index
+        return loc
 
     def insert_base_or_get(self, b: desc.BaseDescription) -> int:
         """ Gets a BaseDescription index or inserts it recursively """
 
+        return self.__position(self.__insert_base_or_get(b))
+
+    def __insert_base_or_get(self, b: desc.BaseDescription) -> \
+            typing.Tuple[Group, int]:
+        """ Implementation of insert_base_or_get(), returning the group and
+        position of the line """
+
+        self.__build()
+
         # if we have the parent already, we are done
-        index = self.index(b)
-        if index is not None:
-            return index
+        loc = self.__index.get(b)
+        if loc is not None:
+            return loc
 
         # if we are inside of the base path, we can go recursively
         if os.path.commonprefix([b.folder, self.__base_directory]) == \
@@ -251,7 +522,7 @@ class Tree(object):
                 parent = desc.BaseDescription(ppath)
 
                 # and create the parent
-                self.insert_base_or_get(parent)
+                self.__insert_base_or_get(parent)
 
             else:
                 parent = None
@@ -261,15 +532,17 @@ class Tree(object):
             parent = None
 
         # and finally create our base
-        return self.insert_at(parent, b)
+        return self.__insert(parent, b)
 
     def insert_repo_or_get(self, r: desc.RepositoryDescription) -> int:
         """ Gets a RepositoryDescription index or inserts it recursively """
 
+        self.__build()
+
         # inserting an already existing repo
-        index = self.index(r)
-        if index is not None:
-            return index
+        loc = self.__index.get(r)
+        if loc is not None:
+            return self.__position(loc)
 
         # else, we need to create the parent
         # unless it is the base
@@ -278,7 +551,7 @@ class Tree(object):
         if parent.folder == self.__base_directory:
             parent = None
         else:
-            self.insert_base_or_get(parent)
+            self.__insert_base_or_get(parent)
 
         # and then insert it
         return self.insert_at(parent, r)
@@ -287,8 +560,9 @@ class Tree(object):
         """ Rebuilds this configuration file by re-inserting all
         repository descriptions from scratch """
 
-        # get all the repository descriptions
+        # get all the repository descriptions and ignored patterns
         repos = list(self.repositories)
+        ignores = self.ignores
 
         # wipe all the lines
         self.lines = []
@@ -301,36 +575,156 @@ class Tree(object):
 
             self.lines.append(line.RootLine('', '', relroot, ''))
 
-        # and re-insert all of the repos
+        # keep all the ignored patterns
+        for pattern in ignores:
+            self.lines.append(line.IgnoreLine('', ' ', pattern, ''))
+
+        # create all the groups at once
+        grouped = self.__group(repos)
+        if grouped is not None:
+            self.lines.extend(grouped)
+
+        # and if that is not possible re-insert all of the repos
+        else:
+            for r in repos:
+                self.insert_repo_or_get(r)
+
+    def __group(self, repos: typing.List[desc.RepositoryDescription]) -> \
+            typing.Optional[typing.List[line.ConfigLine]]:
+        """ Creates the lines for a list of repositories in a single pass.
+
+        The lines are identical to the ones created by calling
+        insert_repo_or_get() on each repository of an empty tree. If a path
+        can not be written to a line exactly, None is returned instead.
+
+        :param repos: Repositories to create lines for
+        """
+
+        # each group is a list of
+        # [line, path, depth, repository lines, sub groups]
+        top = [None, self.__base_directory, 0, [], []]
+        groups = {}
+        seen = set()
+
+        def group(folder: str) -> typing.Optional[list]:
+            """ Gets or creates the group for a folder, see
+            insert_base_or_get() """
+
+            if folder in groups:
+                return groups[folder]
+
+            # find the parent group
+            parent = top
+            if os.path.commonprefix([folder, self.__base_directory]) == \
+                    self.__base_directory:
+                (ppath, _) = os.path.split(folder)
+                if ppath != self.__base_directory \
+                        and folder != self.__base_directory:
+                    parent = group(ppath)
+
+            if parent is None:
+                return None
+
+            # find the path relative to the parent, see insert_at()
+            npath = os.path.relpath(folder, parent[1])
+            if (npath == '..' or npath.startswith('../')):
+                npath = folder
+
+            # which needs to lead back to the same folder
+            if os.path.join(parent[1], os.path.expanduser(npath)) != folder:
+                return None
+
+            depth = parent[2] + 1
+            g = [line.BaseLine(' ' * depth, depth, ' ', npath, ''), folder,
+                 depth, [], []]
+
+            groups[folder] = g
+            parent[4].append(g)
+            return g
+
         for r in repos:
-            self.insert_repo_or_get(r)
+            if r in seen:
+                continue
+            seen.add(r)
+
+            (parent, _) = r.to_repo_line("", "", "")
+            if parent.folder == self.__base_directory:
+                g = top
+            else:
+                g = group(parent.folder)
+                if g is None:
+                    return None
+
+            # create the line and make sure it gives the same repository
+            (_, item) = r.to_repo_line(' ' * (g[2] + 1), " ", "")
+            if parent.folder != g[1].rstrip("/") or \
+                    self.__step(0, item, (g[1],))[1] != r:
+                return None
+
+            g[3].append(item)
+
+        # repositories come before sub groups, which are in order of creation
+        lines = []
+        stack = [top]
+        while len(stack) > 0:
+            g = stack.pop()
+            if g[0] is not None:
+                lines.append(g[0])
+            lines.extend(g[3])
+            stack.extend(reversed(g[4]))
+
+        return lines
 
     def remove_local(self, local: impl.LocalRepository) -> bool:
         """ Remove a local repository from a configuration file
         provided it exists """
 
-        index = None
+        self.__build()
+
+        loc = None
+        removed = None
 
         # search for the local repository
-        for (i, dd) in self.descriptions:
+        for (dd, l) in self.__index.items():
             if isinstance(dd, desc.RepositoryDescription) and \
-              dd.local == local:
-                index = i
-                break
+                    dd.local == local and (loc is None or self.__position(
+                        l) < self.__position(loc)):
+                (loc, removed) = (l, dd)
 
         # if we did not find it, return
-        if index is None:
+        if loc is None:
             return False
 
-        # and remove the given index
-        lines = self.lines
-        del self.lines[index]
-        self.lines = lines
+        # and remove the given line
+        (group, index) = loc
+        del group.lines[index]
+        group.indent = next((l.indent for l in reversed(group.lines)
+                             if isinstance(l, line.RepoLine)), None)
+
+        self.__grow(group, -1)
+        self.__stale = True
+        self.__repositories = None
+        self.__remotes = None
+
+        # update the cache for the following lines of the group
+        del self.__index[removed]
+        for k in range(index, len(group.lines)):
+            (_, dd) = self.__step(k, group.lines[k], group.stack)
+            if dd is not None and self.__index.get(dd) == (group, k + 1):
+                self.__index[dd] = (group, k)
+
+        # the same repository might be found in a later line
+        for (g, k, l) in self.__following(group, index):
+            if isinstance(l, line.RepoLine) and l.url == removed.source:
+                (_, dd) = self.__step(k, l, g.stack)
+                if dd == removed:
+                    self.__index[dd] = (g, k)
+                    break
 
         return True
 
-    def find(self, pattern) -> typing.Generator[desc.Description, None, None]:
-        """ Finds all repositories subject to a given description. """
-        for r in self.repositories:
-            if r.remote.matches(pattern):
-                yield r
+    def find(self, *patterns: str) -> \
+            typing.Generator[desc.Description, None, None]:
+        """ Finds all repositories subject to the given patterns. """
+
+        yield from impl.PatternMatcher(*patterns).filter(self.repositories)
@@ -1,11 +1,38 @@
 #!/usr/bin/env python3
 
-import argparse
+import collections
+import sys
 
 from GitManager.utils import format
 from GitManager.config import file
-from GitManager.commands import status, lister, fetch, setup, pull, state, \
-    push, reconfigure, gc, clone
+
+
+class Action(collections.namedtuple("Action", [
+        "module", "name", "config", "stderr"])):
+    """ A command that can be run from the command line. The command is the
+    class name in the module GitManager.commands.<module>.
+
+    If config is True, the command is given the configuration file instead
+    of the list of repositories. If stderr is True, it writes its progress
+    to STDERR instead of STDOUT. """
+
+    pass
+
+
+# the commands that can be run, in the order they are shown in the help. The
+# modules of a command are only imported when it is run.
+ACTIONS = collections.OrderedDict([
+    ('setup', Action('setup', 'Setup', False, False)),
+    ('clone', Action('clone', 'Clone', True, False)),
+    ('fetch', Action('fetch', 'Fetch', False, False)),
+    ('pull', Action('pull', 'Pull', False, False)),
+    ('push', Action('push', 'Push', False, False)),
+    ('gc', Action('gc', 'GC', False, False)),
+    ('ls', Action('lister', 'LsLocal', False, False)),
+    ('status', Action('status', 'Status', False, False)),
+    ('state', Action('state', 'State', False, False)),
+    ('reconfigure', Action('reconfigure', 'Reconfigure', True, True)),
+])
 
 
 def main(args):
@@ -27,19 +54,29 @@ def main(args):
         return 3
 
 
-def real_main(args):
-    """ Main entry point for the program -- may throw errors"""
+def print_help():
+    """ Prints help about the available actions """
 
-    ACTIONS = ['help', 'setup', 'clone', 'fetch', 'pull', 'push', 'gc', 'ls',
-               'status', 'state', 'reconfigure']
+    import argparse
 
-    # Create an argument parser
     parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument("action", nargs='?',
                         help="Action to perform. One of '{}'. ".format(
-                            "', '".join(ACTIONS)))
+                            "', '".join(['help'] + list(ACTIONS))))
+    parser.print_help()
+
 
-    args, command_args = parser.parse_known_args()
+def real_main(args):
+    """ Main entry point for the program -- may throw errors"""
+
+    # the action is the first argument that is not an option, all others are
+    # given to the command
+    command_args = sys.argv[1:]
+    action = None
+    for (i, arg) in enumerate(command_args):
+        if not arg.startswith('-'):
+            action = command_args.pop(i)
+            break
 
     # Find the configuration file
     cfg_file = file.File.find()
@@ -57,43 +94,26 @@ def real_main(args):
         print(format.Format.red("Unable to read configuration file. "))
         return 1
 
-    line = format.TerminalLine()
-    repos = list(config.repositories)
-
-    if args.action == 'help' or args.action is None:
-        parser.print_help()
-
-    elif args.action == 'setup':
-        setup.Setup(line, repos, *command_args)()
-    elif args.action == 'clone':
-        clone.Clone(line, config, *command_args)()
+    if action == 'help' or action is None:
+        print_help()
+        return 0
 
-    elif args.action == 'fetch':
-        fetch.Fetch(line, repos, *command_args)()
-    elif args.action == 'pull':
-        pull.Pull(line, repos, *command_args)()
-
-    elif args.action == 'push':
-        push.Push(line, repos, *command_args)()
-
-    elif args.action == 'gc':
-        gc.GC(line, repos, *command_args)()
+    if action not in ACTIONS:
+        print('Unknown command %r' % (action,))
+        return 1
 
-    elif args.action == 'ls':
-        lister.LsLocal(line, repos, *command_args)()
-    elif args.action == 'status':
-        status.Status(line, repos, *command_args)()
-    elif args.action == 'state':
-        state.State(line, repos, *command_args)()
+    # load the command
+    command = ACTIONS[action]
+    module = __import__('GitManager.commands.{}'.format(command.module),
+                        fromlist=[command.name])
+    cls = getattr(module, command.name)
 
-    elif args.action == 'reconfigure':
-        import sys
-        line = format.TerminalLine(fd=sys.stderr)
-        reconfigure.Reconfigure(line, config, *command_args)()
+    line = format.TerminalLine(fd=sys.stderr if command.stderr else None)
 
+    if command.config:
+        cls(line, config, *command_args)()
     else:
-        print('Unknown command %r' % (args.action,))
-        return 1
+        cls(line, config.repositories, *command_args)()
 
     return 0
 
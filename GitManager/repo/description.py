@@ -23,19 +23,33 @@ class BaseDescription(collections.namedtuple("BaseDescription", ["folder"])):
 class RepositoryDescription(collections.namedtuple("RepositoryDescription",
                                                    ["source", "path"])):
     """A 'description' of a repository in the configuration file, i.e. a
-    a pair of (source, path) """
+    a pair of (source, path).
+
+    The local and remote repositories are only created once, so that facts
+    they cache are kept for as long as this description is used. They do
+    not take part in equality or hashing. """
 
     @property
     def local(self) -> implementation.LocalRepository:
         """ Gets the local repository associated to this
         RepositoryDescription """
-        return implementation.LocalRepository(self.path)
+
+        try:
+            return self.__local
+        except AttributeError:
+            self.__local = implementation.LocalRepository(self.path)
+            return self.__local
 
     @property
     def remote(self) -> implementation.RemoteRepository:
         """ Gets the remote repository associated to this
         RepositoryDescription """
-        return implementation.RemoteRepository(self.source)
+
+        try:
+            return self.__remote
+        except AttributeError:
+            self.__remote = implementation.RemoteRepository(self.source)
+            return self.__remote
 
     def to_repo_line(self, indent: str, space_1: str, space_2: str) -> \
             typing.Tuple[BaseDescription, line.RepoLine]:
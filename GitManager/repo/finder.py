@@ -1,7 +1,230 @@
 import typing
 
 from . import description, implementation
+from concurrent.futures import ThreadPoolExecutor
+import fnmatch
+import marshal
 import os.path
+import re
+import tempfile
+import time
+
+
+class Prune(object):
+    """ Rules deciding which directories the Finder does not search """
+
+    def __init__(self, ignore: typing.Iterable[str]=(),
+                 max_depth: typing.Optional[int]=None,
+                 one_file_system: bool=False):
+        """ Creates a new Prune object
+
+        :param ignore: Glob patterns of directories not to search. Patterns
+        containing a '/' are matched against the full path of a directory,
+        all others only against its name.
+        :param max_depth: If not None, the maximal depth of directories to
+        search, relative to the directory the search starts in.
+        :param one_file_system: If True, do not search directories on a
+        different file system than the one the search starts in.
+        """
+
+        self.__ignore = list(ignore)
+        self.__max_depth = max_depth
+        self.__one_file_system = one_file_system
+
+        self.__names = Prune.__compile(
+            [p for p in self.__ignore if '/' not in p])
+        self.__paths = Prune.__compile(
+            [p for p in self.__ignore if '/' in p])
+
+    @staticmethod
+    def __compile(patterns: typing.List[str]) -> \
+            typing.Optional[typing.Pattern]:
+        """ Compiles a list of glob patterns into a single expression """
+
+        if len(patterns) == 0:
+            return None
+
+        return re.compile('|'.join(
+            '(?:{})'.format(fnmatch.translate(p)) for p in patterns))
+
+    @property
+    def ignore(self) -> typing.List[str]:
+        """ Glob patterns of directories not to search """
+        return self.__ignore
+
+    @property
+    def max_depth(self) -> typing.Optional[int]:
+        """ The maximal depth of directories to search, if any """
+        return self.__max_depth
+
+    @property
+    def one_file_system(self) -> bool:
+        """ If directories on other file systems are not searched """
+        return self.__one_file_system
+
+    def descends(self, depth: int) -> bool:
+        """ Checks if the sub-directories of a directory at a given depth
+        should be searched """
+
+        return self.__max_depth is None or depth < self.__max_depth
+
+    def ignores(self, path: str) -> bool:
+        """ Checks if a directory is ignored """
+
+        if self.__names is not None and \
+                self.__names.match(os.path.basename(path)):
+            return True
+
+        return self.__paths is not None and \
+            self.__paths.match(path) is not None
+
+
+class ScanCache(object):
+    """ A persistent cache of directories scanned by the Finder. For each
+    directory, it remembers the repository in it and its sub-directories
+    until the directory (or its .git) is modified. """
+
+    # version of the cache format, to be increased whenever it changes
+    VERSION = 1
+
+    # directories modified less than this many seconds before a scan are
+    # not cached, as further changes might not update their mtime
+    RACY_SECONDS = 2
+
+    def __init__(self, fn: typing.Optional[str]=None):
+        """ Creates a new empty ScanCache object
+
+        :param fn: File to read and write this cache from. If None, the
+        cache is only kept in memory.
+        """
+
+        self.__fn = fn
+
+        # mapping from path to (signature, source, listing)
+        self.__entries = {}
+
+        # paths stored since the cache was read
+        self.__stored = set()
+
+        self.__racy = int((time.time() - ScanCache.RACY_SECONDS) * 10 ** 9)
+
+    @property
+    def fn(self) -> typing.Optional[str]:
+        """ The file this cache is stored in """
+        return self.__fn
+
+    @staticmethod
+    def signature(path: str) -> typing.Optional[tuple]:
+        """ Returns a value that changes whenever the entries of a directory
+        or its .git change, or None if the directory can not be found """
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        try:
+            git = os.stat(os.path.join(path, '.git'))
+            git_signature = (git.st_mtime_ns, git.st_size, git.st_ino)
+        except OSError:
+            git_signature = None
+
+        return stat.st_mtime_ns, stat.st_ino, git_signature
+
+    @staticmethod
+    def __key(path: str) -> str:
+        """ Returns the key to store a directory under """
+
+        if os.path.isabs(path):
+            return path
+
+        return os.path.abspath(path)
+
+    def get(self, path: str, signature: typing.Optional[tuple]) -> \
+            typing.Optional[tuple]:
+        """ Gets the cached scan of a directory
+
+        :param path: Path to the directory
+        :param signature: Current signature of the directory, see signature()
+        :return: a pair (source, listing) of the source of the repository in
+        the directory and the list of (name, is_link) pairs of its
+        sub-directories. Either may be None if unknown. If the directory has
+        not been cached or was modified, returns None.
+        """
+
+        if signature is None:
+            return None
+
+        entry = self.__entries.get(ScanCache.__key(path))
+        if entry is None or tuple(entry[0]) != signature:
+            return None
+
+        return entry[1], entry[2]
+
+    def put(self, path: str, signature: typing.Optional[tuple],
+            source: typing.Optional[str],
+            listing: typing.Optional[typing.List[typing.Tuple[str, bool]]]):
+        """ Stores the scan of a directory, see get() """
+
+        key = ScanCache.__key(path)
+        self.__stored.add(key)
+
+        # do not remember directories that might still be changing
+        if signature is None or signature[0] >= self.__racy or (
+                signature[2] is not None and signature[2][0] >= self.__racy):
+            self.__entries.pop(key, None)
+            return
+
+        self.__entries[key] = (signature, source, listing)
+
+    def read(self):
+        """ Reads this cache from disk. A missing or corrupted cache is read
+        as an empty cache. """
+
+        try:
+            with open(self.__fn, "rb") as fp:
+                (version, entries) = marshal.loads(fp.read())
+
+            if version != ScanCache.VERSION or not isinstance(entries, dict):
+                entries = {}
+
+        except (OSError, EOFError, ValueError, TypeError):
+            entries = {}
+
+        self.__entries = entries
+        self.__stored = set()
+
+    def write(self, root: str):
+        """ Writes this cache to disk, forgetting all directories below root
+        that have not been stored since the cache was read
+
+        :param root: Directory the scan started in
+        """
+
+        root = ScanCache.__key(root)
+        prefix = os.path.join(root, '')
+
+        entries = {p: e for (p, e) in self.__entries.items() if
+                   p in self.__stored or
+                   not (p == root or p.startswith(prefix))}
+        data = marshal.dumps((ScanCache.VERSION, entries))
+
+        # write to a temporary file first, so that the cache is never
+        # partially written
+        try:
+            directory = os.path.dirname(os.path.abspath(self.__fn))
+            os.makedirs(directory, exist_ok=True)
+
+            (fd, tmp) = tempfile.mkstemp(dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as fp:
+                    fp.write(data)
+                os.replace(tmp, self.__fn)
+            except OSError:
+                os.remove(tmp)
+                raise
+        except OSError:
+            pass
 
 
 class Finder(object):
@@ -12,55 +235,309 @@ class Finder(object):
                        allow_links: bool=False,
                        continue_in_repository: bool=False,
                        callback:
-                           typing.Callable[[str], None]=lambda s: None) \
+                           typing.Callable[[str], None]=lambda s: None,
+                       jobs: int=1,
+                       duplicate_callback:
+                           typing.Callable[[str], None]=lambda s: None,
+                       prune: typing.Optional[Prune]=None,
+                       cache: typing.Optional[ScanCache]=None) \
             -> typing.Generator[description.RepositoryDescription, None, None]:
         """ Finds all repositories within a specific path
         :param path: Paths of repository to find
         :param allow_links: If True, continue searching in repositories even if
-        they are symlinked. Use with caution, as this might cause the
-        routine to run into a infinite loop
+        they are symlinked. Every directory is only searched once, no matter
+        how many links point to it.
         :param continue_in_repository: If True, instead of stopping the
         recursing inside a repository, continue searching for sub-repositories
         :param callback: Optional callback to call when scanning a given
         directory.
+        :param jobs: Number of directories to scan at the same time. The
+        repositories are yielded in the same order regardless.
+        :param duplicate_callback: Optional callback to call when skipping a
+        directory that has already been scanned under a different path.
+        :param prune: Optional rules for directories not to search. Pruned
+        directories are never scanned, and the callback is not called for
+        them.
+        :param cache: Optional cache of previous scans. Directories that have
+        not changed since are neither listed nor checked for a repository
+        again.
 
         """
 
-        # notify the caller that we are scanning path
-        callback(path)
+        if prune is None:
+            prune = Prune()
 
-        # boolean indicating if we are inside a repository
-        is_in_repo = False
+        device = Finder.__device(path) if prune.one_file_system else None
 
-        # if we do not allow links, stop when we have a link
-        if not allow_links and os.path.islink(path):
+        if jobs > 1:
+            yield from Finder.__find_parallel(
+                path, allow_links, continue_in_repository, callback, jobs,
+                duplicate_callback, prune, device, cache)
             return
 
-        # return the repository if available
+        # (st_dev, st_ino) pairs of all directories scanned so far
+        visited = set()
+
+        # stack of (path, is_link, depth) triples of directories to scan, in
+        # reverse order. Whether a sub-directory is a link is known from
+        # scanning its parent, so that it does not need to be checked again.
+        stack = [(path, None, 0)]
+
+        while len(stack) > 0:
+            (path, is_link, depth) = stack.pop()
+
+            # notify the caller that we are scanning path
+            callback(path)
+
+            # if we do not allow links, stop when we have a link
+            if Finder.__is_skipped(path, is_link, allow_links):
+                continue
+
+            # when following links, scan every directory only once
+            if allow_links and Finder.__is_duplicate(
+                    Finder.__identify(path), visited):
+                duplicate_callback(path)
+                continue
+
+            # return the repository if available
+            (signature, repo, listing) = Finder.__probe(path, cache)
+            if repo is not None:
+                yield repo
+
+            # if we got a repository, no need to continue iterating
+            descend = prune.descends(depth) and \
+                (repo is None or continue_in_repository)
+
+            if descend and listing is None:
+                listing = Finder.__list(path)
+
+            if cache is not None:
+                cache.put(path, signature, repo and repo.source, listing)
+
+            # and scan all sub-directories next, in order
+            if descend:
+                stack.extend(
+                    (cpath, clink, depth + 1) for (cpath, clink) in
+                    reversed(Finder.__prune(path, listing, prune, device)))
+
+    @staticmethod
+    def __find_parallel(path: str, allow_links: bool,
+                        continue_in_repository: bool,
+                        callback: typing.Callable[[str], None], jobs: int,
+                        duplicate_callback: typing.Callable[[str], None],
+                        prune: Prune, device: typing.Optional[int],
+                        cache: typing.Optional[ScanCache]) \
+            -> typing.Generator[description.RepositoryDescription, None, None]:
+        """ Like find_recursive(), but scans directories using a pool of
+        threads. Each directory is scanned as soon as its parent has been,
+        but results are handled in the same order as find_recursive(). """
+
+        def visit(path: str, is_link: typing.Optional[bool],
+                  depth: int) -> tuple:
+            """ Visits a single directory and returns a triple of its
+            identity, the repository in it and the sub-directories to visit
+            next """
+
+            if Finder.__is_skipped(path, is_link, allow_links):
+                return None, None, []
+
+            identity = Finder.__identify(path) if allow_links else None
+
+            (signature, repo, listing) = Finder.__probe(path, cache)
+
+            descend = prune.descends(depth) and \
+                (repo is None or continue_in_repository)
+
+            if descend and listing is None:
+                listing = Finder.__list(path)
+
+            if cache is not None:
+                cache.put(path, signature, repo and repo.source, listing)
+
+            if not descend:
+                return identity, repo, []
+
+            return identity, repo, Finder.__prune(path, listing, prune, device)
+
+        # (st_dev, st_ino) pairs of all directories scanned so far
+        visited = set()
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+
+            # stack of (path, depth, visit) triples in reverse order
+            stack = [(path, 0, pool.submit(visit, path, None, 0))]
+
+            try:
+                while len(stack) > 0:
+                    (path, depth, future) = stack.pop()
+
+                    # notify the caller that we are scanning path
+                    callback(path)
+
+                    (identity, repo, children) = future.result()
+
+                    # duplicates are detected in order, so that the same
+                    # directories are skipped as in find_recursive()
+                    if Finder.__is_duplicate(identity, visited):
+                        duplicate_callback(path)
+                        continue
+
+                    if repo is not None:
+                        yield repo
+
+                    stack.extend(reversed([
+                        (cpath, depth + 1,
+                         pool.submit(visit, cpath, is_link, depth + 1))
+                        for (cpath, is_link) in children]))
+
+            # do not scan any more directories when we are interrupted
+            finally:
+                for (_, _, future) in stack:
+                    future.cancel()
+
+    @staticmethod
+    def __is_skipped(path: str, is_link: typing.Optional[bool],
+                     allow_links: bool) -> bool:
+        """ Checks if a directory should be skipped because it is a link
+
+        :param is_link: If known, if the directory is a link
+        """
+
+        if allow_links:
+            return False
+
+        if is_link is None:
+            is_link = os.path.islink(path)
+
+        return is_link
+
+    @staticmethod
+    def __identify(path: str) -> typing.Optional[typing.Tuple[int, int]]:
+        """ Returns a pair (st_dev, st_ino) identifying the directory a path
+        points to, or None if it can not be found """
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        return stat.st_dev, stat.st_ino
+
+    @staticmethod
+    def __is_duplicate(identity: typing.Optional[typing.Tuple[int, int]],
+                       visited: typing.Set[typing.Tuple[int, int]]) -> bool:
+        """ Checks if a directory has been visited before, and marks it as
+        visited otherwise
+
+        :param identity: Identity of the directory, as returned by
+        __identify(). If None, the directory is never a duplicate.
+        :param visited: Set of identities of visited directories
+        """
+
+        if identity is None:
+            return False
+
+        if identity in visited:
+            return True
+
+        visited.add(identity)
+        return False
+
+    @staticmethod
+    def __get_or_none(path: str) -> \
+            typing.Optional[description.RepositoryDescription]:
+        """ Gets a single repository given a path or returns None """
+
         try:
-            yield Finder.get_from_path(path)
-            is_in_repo = True
+            return Finder.get_from_path(path)
         except ValueError:
-            pass
+            return None
 
-        # if we got a repository, no need to continue iterating
-        if is_in_repo and not continue_in_repository:
-            return
+    @staticmethod
+    def __device(path: str) -> typing.Optional[int]:
+        """ Returns the device a path is stored on, or None if it can not be
+        found """
+
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            return None
+
+    @staticmethod
+    def __probe(path: str, cache: typing.Optional[ScanCache]) -> tuple:
+        """ Gets the repository in a directory, using a cache if possible
+
+        :param cache: Optional cache of previous scans
+        :return: a triple (signature, repository, listing) of the signature
+        of the directory, the repository in it (if any) and the cached list
+        of sub-directories (or None if not known)
+        """
+
+        if cache is None:
+            return None, Finder.__get_or_none(path), None
+
+        # the directory no longer exists, e.g. a cached link that is now
+        # broken
+        signature = ScanCache.signature(path)
+        if signature is None:
+            return None, None, []
+
+        entry = cache.get(path, signature)
+        if entry is None:
+            return signature, Finder.__get_or_none(path), None
+
+        (source, listing) = entry
+        if source is None:
+            return signature, None, listing
+
+        return signature, description.RepositoryDescription(source, path), \
+            listing
+
+    @staticmethod
+    def __list(path: str) -> typing.List[typing.Tuple[str, bool]]:
+        """ Lists the sub-directories of a directory, following links like
+        os.path.isdir
+
+        :return: a list of pairs (name, is_link)
+        """
+
+        listing = []
+        for entry in os.scandir(path):
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                listing.append((entry.name, entry.is_symlink()))
+
+        return listing
+
+    @staticmethod
+    def __prune(path: str, listing: typing.List[typing.Tuple[str, bool]],
+                prune: Prune, device: typing.Optional[int]) -> \
+            typing.List[typing.Tuple[str, bool]]:
+        """ Removes pruned directories from a list of sub-directories
+
+        :param path: Path of the parent directory
+        :param listing: Sub-directories as returned by __list()
+        :param prune: Rules for directories not to list
+        :param device: If not None, the device sub-directories have to be on
+        :return: a list of pairs (path, is_link)
+        """
+
+        children = []
+        for (name, is_link) in listing:
+            child = os.path.join(path, name)
+            if prune.ignores(child):
+                continue
 
-        # iterate over all sub-items
-        for name in os.listdir(path):
+            if device is not None and Finder.__device(child) != device:
+                continue
 
-            # if we have a sub-directory
-            dpath = os.path.join(path, name)
-            if os.path.isdir(dpath):
+            children.append((child, is_link))
 
-                # iterate over the return items
-                for desc in Finder.find_recursive(
-                        dpath,
-                        allow_links=allow_links,
-                        continue_in_repository=continue_in_repository,
-                        callback=callback):
-                    yield desc
+        return children
 
     @staticmethod
     def get_from_path(path: str) -> description.RepositoryDescription:
@@ -0,0 +1,653 @@
+import collections
+import os
+import re
+import threading
+import typing
+
+
+class UnsupportedError(Exception):
+    """ Raised when a repository can not be read without calling git """
+    pass
+
+
+# environment variables that change how git finds and reads repositories
+UNSUPPORTED_ENVIRONMENT = ['GIT_DIR', 'GIT_WORK_TREE', 'GIT_COMMON_DIR',
+                           'GIT_CONFIG', 'GIT_CONFIG_GLOBAL',
+                           'GIT_CONFIG_SYSTEM', 'GIT_CONFIG_COUNT',
+                           'GIT_CONFIG_PARAMETERS', 'GIT_NAMESPACE']
+
+# object names, either SHA-1 or SHA-256
+OBJECT_NAME = re.compile(r'^(?:[0-9a-f]{40}|[0-9a-f]{64})$')
+
+# rules used by git to resolve reference names, see 'git rev-parse'; the
+# last one only makes other names ambiguous and is never used to shorten
+SHORTEN_RULES = [('', ''), ('refs/', ''), ('refs/tags/', ''),
+                 ('refs/heads/', ''), ('refs/remotes/', ''),
+                 ('refs/remotes/', '/HEAD')]
+
+# maximal number of parsed files to remember
+CACHE_SIZE = 2 ** 10
+
+# cache for parsed files, mapping a path to a pair (signature, object) with
+# the least recently used path first
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def cached(path: str, factory: typing.Callable[[str], typing.Any]) \
+        -> typing.Any:
+    """ Reads a file using a factory, re-using a previous result as long as
+    the file has not changed on disk
+
+    :param path: Path to file to read
+    :param factory: Function to read the file with
+    :return: The return value of factory or None if the file does not exist
+    """
+
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == signature:
+            _cache.move_to_end(path)
+            return entry[1]
+
+    value = factory(path)
+
+    with _cache_lock:
+        _cache[path] = (signature, value)
+        _cache.move_to_end(path)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return value
+
+
+def read_file(path: str) -> typing.Optional[str]:
+    """ Reads the content of a small file or returns None if it does not
+    exist """
+
+    try:
+        with open(path, 'r') as fp:
+            return fp.read()
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        return None
+
+
+class Config(object):
+    """ A parsed git configuration file """
+
+    SECTION = re.compile(r'^\[\s*([-.\w]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+    KEY = re.compile(r'^([a-zA-Z][-a-zA-Z0-9]*)\s*(=?)')
+
+    def __init__(self, entries: typing.List[
+            typing.Tuple[str, typing.Optional[str], str, str]]):
+        """ Creates a new Config object
+
+        :param entries: List of (section, subsection, key, value) entries in
+        the order they appear in the file. Sections and keys are lowercase.
+        """
+
+        self.__entries = entries
+
+    @property
+    def entries(self) -> typing.List[
+            typing.Tuple[str, typing.Optional[str], str, str]]:
+        """ The (section, subsection, key, value) entries of this file """
+        return self.__entries
+
+    def get_all(self, section: str, subsection: typing.Optional[str],
+                key: str) -> typing.List[str]:
+        """ Gets all values of a given key """
+
+        return [v for (s, ss, k, v) in self.__entries if
+                s == section and ss == subsection and k == key]
+
+    @staticmethod
+    def read(path: str):
+        """ Reads a configuration file from disk
+        :rtype: Config
+        """
+
+        with open(path, 'r') as fp:
+            return Config.parse(fp.read())
+
+    @staticmethod
+    def parse(content: str):
+        """ Parses the content of a configuration file
+        :rtype: Config
+        """
+
+        entries = []
+        section = None
+        subsection = None
+
+        lines = content.split('\n')
+        idx = 0
+        while idx < len(lines):
+            line = lines[idx].strip()
+            idx += 1
+
+            # skip empty lines and comments
+            if line == '' or line[0] in '#;':
+                continue
+
+            # a new section, possibly followed by a key
+            if line.startswith('['):
+                match = Config.SECTION.match(line)
+                if match is None:
+                    raise UnsupportedError('Unable to parse config section')
+
+                section = match.group(1).lower()
+                subsection = match.group(2)
+
+                # [section "sub"] and the deprecated [section.sub]
+                if subsection is not None:
+                    subsection = re.sub(r'\\(.)', r'\1', subsection)
+                elif '.' in section:
+                    (section, subsection) = section.split('.', 1)
+
+                line = line[match.end():].strip()
+                if line == '' or line[0] in '#;':
+                    continue
+
+            if section is None:
+                raise UnsupportedError('Config key outside of a section')
+
+            match = Config.KEY.match(line)
+            if match is None:
+                raise UnsupportedError('Unable to parse config key')
+
+            key = match.group(1).lower()
+
+            # a key without a value is a boolean true
+            if match.group(2) == '':
+                rest = line[match.end():].strip()
+                if rest != '' and rest[0] not in '#;':
+                    raise UnsupportedError('Unable to parse config key')
+                entries.append((section, subsection, key, 'true'))
+                continue
+
+            # parse the value, which may continue on the next lines
+            text = line[match.end():]
+            (value, continued) = Config.parse_value(text)
+            while continued and idx < len(lines):
+                text = text[:-1] + lines[idx]
+                idx += 1
+                (value, continued) = Config.parse_value(text)
+
+            entries.append((section, subsection, key, value))
+
+        # includes need to be resolved by git itself
+        for (s, _, _, _) in entries:
+            if s == 'include' or s == 'includeif':
+                raise UnsupportedError('Config contains includes')
+
+        return Config(entries)
+
+    @staticmethod
+    def parse_value(s: str) -> typing.Tuple[str, bool]:
+        """ Parses a (part of) a value in a configuration file
+
+        :return: a pair (value, continued) where continued indicates that
+        the value continues on the next line
+        """
+
+        value = ''
+        pending = ''
+        quoted = False
+
+        s = s.lstrip()
+        idx = 0
+        while idx < len(s):
+            c = s[idx]
+            idx += 1
+
+            if c == '\\':
+                if idx >= len(s):
+                    return value + pending, True
+
+                c = s[idx]
+                idx += 1
+                escapes = {'n': '\n', 't': '\t', 'b': '\b', '"': '"',
+                           '\\': '\\'}
+                if c not in escapes:
+                    raise UnsupportedError('Invalid escape in config value')
+
+                value += pending + escapes[c]
+                pending = ''
+            elif c == '"':
+                value += pending
+                pending = ''
+                quoted = not quoted
+            elif quoted:
+                value += c
+            elif c in '#;':
+                break
+            elif c.isspace():
+                pending += c
+            else:
+                value += pending + c
+                pending = ''
+
+        if quoted:
+            raise UnsupportedError('Unterminated quote in config value')
+
+        return value, False
+
+
+class PackedRefs(object):
+    """ A packed-refs file """
+
+    def __init__(self, data: bytes):
+        """ Creates a new PackedRefs object
+
+        :param data: Content of the packed-refs file
+        """
+
+        self.__data = data
+        self.__refs = {}
+
+    @staticmethod
+    def read(path: str):
+        """ Reads a packed-refs file. The content is read at once, so that
+        no file stays open while the result is cached.
+        :rtype: PackedRefs
+        """
+
+        with open(path, 'rb') as fp:
+            return PackedRefs(fp.read())
+
+    def get(self, name: str) -> typing.Optional[str]:
+        """ Finds the object name of a given reference or returns None """
+
+        if name in self.__refs:
+            return self.__refs[name]
+
+        needle = b' ' + name.encode('utf-8')
+        data = self.__data
+
+        value = None
+        start = 0
+        while True:
+            idx = data.find(needle, start)
+            if idx < 0:
+                break
+            start = idx + 1
+
+            # the name has to be followed by the end of the line
+            end = idx + len(needle)
+            if end < len(data) and data[end:end + 1] != b'\n':
+                continue
+
+            # and be preceded by an object name
+            line_start = data.rfind(b'\n', 0, idx) + 1
+            oid = data[line_start:idx].decode('ascii', 'replace')
+            if OBJECT_NAME.match(oid):
+                value = oid
+                break
+
+        self.__refs[name] = value
+        return value
+
+    def items(self) -> typing.Generator[typing.Tuple[str, str], None, None]:
+        """ Iterates over all pairs of (name, object name) """
+
+        for line in self.__data.split(b'\n'):
+            if line == b'' or line[:1] in b'#^':
+                continue
+
+            (oid, _, name) = line.decode('utf-8').partition(' ')
+            yield name, oid
+
+
+class GitDir(object):
+    """ Reads information from a git repository without calling git """
+
+    def __init__(self, worktree: str, gitdir: str, commondir: str):
+        """ Creates a new GitDir object
+
+        :param worktree: Path to the working tree
+        :param gitdir: Path to the (per-worktree) git directory
+        :param commondir: Path to the git directory shared between worktrees
+        """
+
+        self.__worktree = worktree
+        self.__gitdir = gitdir
+        self.__commondir = commondir
+        self.__configs = None
+
+    @property
+    def worktree(self) -> str:
+        """ Path to the working tree """
+        return self.__worktree
+
+    @property
+    def gitdir(self) -> str:
+        """ Path to the (per-worktree) git directory """
+        return self.__gitdir
+
+    @property
+    def commondir(self) -> str:
+        """ Path to the git directory shared between worktrees """
+        return self.__commondir
+
+    @staticmethod
+    def find(path: str):
+        """ Finds the repository whose working tree is at path
+
+        :param path: Path to look for a repository in
+        :return: A GitDir or None if path is not the toplevel of a working
+        tree
+        :rtype: typing.Optional[GitDir]
+        """
+
+        for name in UNSUPPORTED_ENVIRONMENT:
+            if name in os.environ:
+                raise UnsupportedError('{} is set'.format(name))
+
+        # git refuses to work in directories owned by someone else
+        try:
+            owner = os.stat(path).st_uid
+        except OSError:
+            raise UnsupportedError('Unable to stat {}'.format(path))
+
+        if hasattr(os, 'getuid') and owner != os.getuid():
+            raise UnsupportedError('Repository owned by a different user')
+
+        # .git is either a directory or a file pointing to one
+        dotgit = os.path.join(path, '.git')
+        if os.path.isdir(dotgit):
+            gitdir = dotgit
+        elif os.path.isfile(dotgit):
+            content = read_file(dotgit) or ''
+            if not content.startswith('gitdir: '):
+                raise UnsupportedError('Invalid .git file')
+            gitdir = os.path.normpath(os.path.join(
+                path, content[len('gitdir: '):].strip()))
+        else:
+            return None
+
+        # linked worktrees point to the shared directory
+        commondir = read_file(os.path.join(gitdir, 'commondir'))
+        if commondir is not None:
+            commondir = os.path.normpath(
+                os.path.join(gitdir, commondir.strip()))
+        else:
+            commondir = gitdir
+
+        # check that we have a valid git directory
+        if not os.path.isfile(os.path.join(gitdir, 'HEAD')) or \
+                not os.path.isdir(os.path.join(commondir, 'objects')) or \
+                not os.path.isdir(os.path.join(commondir, 'refs')):
+            raise UnsupportedError('Invalid git directory')
+
+        repo = GitDir(path, gitdir, commondir)
+
+        # check for settings that change the layout of the repository
+        if repo.get('core', None, 'bare', local=True) not in [None, 'false'] \
+                or repo.get('core', None, 'worktree', local=True) is not None:
+            raise UnsupportedError('Repository has a custom worktree')
+
+        for (s, _, k, _) in repo.config(local=True):
+            if s == 'extensions' and k in ['refstorage', 'worktreeconfig']:
+                raise UnsupportedError('Unsupported repository extension')
+
+        return repo
+
+    #
+    # CONFIGURATION
+    #
+
+    @staticmethod
+    def global_config_paths() -> typing.List[str]:
+        """ Paths to the system and global git configuration files, in the
+        order they are read by git """
+
+        paths = []
+
+        if os.environ.get('GIT_CONFIG_NOSYSTEM', '').lower() not in \
+                ['1', 'true', 'yes', 'on']:
+            paths.append('/etc/gitconfig')
+
+        home = os.path.expanduser('~')
+        xdg_config_home = os.environ.get('XDG_CONFIG_HOME') or \
+            os.path.join(home, '.config')
+
+        paths.append(os.path.join(xdg_config_home, 'git', 'config'))
+        paths.append(os.path.join(home, '.gitconfig'))
+
+        return paths
+
+    def config(self, local: bool = False) -> typing.List[
+            typing.Tuple[str, typing.Optional[str], str, str]]:
+        """ All configuration entries that apply to this repository
+
+        :param local: If True, only read the repository configuration file
+        """
+
+        if not local and self.__configs is not None:
+            return self.__configs
+
+        paths = [] if local else GitDir.global_config_paths()
+        paths.append(os.path.join(self.commondir, 'config'))
+
+        entries = []
+        for path in paths:
+            try:
+                config = cached(path, Config.read)
+            except (OSError, UnicodeDecodeError):
+                raise UnsupportedError('Unable to read {}'.format(path))
+
+            if config is not None:
+                entries.extend(config.entries)
+
+        if not local:
+            self.__configs = entries
+
+        return entries
+
+    def get_all(self, section: str, subsection: typing.Optional[str],
+                key: str, local: bool = False) -> typing.List[str]:
+        """ Gets all configured values of a given key """
+
+        return [v for (s, ss, k, v) in self.config(local=local) if
+                s == section and ss == subsection and k == key]
+
+    def get(self, section: str, subsection: typing.Optional[str],
+            key: str, local: bool = False) -> typing.Optional[str]:
+        """ Gets the value of a given key or None """
+
+        values = self.get_all(section, subsection, key, local=local)
+        return values[-1] if len(values) > 0 else None
+
+    #
+    # REFERENCES
+    #
+
+    def ref_path(self, name: str) -> str:
+        """ Returns the path of a loose reference """
+
+        # reject anything that might escape the git directory
+        parts = name.split('/')
+        if '' in parts or '.' in parts or '..' in parts or '\\' in name:
+            raise UnsupportedError('Invalid reference name')
+
+        # some references are local to each worktree
+        if '/' not in name or name.startswith('refs/bisect/') or \
+                name.startswith('refs/worktree/') or \
+                name.startswith('refs/rewritten/'):
+            return os.path.join(self.gitdir, *parts)
+
+        return os.path.join(self.commondir, *parts)
+
+    @property
+    def packed_refs(self) -> PackedRefs:
+        """ The packed references of this repository """
+
+        try:
+            refs = cached(os.path.join(self.commondir, 'packed-refs'),
+                          PackedRefs.read)
+        except OSError:
+            raise UnsupportedError('Unable to read packed-refs')
+
+        return refs if refs is not None else PackedRefs(b'')
+
+    def read_ref(self, name: str) -> typing.Optional[str]:
+        """ Reads the raw value of a reference, i.e. either an object name
+        or 'ref: ' followed by the name of another reference, or None if it
+        does not exist """
+
+        content = read_file(self.ref_path(name))
+        if content is not None:
+            return content.strip()
+
+        if name.startswith('refs/'):
+            return self.packed_refs.get(name)
+
+        return None
+
+    def resolve(self, name: str) -> typing.Optional[str]:
+        """ Resolves a reference to an object name, or None if it does not
+        exist """
+
+        for _ in range(5):
+            value = self.read_ref(name)
+            if value is None:
+                return None
+
+            if not value.startswith('ref: '):
+                if not OBJECT_NAME.match(value):
+                    raise UnsupportedError('Invalid reference')
+                return value
+
+            name = value[len('ref: '):].strip()
+
+        raise UnsupportedError('Reference nested too deeply')
+
+    def symbolic_ref(self, name: str) -> typing.Optional[str]:
+        """ Returns the reference a symbolic reference points to or None if
+        it is not a symbolic reference """
+
+        value = self.read_ref(name)
+        if value is None or not value.startswith('ref: '):
+            return None
+
+        return value[len('ref: '):].strip()
+
+    def shorten_ref(self, name: str) -> str:
+        """ Shortens a reference name unambiguously, like git does """
+
+        # unless core.warnAmbiguousRefs is turned off, git checks all other
+        # rules rather than only the ones before the matching one
+        warn = self.get('core', None, 'warnambiguousrefs')
+        strict = warn is None or \
+            warn.lower() not in ['false', 'no', 'off', '0']
+
+        for i in reversed(range(1, len(SHORTEN_RULES) - 1)):
+            (prefix, suffix) = SHORTEN_RULES[i]
+            if not name.startswith(prefix) or not name.endswith(suffix) or \
+                    len(name) <= len(prefix) + len(suffix):
+                continue
+
+            short = name[len(prefix):len(name) - len(suffix)]
+
+            # the short name may not refer to anything else
+            others = SHORTEN_RULES if strict else SHORTEN_RULES[:i]
+            if all(self.read_ref(p + short + s) is None for (j, (p, s)) in
+                   enumerate(others) if j != i):
+                return short
+
+        return name
+
+    #
+    # REMOTES
+    #
+
+    @property
+    def remotes(self) -> typing.List[str]:
+        """ The names of all configured remotes """
+
+        # remotes may also be configured in legacy files
+        for legacy in ['remotes', 'branches']:
+            try:
+                if len(os.listdir(os.path.join(self.commondir, legacy))) > 0:
+                    raise UnsupportedError('Legacy remotes configured')
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+
+        return sorted(set(ss for (s, ss, _, _) in self.config() if
+                          s == 'remote' and ss is not None))
+
+    def remote_url(self, name: str) -> typing.Optional[str]:
+        """ Returns the url of a remote or None if it does not exist """
+
+        config = self.config()
+
+        # urls may be rewritten by the configuration
+        if any(s == 'url' for (s, _, _, _) in config):
+            raise UnsupportedError('URL rewriting configured')
+
+        if name not in self.remotes:
+            return None
+
+        urls = self.get_all('remote', name, 'url')
+        return urls[0] if len(urls) > 0 else name
+
+    def upstream(self, ref: str) -> typing.Optional[str]:
+        """ Returns the full name of the upstream of a branch or None """
+
+        if not ref.startswith('refs/heads/'):
+            return None
+
+        branch = ref[len('refs/heads/'):]
+        remote = self.get('branch', branch, 'remote')
+        merge = self.get('branch', branch, 'merge')
+        if remote is None or merge is None:
+            return None
+
+        # the upstream is a local branch
+        if remote == '.':
+            return merge
+
+        # else map it using the fetch refspecs of the remote
+        return self.tracking_ref(remote, merge)
+
+    def tracking_ref(self, remote: str, ref: str) -> typing.Optional[str]:
+        """ Returns the full name of the local reference a reference of a
+        remote is fetched into, or None if it is not fetched
+
+        :param remote: Name of the remote
+        :param ref: Full name of the reference on the remote
+        """
+
+        for refspec in self.get_all('remote', remote, 'fetch'):
+            refspec = refspec[1:] if refspec.startswith('+') else refspec
+            (src, _, dst) = refspec.partition(':')
+
+            if src.startswith('^') or src.count('*') > 1:
+                raise UnsupportedError('Unsupported refspec')
+
+            if dst == '':
+                continue
+
+            if '*' not in src:
+                if src == ref:
+                    return dst
+                continue
+
+            (prefix, suffix) = src.split('*')
+            if ref.startswith(prefix) and ref.endswith(suffix) and \
+                    len(ref) >= len(prefix) + len(suffix):
+                match = ref[len(prefix):len(ref) - len(suffix)]
+                return dst.replace('*', match)
+
+        return None
+
+
+__all__ = ["UnsupportedError", "Config", "PackedRefs", "GitDir"]
@@ -1,3 +1,4 @@
+import collections
 import os
 import re
 import enum
@@ -5,6 +6,7 @@ import typing
 
 import fnmatch
 
+from . import gitdir, urls
 from ..utils import run
 
 
@@ -16,6 +18,95 @@ class RemoteStatus(enum.Enum):
     DIVERGENCE = "divergence"
 
 
+class RepoProbe(collections.namedtuple("RepoProbe", [
+        "toplevel", "oid", "branch", "upstream", "ahead", "behind",
+        "entries"])):
+    """ The state of a local repository as read by a single call to
+    'git status --porcelain=v2 --branch -z'.
+
+    oid and branch are None for an unborn HEAD and a detached HEAD
+    respectively. upstream is None if no upstream is configured, ahead and
+    behind are None if the upstream is not available. entries is a tuple of
+    (XY, path) pairs of dirty entries as in 'git status --porcelain'. """
+
+    # number of fields before the path for each kind of entry
+    ENTRY_FIELDS = {'1': 8, '2': 9, 'u': 10, '?': 1, '!': 1}
+
+    @property
+    def dirty(self) -> bool:
+        """ Checks if this repository has any dirty entries """
+        return len(self.entries) > 0
+
+    @property
+    def remote_status(self) -> typing.Optional[RemoteStatus]:
+        """ The status of this repository with respect to the upstream or None
+        if there is no upstream available. """
+
+        if self.ahead is None or self.behind is None:
+            return None
+
+        if self.ahead == 0 and self.behind == 0:
+            return RemoteStatus.UP_TO_DATE
+        elif self.ahead == 0:
+            return RemoteStatus.REMOTE_NEWER
+        elif self.behind == 0:
+            return RemoteStatus.LOCAL_NEWER
+        else:
+            return RemoteStatus.DIVERGENCE
+
+    @staticmethod
+    def parse(toplevel: str, output: str):
+        """ Parses the output of 'git status --porcelain=v2 --branch -z'
+
+        :param toplevel: Toplevel directory of the repository
+        :param output: Output of the status command
+        :rtype: RepoProbe
+        """
+
+        headers = {}
+        entries = []
+
+        records = iter(output.split('\0'))
+        for record in records:
+            if record == '':
+                continue
+
+            # headers are of the form '# name value'
+            if record.startswith('# '):
+                (name, _, value) = record[2:].partition(' ')
+                headers[name] = value
+                continue
+
+            kind = record[0]
+            fields = record.split(' ', RepoProbe.ENTRY_FIELDS[kind])
+
+            if kind == '?' or kind == '!':
+                entries.append((kind + kind, fields[1]))
+            else:
+                entries.append((fields[1].replace('.', ' '), fields[-1]))
+
+            # renamed and copied entries are followed by the original path
+            if kind == '2':
+                next(records, None)
+
+        oid = headers.get('branch.oid')
+        if oid == '(initial)':
+            oid = None
+
+        branch = headers.get('branch.head')
+        if branch == '(detached)':
+            branch = None
+
+        ahead = behind = None
+        if 'branch.ab' in headers:
+            (ahead, behind) = headers['branch.ab'].split(' ')
+            (ahead, behind) = (int(ahead[1:]), int(behind[1:]))
+
+        return RepoProbe(toplevel, oid, branch,
+                         headers.get('branch.upstream'), ahead, behind,
+                         tuple(entries))
+
+
 class LocalRepository(object):
     """ Represents a local repository identified by a path """
 
@@ -24,13 +115,54 @@ class LocalRepository(object):
 
         self.__path = os.path.normpath(path)
 
+        # the signature of the git directory and the result of native()
+        self.__native = None
+
     def __eq__(self, other: typing.Any) -> bool:
         """ Checks if this LocalRepository is equal to another"""
         return isinstance(other, LocalRepository) and other.path == self.path
 
+    def native(self) -> typing.Optional[gitdir.GitDir]:
+        """ Reads the git directory of this repository without calling git
+
+        :return: a GitDir or None if this path is not the toplevel of a
+        repository
+        :raises gitdir.UnsupportedError: if the repository can not be read
+        without calling git
+        """
+
+        if not os.path.isdir(self.path):
+            return None
+
+        # re-use the previous result as long as the git directory has not
+        # changed
+        try:
+            st = os.stat(os.path.join(self.path, '.git'))
+            signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            signature = None
+
+        if signature is not None and self.__native is not None and \
+                self.__native[0] == signature:
+            return self.__native[1]
+
+        native = gitdir.GitDir.find(self.path)
+        if signature is not None:
+            self.__native = (signature, native)
+
+        return native
+
     @property
     def remotes(self) -> typing.List[str]:
         """ A list of remotes that this RemoteRepository has """
+
+        try:
+            native = self.native()
+            if native is not None:
+                return native.remotes
+        except gitdir.UnsupportedError:
+            pass
+
         remotes = run.GitRun("remote", "show", "-n", cwd=self.path)
         remotes.wait()
         return remotes.stdout.read().decode("utf-8").split("\n")
@@ -38,6 +170,16 @@ class LocalRepository(object):
     def get_remote_url(self, name: str) -> str:
         """ Get the url of a remote """
 
+        try:
+            native = self.native()
+            if native is not None:
+                url = native.remote_url(name)
+                if url is None:
+                    raise ValueError("Unable to find remote {}".format(name))
+                return url
+        except gitdir.UnsupportedError:
+            pass
+
         # get the url of a remote
         remote_url = run.GitRun("remote", "get-url", name, cwd=self.path)
 
@@ -59,6 +201,17 @@ class LocalRepository(object):
         :param ref: Ref to get upstream of.
         """
 
+        try:
+            native = self.native()
+            if native is not None and ref.startswith('refs/heads/'):
+                if native.resolve(ref) is None:
+                    return ''
+
+                upstream = native.upstream(ref)
+                return native.shorten_ref(upstream) if upstream else ''
+        except gitdir.UnsupportedError:
+            pass
+
         refs = run.GitRun("for-each-ref", "--format=%(upstream:short)", ref,
                           cwd=self.path)
         refs.wait()
@@ -71,6 +224,14 @@ class LocalRepository(object):
         :param ref: Ref to parse
         """
 
+        try:
+            native = self.native()
+            if native is not None and \
+                    (ref == 'HEAD' or ref.startswith('refs/')):
+                return native.symbolic_ref(ref) or ''
+        except gitdir.UnsupportedError:
+            pass
+
         refs = run.GitRun("symbolic-ref", "-q", ref, cwd=self.path)
         refs.wait()
 
@@ -81,6 +242,16 @@ class LocalRepository(object):
         :param ref: Ref to parse
         """
 
+        try:
+            native = self.native()
+            if native is not None and \
+                    (ref == 'HEAD' or ref.startswith('refs/')):
+                oid = native.resolve(ref)
+                if oid is not None:
+                    return oid
+        except gitdir.UnsupportedError:
+            pass
+
         refs = run.GitRun("rev-parse", ref, cwd=self.path)
         refs.wait()
 
@@ -99,6 +270,17 @@ class LocalRepository(object):
         if not os.path.isdir(self.path):
             return False
 
+        # git reports the physical path of the toplevel, which has to be
+        # equal to the normal path
+        if os.path.realpath(self.path) != self.path:
+            return False
+
+        # try to read the repository directly
+        try:
+            return self.native() is not None
+        except gitdir.UnsupportedError:
+            pass
+
         # try to get the toplevel
         rev_parse_run = run.GitRun("rev-parse", "--show-toplevel",
                                    cwd=self.path)
@@ -113,46 +295,159 @@ class LocalRepository(object):
         # and check that it is equal to the normal path
         return os.path.normpath(toplevel) == self.path
 
-    def gc(self, *args: str) -> bool:
+    def environment(self) -> dict:
+        """ An environment for git calls that should only ever consider the
+        repository at exactly this path, and never a parent repository """
+
+        env = os.environ.copy()
+        env['GIT_CEILING_DIRECTORIES'] = os.path.dirname(
+            os.path.abspath(self.path))
+        return env
+
+    def probe(self) -> typing.Optional[RepoProbe]:
+        """ Reads the state of this repository using a single git call
+
+        :return: a RepoProbe or None if the repository does not exist
+        """
+
+        # check if the directory exists
+        if not os.path.isdir(self.path):
+            return None
+
+        # because of the ceiling the call only succeeds if this path is the
+        # toplevel of a repository
+        cmd = run.GitRun("status", "--porcelain=v2", "--branch", "-z",
+                         cwd=self.path, environment=self.environment())
+
+        # the output lists all untracked files, so it has to be read while
+        # git is running
+        output = cmd.communicate()
+        if not cmd.success:
+            return None
+
+        return RepoProbe.parse(self.path, output.decode("utf-8"))
+
+    def gc(self, *args: str,
+           output: typing.Optional[run.Output] = None) -> bool:
         """ Runs housekeeping tasks on this repository
         :param args: Arguments to pass along to the houskeeping command
+        :param output: Optional function to pass the output of the git call
+        to, instead of writing it to the terminal
+        """
+
+        return run.GitRun("gc", *args, cwd=self.path,
+                          pipe_stderr=output is None, pipe_stdin=True,
+                          pipe_stdout=output is None).finish(output)
+
+    def changed(self, environment: typing.Optional[dict] = None) -> bool:
+        """ Checks if fetching might change any remote-tracking reference of
+        this repository, by comparing them to the references listed by 'git
+        ls-remote' for each remote. Returns True whenever this can not be
+        determined.
+
+        :param environment: Optional environment for the git calls
         """
 
-        return run.GitRun("gc", *args, cwd=self.path, pipe_stderr=True,
-                          pipe_stdin=True, pipe_stdout=True).success
+        try:
+            native = self.native()
+            if native is None:
+                return True
+
+            for remote in native.remotes:
+                # references removed by pruning are not checked for
+                prune = native.get('remote', remote, 'prune') or \
+                    native.get('fetch', None, 'prune')
+                if prune is not None and \
+                        prune.lower() in ['true', 'yes', 'on', '1']:
+                    return True
+
+                # only list the references that are fetched
+                patterns = [refspec.lstrip('+').partition(':')[0] for
+                            refspec in native.get_all('remote', remote,
+                                                      'fetch')]
+                if len(patterns) == 0:
+                    continue
+
+                cmd = run.GitRun("ls-remote", remote, *patterns,
+                                 cwd=self.path, environment=environment)
+                cmd.run()
+                output = cmd.stdout.read().decode("utf-8")
+                if not cmd.success:
+                    return True
+
+                for line in output.split("\n"):
+                    (oid, _, ref) = line.partition("\t")
+                    if ref == '' or ref.endswith('^{}'):
+                        continue
+
+                    tracking = native.tracking_ref(remote, ref)
+                    if tracking is not None and \
+                            native.resolve(tracking) != oid:
+                        return True
+
+        except gitdir.UnsupportedError:
+            return True
 
-    def fetch(self) -> bool:
-        """ Fetches all remotes from this repository"""
+        return False
+
+    def fetch(self, environment: typing.Optional[dict] = None,
+              if_changed: bool = False,
+              output: typing.Optional[run.Output] = None) -> bool:
+        """ Fetches all remotes from this repository
+
+        :param environment: Optional environment for the git call
+        :param if_changed: If True, only fetch when changed() reports a
+        change
+        :param output: Optional function to pass the output of the git call
+        to, instead of writing it to the terminal
+        """
+
+        if if_changed and not self.changed(environment=environment):
+            return True
 
         return run.GitRun("fetch", "--all", "--quiet", cwd=self.path,
-                          pipe_stdin=True, pipe_stdout=True,
-                          pipe_stderr=True).success
+                          pipe_stdin=True, pipe_stdout=output is None,
+                          pipe_stderr=output is None,
+                          environment=environment).finish(output)
 
-    def pull(self) -> bool:
-        """ Pulls all remotes from this repository"""
+    def pull(self, environment: typing.Optional[dict] = None,
+             output: typing.Optional[run.Output] = None) -> bool:
+        """ Pulls all remotes from this repository
+
+        :param environment: Optional environment for the git call
+        :param output: Optional function to pass the output of the git call
+        to, instead of writing it to the terminal
+        """
 
         return run.GitRun("pull", cwd=self.path, pipe_stdin=True,
-                          pipe_stdout=True, pipe_stderr=True).success
+                          pipe_stdout=output is None,
+                          pipe_stderr=output is None,
+                          environment=environment).finish(output)
 
-    def push(self) -> bool:
-        """ Pushes this repository """
+    def push(self, environment: typing.Optional[dict] = None,
+             output: typing.Optional[run.Output] = None) -> bool:
+        """ Pushes this repository
+
+        :param environment: Optional environment for the git call
+        :param output: Optional function to pass the output of the git call
+        to, instead of writing it to the terminal
+        """
 
         return run.GitRun("push", cwd=self.path, pipe_stdin=True,
-                          pipe_stdout=True, pipe_stderr=True).success
+                          pipe_stdout=output is None,
+                          pipe_stderr=output is None,
+                          environment=environment).finish(output)
 
     def local_status(self) -> typing.Optional[str]:
         """ Shows status on this git repository
         """
 
-        if not self.exists():
+        probe = self.probe()
+        if probe is None:
             return None
 
-        # Check for the status first
-        cmd = run.GitRun("status", "--porcelain", cwd=self.path)
-        cmd.wait()
-
-        # return the porcelain info
-        return cmd.stdout.read().decode("utf-8")
+        return ''.join('{} {}\n'.format(xy, pth) for (xy, pth) in
+                       probe.entries)
 
     def remote_status(self, update=False) -> typing.Optional[RemoteStatus]:
         """ Shows status on this repository, and in particular if it i
@@ -162,42 +457,21 @@ class LocalRepository(object):
         remote update first
         """
 
-        # if we do not exist, return
-        if not self.exists():
-            return None
-
         # if we should update, run git remote update
         if update:
-            if not run.GitRun("remote", "update", cwd=self.path).success:
+            if not os.path.isdir(self.path):
                 return None
 
-        # where is head pointing to?
-        localref = self.ref_parse("HEAD")
-
-        # what is our upstream?
-        upstream = self.upstream_ref(self.symbolic_ref("HEAD"))
-        remoteref = self.ref_parse(upstream)
-
-        # check where we would merge
-        refs = run.GitRun("merge-base", localref, remoteref, cwd=self.path)
-        refs.wait()
-        baseref = refs.stdout.read().decode("utf-8").split("\n")[0]
-
-        # if both references are identical, we are ok
-        if localref == remoteref:
-            return RemoteStatus.UP_TO_DATE
-
-        # if we would start with the local base, we would have to pull
-        elif localref == baseref:
-            return RemoteStatus.REMOTE_NEWER
+            if not run.GitRun("remote", "update", cwd=self.path,
+                              environment=self.environment()).success:
+                return None
 
-        # if we would start with the remote base, we would have to push
-        elif remoteref == baseref:
-            return RemoteStatus.LOCAL_NEWER
+        # read the state of the repository
+        probe = self.probe()
+        if probe is None:
+            return None
 
-        # else we have divergence and something is wrong.
-        else:
-            return RemoteStatus.DIVERGENCE
+        return probe.remote_status
 
 
 class RemoteRepository(object):
@@ -214,6 +488,9 @@ class RemoteRepository(object):
         """ Checks if this LocalRepository is equal to another"""
         return isinstance(other, RemoteRepository) and other.url == self.url
 
+    def __hash__(self) -> int:
+        return hash(self.url)
+
     @property
     def url(self) -> str:
         """ the url to this repository """
@@ -229,11 +506,19 @@ class RemoteRepository(object):
         """ Checks if this remote repository exists """
         return run.GitRun("ls-remote", "--exit-code", self.url).success
 
-    def clone(self, local: LocalRepository, *args: typing.Tuple[str]) -> bool:
-        """ Clones this repository into the path given by a local path"""
+    def clone(self, local: LocalRepository, *args: typing.Tuple[str],
+              environment: typing.Optional[dict] = None,
+              output: typing.Optional[run.Output] = None) -> bool:
+        """ Clones this repository into the path given by a local path
+
+        :param environment: Optional environment for the git call
+        :param output: Optional function to pass the output of the git call
+        to, instead of writing it to the terminal
+        """
         return run.GitRun("clone", self.url, local.path, *args,
-                          pipe_stdin=True, pipe_stdout=True,
-                          pipe_stderr=True).success
+                          pipe_stdin=True, pipe_stdout=output is None,
+                          pipe_stderr=output is None,
+                          environment=environment).finish(output)
 
     def components(self) -> typing.List[str]:
         """
@@ -241,49 +526,63 @@ class RemoteRepository(object):
         identifies where this repository should go.
         """
 
-        # Trim a trailing '.git'
-        if self.url.endswith('.git'):
-            url = self.url[:-4]
-        else:
-            url = self.url
+        return list(urls.components(self.url))
 
-        # Trim trailing '/'s
-        while url.endswith('/'):
-            url = url[:-1]
+    def key(self) -> urls.Key:
+        """ Returns the canonical key of this repository, which is identical
+        for all the different urls of the same repository """
 
-        if '://' in url:
-            # [$PROTOCOL]:$PREFIX/$COMPONENTS
-            url = '://'.join(url.split('://')[1:])
-            parts = re.split(r"[\\/:]", url)
-            (prefix, rest) = (parts[0], '/'.join(parts[1:]))
-        else:
-            # $PREFIX:$COMPONENTS
-            parts = url.split(':')
-            (prefix, rest) = (parts[0], ':'.join(parts[1:]))
-
-        # read (user, host) from the prefix
-        if '@' in prefix:
-            parts = prefix.split('@')
-            (user, host) = (parts[0], '@'.join(parts[1:]))
-        else:
-            user = None
-            host = prefix
+        return urls.key(self.url)
 
-        # if user is 'git' or 'gogs', ignore it
-        if user in ['git', 'gogs']:
-            user = None
+    def matches(self, pattern: str) -> bool:
+        """ Checks if a repository matches a given pattern"""
 
-        # prepare to prepend prefix
-        if user is not None:
-            prefix = [host, user]
-        else:
-            prefix = [host]
+        return PatternMatcher(pattern).matches(self)
 
-        # and split into '/'s
-        return prefix + re.split(r"[\\/:]", rest)
+    def humanish_part(self) -> str:
+        """
+        Extracts the 'humanish' part of this URL. See the `man git-clone`
+        for more details.
+        """
 
-    def matches(self, pattern: str) -> bool:
-        """ Checks if a repository matches a given pattern"""
+        return urls.components(self.url)[-1]
+
+
+class PatternMatcher(object):
+    """ Matches repositories against a set of patterns.
+
+    The patterns are compiled only once, so that the same matcher can be
+    used to efficiently filter a large number of repositories. Patterns
+    starting with '!' exclude all repositories they match. """
+
+    def __init__(self, *patterns: str):
+        """ Creates a new PatternMatcher object
+
+        :param patterns: Patterns to match repositories against. If only
+        excluding patterns are given, all other repositories match.
+        """
+
+        include = {}
+        exclude = {}
+
+        for pattern in patterns:
+            if pattern.startswith('!'):
+                (length, regex) = PatternMatcher.translate(pattern[1:])
+                exclude.setdefault(length, []).append(regex)
+            else:
+                (length, regex) = PatternMatcher.translate(pattern)
+                include.setdefault(length, []).append(regex)
+
+        self.__include = PatternMatcher.__compile(include)
+        self.__exclude = PatternMatcher.__compile(exclude)
+
+    @staticmethod
+    def translate(pattern: str) -> typing.Tuple[int, str]:
+        """ Translates a single pattern into a regular expression
+
+        :return: a pair of the number of components matched by the pattern
+        and the regular expression matching them joined by '/'s
+        """
 
         # lowercase the pattern
         pattern = pattern.lower()
@@ -295,26 +594,50 @@ class RemoteRepository(object):
             pattern = ':' + pattern
             pattern_components = RemoteRepository(pattern).components()[1:]
 
-        # count and reassemble
-        pattern_length = len(pattern_components)
-        pattern = '/'.join(pattern_components)
+        return len(pattern_components), \
+            fnmatch.translate('/'.join(pattern_components))
 
-        # get the components of the current repo
-        components = list(map(lambda pc: pc.lower(), self.components()))
-        components_length = len(components)
+    @staticmethod
+    def __compile(regexes: typing.Dict[int, typing.List[str]]) -> \
+            typing.List[typing.Tuple[int, typing.Pattern]]:
+        """ Combines the expressions for each number of components into a
+        single expression """
 
-        # iterate over all sub-paths of the given length
-        for i in range(components_length - pattern_length + 1):
-            suburl = '/'.join(components[i:i + pattern_length])
-            if fnmatch.fnmatch(suburl, pattern):
-                return True
+        return [(length, re.compile('|'.join(
+            '(?:{})'.format(regex) for regex in regexes[length])))
+            for length in sorted(regexes)]
+
+    @staticmethod
+    def __search(compiled: typing.List[typing.Tuple[int, typing.Pattern]],
+                 components: typing.List[str]) -> bool:
+        """ Checks if any sub-path of the components matches """
+
+        for (length, regex) in compiled:
+            for i in range(len(components) - length + 1):
+                if regex.match('/'.join(components[i:i + length])):
+                    return True
 
         return False
 
-    def humanish_part(self) -> str:
-        """
-        Extracts the 'humanish' part of this URL. See the `man git-clone`
-        for more details.
+    def matches(self, remote: RemoteRepository) -> bool:
+        """ Checks if a repository matches the patterns """
+
+        components = [pc.lower() for pc in urls.components(remote.url)]
+
+        if len(self.__include) > 0 and \
+                not PatternMatcher.__search(self.__include, components):
+            return False
+
+        return not PatternMatcher.__search(self.__exclude, components)
+
+    def filter(self, repos: typing.Iterable[typing.Any]) -> \
+            typing.Generator[typing.Any, None, None]:
+        """ Filters repository descriptions by the patterns
+
+        :param repos: Descriptions to filter. Each should have a remote
+        property.
         """
 
-        return self.components()[-1]
+        for repo in repos:
+            if self.matches(repo.remote):
+                yield repo
@@ -0,0 +1,109 @@
+import collections
+import functools
+import re
+import typing
+
+# maximal number of urls to remember the parsed form of
+CACHE_SIZE = 2 ** 16
+
+SEPARATORS = re.compile(r"[\\/:]")
+
+# users that are commonly used by git hosting, and hence not significant
+IGNORED_USERS = ['git', 'gogs']
+
+
+class ParsedURL(collections.namedtuple("ParsedURL", [
+        "host", "user", "port", "path"])):
+    """ The parts of a url to a repository. The port is only set for urls
+    of the form $PROTOCOL://$HOST:$PORT/$PATH. """
+
+    pass
+
+
+class Key(collections.namedtuple("Key", ["host", "user", "path"])):
+    """ A canonical key for a repository url, identical for the
+    https://, ssh:// and scp-like forms of the same repository """
+
+    pass
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse(url: str) -> ParsedURL:
+    """ Parses a url into its parts
+
+    :param url: URL to parse
+    """
+
+    # Trim a trailing '.git'
+    if url.endswith('.git'):
+        url = url[:-4]
+
+    # Trim trailing '/'s
+    url = url.rstrip('/')
+
+    port = None
+
+    if '://' in url:
+        # [$PROTOCOL]:$PREFIX/$COMPONENTS
+        url = url.split('://', 1)[1]
+        parts = SEPARATORS.split(url)
+        (prefix, rest) = (parts[0], '/'.join(parts[1:]))
+
+        # $PREFIX might be followed by a port
+        if url[len(prefix):len(prefix) + 1] == ':' and parts[1].isdigit():
+            port = parts[1]
+    else:
+        # $PREFIX:$COMPONENTS
+        (prefix, _, rest) = url.partition(':')
+
+    # read (user, host) from the prefix
+    if '@' in prefix:
+        (user, host) = prefix.split('@', 1)
+    else:
+        user = None
+        host = prefix
+
+    if user in IGNORED_USERS:
+        user = None
+
+    return ParsedURL(host, user, port, tuple(SEPARATORS.split(rest)))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def components(url: str) -> typing.Tuple[str, ...]:
+    """ Extracts the components of a url, i.e. a set of items that uniquely
+    identifies where a repository should go.
+
+    :param url: URL to extract components of
+    """
+
+    parsed = parse(url)
+
+    if parsed.user is not None:
+        return (parsed.host, parsed.user) + parsed.path
+    else:
+        return (parsed.host,) + parsed.path
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def key(url: str) -> Key:
+    """ Computes the canonical key of a url. Hosts are compared without
+    case, and ports and empty path components are ignored.
+
+    :param url: URL to compute key of
+    """
+
+    parsed = parse(url)
+
+    path = parsed.path
+    if parsed.port is not None:
+        path = path[1:]
+
+    # 'git@host:/a/b' has the path ('', 'a', 'b'), but is the same
+    # repository as 'ssh://git@host/a/b'
+    path = tuple(c for c in path if c)
+
+    return Key(parsed.host.lower(), parsed.user, path)
+
+
+__all__ = ["ParsedURL", "Key", "parse", "components", "key"]
@@ -0,0 +1,258 @@
+import collections
+import typing
+
+# maximal number of items to read ahead while looking for an item whose
+# group can run another task
+LOOKAHEAD = 256
+
+# maximal number of tasks started but not yet yielded, per job, when items
+# are not grouped
+BACKLOG = 2
+
+# functions returning the group of an item, and the maximal number of tasks
+# running at the same time for a group (or None if unlimited)
+Group = typing.Callable[[typing.Any], typing.Hashable]
+Limit = typing.Callable[[typing.Hashable], typing.Optional[int]]
+
+
+class Executor(object):
+    """ Runs a task on a sequence of items, one item after another """
+
+    def __init__(self, jobs: int = 1):
+        """ Creates a new Executor object
+
+        :param jobs: Maximal number of tasks to run at the same time
+        """
+
+        if jobs < 1:
+            raise ValueError('Number of jobs must be at least 1')
+
+        self.__jobs = jobs
+
+    @property
+    def jobs(self) -> int:
+        """ The maximal number of tasks running at the same time """
+        return self.__jobs
+
+    def map(self, task: typing.Callable[[int, typing.Any], typing.Any],
+            items: typing.Iterable[typing.Any]) \
+            -> typing.Generator[typing.Any, None, None]:
+        """ Runs a task on each item and yields the results in the order of
+        the items.
+
+        :param task: Function to call with (index, item) for each item
+        :param items: Items to run the task on
+        """
+
+        for (i, item) in enumerate(items):
+            yield task(i, item)
+
+    @staticmethod
+    def create(jobs: int = 1, group: typing.Optional[Group] = None,
+               limit: typing.Optional[Limit] = None):
+        """ Creates an appropriate executor for the given number of jobs
+        :rtype: Executor
+
+        :param jobs: Maximal number of tasks to run at the same time
+        :param group: See ThreadedExecutor
+        :param limit: See ThreadedExecutor
+        """
+
+        if jobs > 1:
+            return ThreadedExecutor(jobs, group, limit)
+        else:
+            return Executor(jobs)
+
+
+class ThreadedExecutor(Executor):
+    """ Runs a task on a sequence of items using a pool of threads.
+
+    Each thread runs at most one task, and hence at most one subprocess, at
+    a time. The number of jobs thus is the shared budget of subprocesses for
+    all items.
+
+    Items can furthermore be grouped, with a separate limit of tasks running
+    at the same time for each group. Tasks are then started from the groups
+    in turn, so that running tasks are spread over as many groups as
+    possible. """
+
+    def __init__(self, jobs: int = 1, group: typing.Optional[Group] = None,
+                 limit: typing.Optional[Limit] = None):
+        """ Creates a new ThreadedExecutor object
+
+        :param jobs: Maximal number of tasks to run at the same time
+        :param group: Optional function returning the group of an item
+        :param limit: Optional function returning the maximal number of tasks
+        to run at the same time for a group, or None if only the number of
+        jobs limits it.
+        """
+
+        super().__init__(jobs)
+
+        self.__group = group
+        self.__limit = limit
+
+    def __has_capacity(self, group: typing.Hashable, running: int) -> bool:
+        """ Checks if another task of a group can be started
+
+        :param group: Group to check
+        :param running: Number of tasks of the group currently running
+        """
+
+        if self.__limit is None:
+            return True
+
+        limit = self.__limit(group)
+        return limit is None or running < limit
+
+    def map(self, task: typing.Callable[[int, typing.Any], typing.Any],
+            items: typing.Iterable[typing.Any]) \
+            -> typing.Generator[typing.Any, None, None]:
+        """ Runs a task on each item and yields the results in the order of
+        the items.
+
+        :param task: Function to call with (index, item) for each item
+        :param items: Items to run the task on
+        """
+
+        if self.__group is not None:
+            yield from self.__map_grouped(task, items)
+            return
+
+        # imported here, as it is slow to import and not needed when running
+        # one job at a time
+        from concurrent import futures
+
+        with futures.ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            pending = collections.deque()
+
+            try:
+                # start each task as soon as its item is known, and yield
+                # results that are already finished in the meantime
+                for (i, item) in enumerate(items):
+
+                    # do not run ahead of the consumer by more than a few
+                    # tasks per job, so that neither the items nor the
+                    # results pile up
+                    while len(pending) >= BACKLOG * self.jobs:
+                        yield pending.popleft().result()
+
+                    pending.append(pool.submit(task, i, item))
+
+                    while len(pending) > 0 and pending[0].done():
+                        yield pending.popleft().result()
+
+                while len(pending) > 0:
+                    yield pending.popleft().result()
+
+            # do not start any more tasks when we are interrupted
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def __map_grouped(self,
+                      task: typing.Callable[[int, typing.Any], typing.Any],
+                      items: typing.Iterable[typing.Any]) \
+            -> typing.Generator[typing.Any, None, None]:
+        """ Implementation of map() for grouped items
+
+        :param task: Function to call with (index, item) for each item
+        :param items: Items to run the task on
+        """
+
+        from concurrent import futures
+
+        items = enumerate(items)
+        exhausted = False
+
+        # items waiting to be started by group, with the group to start an
+        # item of next first
+        waiting = collections.OrderedDict()
+        queued = 0
+
+        # the number of running tasks of each group, and the group of each
+        # running task
+        running = collections.Counter()
+        groups = {}
+
+        # futures by index of their item, and the next index to yield
+        started = {}
+        current = 0
+
+        with futures.ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            try:
+                while True:
+
+                    # start tasks until all jobs are busy
+                    while len(groups) < self.jobs:
+
+                        # do not run ahead of the consumer by more than a few
+                        # tasks per job. The next item to yield may always be
+                        # started, so that the results keep coming.
+                        if len(started) >= BACKLOG * self.jobs:
+                            group = next((g for g in waiting if
+                                          waiting[g][0][0] == current and
+                                          self.__has_capacity(
+                                              g, running[g])), None)
+                            if group is None:
+                                break
+                        else:
+                            group = next((g for g in waiting if
+                                          self.__has_capacity(
+                                              g, running[g])), None)
+
+                        # if no waiting item can be started, read another one
+                        if group is None:
+                            if exhausted or queued >= LOOKAHEAD:
+                                break
+
+                            try:
+                                (i, item) = next(items)
+                            except StopIteration:
+                                exhausted = True
+                                continue
+
+                            queue = waiting.setdefault(self.__group(item),
+                                                       collections.deque())
+                            queue.append((i, item))
+                            queued += 1
+                            continue
+
+                        # start the next item of the group, and move the
+                        # group to the back of the line
+                        (i, item) = waiting[group].popleft()
+                        queued -= 1
+                        if len(waiting[group]) == 0:
+                            del waiting[group]
+                        else:
+                            waiting.move_to_end(group)
+
+                        future = pool.submit(task, i, item)
+                        started[i] = future
+                        groups[future] = group
+                        running[group] += 1
+
+                    # yield all results that are finished in order
+                    while current in started and started[current].done():
+                        yield started.pop(current).result()
+                        current += 1
+
+                    # when nothing is running, tasks were only held back for
+                    # the results yielded just now
+                    if len(groups) == 0:
+                        if exhausted and len(waiting) == 0:
+                            break
+                        continue
+
+                    # wait for a task to finish
+                    (done, _) = futures.wait(
+                        list(groups), return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        running[groups.pop(future)] -= 1
+
+            # do not start any more tasks when we are interrupted
+            finally:
+                for future in started.values():
+                    future.cancel()
+
+__all__ = ["Executor", "ThreadedExecutor"]
@@ -1,8 +1,15 @@
+import functools
 import shutil
+import signal
 import sys
+import threading
+import time
 
 from os import path
 
+# maximal number of formatted paths to remember, see Format.short_path()
+SHORT_PATH_CACHE_SIZE = 2 ** 12
+
 
 class Format(object):
     """ Methods for formatting text in certain colors. """
@@ -113,40 +120,57 @@ class Format(object):
         # Step 2: Iteratively try replacing components by '...'
         #
 
-        pth_components = pth.split('/')
-
-        # try shortening components
-        while len(pth_components) > 2:
+        # We always remove the middle component of the ones that are left,
+        # so the removed components form a range [start, stop). Instead of
+        # building every path, we only keep track of its length.
+        components = pth.split('/')
+        lengths = [len(c) for c in components]
 
-            # if the long path is ok, just return it
-            if len(pth) <= length:
-                return pth
+        (start, stop) = (0, 0)
+        count = len(components)
+        pth_length = len(pth)
 
-            # figure out the component to remove
-            rmidx = int(len(pth_components) / 2)
+        while count > 2:
 
-            # build a new path
-            pth = '/'.join(pth_components[:rmidx] + ['...'] + pth_components[
-                                                              (rmidx + 1):])
+            # if the long path is ok, stop
+            if pth_length <= length:
+                break
 
-            # and update the components array
-            pth_components = pth_components[:rmidx] + pth_components[
-                                                      (rmidx + 1):]
+            # figure out the component to remove
+            rmidx = int(count / 2)
+
+            if start == stop:
+                (start, stop) = (rmidx, rmidx + 1)
+                pth_length += 3 - lengths[rmidx]
+            elif rmidx < start:
+                start -= 1
+                pth_length -= lengths[start] + 1
+            else:
+                pth_length -= lengths[stop] + 1
+                stop += 1
+
+            count -= 1
+
+        # build the path we ended up with
+        if start != stop:
+            components = components[:start] + ['...'] + components[stop:]
+            pth = '/'.join(components)
+            del components[start]
 
         #
         # Step 3: Fallback to just taking a substring
         #
 
         # if the long path is ok now, just return it
-        if len(pth) <= length:
+        if pth_length <= length:
             return pth
 
         # if we still haven't gotten a path that is short enough
         # we will have to remove parts from within one component
 
         # extract first and last component
-        begin = pth_components[0]
-        end = pth_components[1]
+        begin = components[0]
+        end = components[-1] if len(components) > 1 else ''
 
         # the number of characters we will get to keep
         keepidx = length - 3
@@ -173,6 +197,17 @@ class Format(object):
         if length <= 5:
             raise ValueError('Length must be at least 6')
 
+        return Format.__short_path(pth, length, path.expanduser('~'))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=SHORT_PATH_CACHE_SIZE)
+    def __short_path(pth: str, length: int, home: str) -> str:
+        """ Like short_path(), but remembers recently formatted paths
+
+        :param home: Home directory of the user, which absolute paths are
+        formatted relative to
+        """
+
         if pth.startswith('/'):
             return Format.short_abs_path(pth, length)
         else:
@@ -182,6 +217,11 @@ class Format(object):
 class TerminalLine(object):
     """ Represents a Terminal Line that can be re-written"""
 
+    # number of times the terminal has been resized, and if we are notified
+    # of it (None if not known yet). See __watch().
+    __resizes = 0
+    __watching = None
+
     def __init__(self, fd=None):
         """ Creates a new TerminalLine object.
 
@@ -189,7 +229,57 @@ class TerminalLine(object):
         """
 
         self.__fd = sys.stdout if fd is None else fd
-        self.__cache = ""
+
+        # chunks of the current line that have not been written yet. Only
+        # used when not writing to a terminal.
+        self.__pending = []
+
+        # the terminal capabilities, read upon first use
+        self.__isatty = None
+        self.__width = None
+        self.__width_resizes = None
+
+        # the handler can only be installed from the main thread, so do so
+        # before any other threads write to this line
+        TerminalLine.__watch()
+
+    @staticmethod
+    def __watch() -> bool:
+        """ Installs a handler for SIGWINCH, to be notified when the terminal
+        is resized
+
+        :return: a boolean indicating if the handler is installed
+        """
+
+        if TerminalLine.__watching is not None:
+            return TerminalLine.__watching
+
+        # not every platform has SIGWINCH
+        if not hasattr(signal, 'SIGWINCH'):
+            TerminalLine.__watching = False
+            return False
+
+        previous = signal.getsignal(signal.SIGWINCH)
+
+        def on_resize(signum, frame):
+            TerminalLine.__resizes += 1
+
+            if callable(previous):
+                previous(signum, frame)
+
+        # handlers can only be installed from the main thread, so try again
+        # once called from there
+        if threading.current_thread() is not threading.main_thread():
+            return False
+
+        try:
+            signal.signal(signal.SIGWINCH, on_resize)
+        except ValueError:
+            TerminalLine.__watching = False
+            return False
+
+        TerminalLine.__watching = True
+        return True
 
     @property
     def width(self):
@@ -198,7 +288,24 @@ class TerminalLine(object):
         :rtype: int
         """
 
-        return shutil.get_terminal_size().columns
+        # re-read the width only when the terminal has been resized, or
+        # every time if we are not notified of it
+        resizes = TerminalLine.__resizes
+        if self.__width is None or self.__width_resizes != resizes or \
+                not TerminalLine.__watch():
+            self.__width = shutil.get_terminal_size().columns
+            self.__width_resizes = resizes
+
+        return self.__width
+
+    @property
+    def isatty(self) -> bool:
+        """ Checks if this line is written to a terminal """
+
+        if self.__isatty is None:
+            self.__isatty = self.__fd.isatty()
+
+        return self.__isatty
 
     def clean(self):
         """ Cleans the current line of content.
@@ -206,10 +313,10 @@ class TerminalLine(object):
         :return:
         """
 
-        if self.__fd.isatty():
+        if self.isatty:
             self.append('\r%s\r' % (' ' * self.width))
         else:
-            self.__cache = ""
+            self.__pending = []
 
     def linebreak(self):
         """ Inserts a LineBreak into this line.
@@ -231,10 +338,10 @@ class TerminalLine(object):
         """ Appends text to this TermminalLine instance. """
 
         # either write it out directly
-        if self.__fd.isatty():
+        if self.isatty:
             self.__fd.write(s)
         else:
-            self.__cache += s
+            self.__pending.append(s)
 
         # and flush the content
         self.flush()
@@ -242,15 +349,87 @@ class TerminalLine(object):
     def flush(self):
         """Flushes this TerminalLine. """
 
-        # if we are not a terminal, we flush existing lines
-        if not self.__fd.isatty():
-            while "\n" in self.__cache:
-                idx = self.__cache.index('\n')
-                self.__fd.write(self.__cache[:idx + 1])
-                self.__cache = self.__cache[idx + 1:]
+        # if we are not a terminal, we flush all complete lines at once.
+        # Only the last chunk can contain a linebreak, as all others have
+        # been flushed when they were appended.
+        if not self.isatty and len(self.__pending) > 0:
+            last = self.__pending[-1]
+            idx = last.rfind('\n')
+
+            if idx >= 0:
+                self.__pending[-1] = last[:idx + 1]
+                self.__fd.write(''.join(self.__pending))
+                self.__pending = [last[idx + 1:]] if idx + 1 < len(last) \
+                    else []
 
         # call the underlying flush implementation
         self.__fd.flush()
 
 
-__all__ = ["Format", "TerminalLine"]
+class ProgressLine(object):
+    """ Shows the progress of a long-running operation on a TerminalLine.
+    The progress is redrawn at most a fixed number of times per second, and
+    never if the line is not written to a terminal. """
+
+    def __init__(self, line: TerminalLine, template: str, rate: float=20):
+        """ Creates a new ProgressLine object
+
+        :param line: TerminalLine to show progress on
+        :param template: Template for the progress, formatted with the
+        counters passed to update() and followed by the current path
+        :param rate: Maximal number of times to redraw per second
+        """
+
+        self.__line = line
+        self.__template = template
+        self.__interval = 1 / rate
+        self.__enabled = line.isatty
+
+        self.__path = None
+        self.__counters = ()
+        self.__next = 0
+
+    def update(self, pth: str, *counters: int):
+        """ Updates the progress, and redraws it if it has not been drawn
+        recently
+
+        :param pth: Path currently being worked on
+        :param counters: Counters to format the template with
+        """
+
+        self.__path = pth
+        self.__counters = counters
+
+        if not self.__enabled:
+            return
+
+        now = time.monotonic()
+        if now < self.__next:
+            return
+
+        self.__next = now + self.__interval
+        self.render()
+
+    def render(self):
+        """ Draws the current progress """
+
+        if not self.__enabled or self.__path is None:
+            return
+
+        width = self.__line.width
+        status = self.__template.format(*self.__counters)
+
+        # add the path, if there is some room left
+        if width - len(status) > 5:
+            status += Format.short_path(self.__path, width - len(status))
+
+        self.__line.write(status[:width])
+
+    def finish(self):
+        """ Removes the progress from the line """
+
+        if self.__enabled:
+            self.__line.clean()
+
+
+__all__ = ["Format", "TerminalLine", "ProgressLine"]
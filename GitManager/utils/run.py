@@ -1,8 +1,10 @@
 import typing
 import enum
-import subprocess
 import os
 
+# a function receiving the output of a process
+Output = typing.Callable[[str], typing.Any]
+
 
 class ProcessRunState(enum.Enum):
     """ Different process run states """
@@ -47,7 +49,7 @@ class ProcessRun(object):
         self.__started = False
 
         # The Popen handle of the process
-        self.__handle = None  # type: subprocess.Popen
+        self.__handle = None  # type: typing.Any
 
     #
     # PROPERTIES
@@ -193,6 +195,10 @@ class ProcessRun(object):
             raise ProcessRunStateError(
                 'ProcessRun() was already started, can not run it again. ')
 
+        # imported here, as it is slow to import and not needed by commands
+        # that do not run any processes
+        import subprocess
+
         # Set the output arguments correctly
         stdout = None if self.pipe_stdout else subprocess.PIPE
         stderr = None if self.pipe_stderr else subprocess.PIPE
@@ -206,6 +212,46 @@ class ProcessRun(object):
                                          stdout=stdout, stderr=stderr,
                                          stdin=stdin, env=self.environment)
 
+    def finish(self, output: typing.Optional[Output] = None) -> bool:
+        """ Runs this process until it has finished
+
+        :param output: If given, everything the process writes to stdout and
+        stderr (unless piped to the parent) is passed to this function at
+        once after the process has finished.
+        :return: if the process succeeded
+        """
+
+        (stdout, stderr) = self.__communicate()
+
+        if output is not None:
+            text = (stdout or b'') + (stderr or b'')
+            if len(text) > 0:
+                output(text.decode('utf-8', 'replace'))
+
+        return self.success
+
+    def communicate(self) -> bytes:
+        """ Runs this process until it has finished, reading its output
+        while it runs, so that a process writing a lot of output can not
+        block on a full pipe
+
+        :return: everything the process wrote to stdout, or b'' if stdout is
+        piped to the parent
+        """
+
+        return self.__communicate()[0] or b''
+
+    def __communicate(self) -> typing.Tuple[typing.Optional[bytes],
+                                            typing.Optional[bytes]]:
+        """ Runs this process until it has finished and returns the
+        (stdout, stderr) it wrote, each None if piped to the parent """
+
+        # we are not yet running, so start it
+        if self.state == ProcessRunState.NEW:
+            self.run()
+
+        return self.__handle.communicate()
+
     def wait(self, timeout: typing.Optional[int] = None):
         """ waits for this process to finish
         :param timeout: Optional timeout to wait for
@@ -0,0 +1,107 @@
+import os
+import shlex
+import shutil
+import tempfile
+import typing
+
+from . import run
+
+# number of seconds a shared connection is kept open after its last use, in
+# case it is not closed explicitly
+PERSIST_SECONDS = 60
+
+
+class Multiplexer(object):
+    """ Shares a single SSH connection to each host between all git calls
+    using an environment of this Multiplexer, using the ControlMaster
+    feature of OpenSSH.
+
+    The connections are opened by the first git call to a host, and kept in
+    a private directory until the Multiplexer is closed. """
+
+    def __init__(self, ssh: typing.Optional[str] = None,
+                 persist: int = PERSIST_SECONDS):
+        """ Creates a new Multiplexer object
+
+        :param ssh: SSH command to use. Defaults to $GIT_SSH_COMMAND or
+        'ssh'.
+        :param persist: Number of seconds to keep unused connections open
+        """
+
+        if ssh is None:
+            ssh = os.environ.get('GIT_SSH_COMMAND') or 'ssh'
+
+        self.__ssh = ssh
+        self.__persist = persist
+        self.__directory = None  # type: typing.Optional[str]
+
+    @property
+    def ssh(self) -> str:
+        """ The SSH command used by this Multiplexer """
+        return self.__ssh
+
+    @property
+    def directory(self) -> typing.Optional[str]:
+        """ The directory holding the sockets of the shared connections, or
+        None if this Multiplexer is not open """
+        return self.__directory
+
+    def open(self):
+        """ Opens this Multiplexer """
+
+        if self.__directory is None:
+            self.__directory = tempfile.mkdtemp(prefix='gitmanager-ssh-')
+
+    def command(self) -> str:
+        """ Returns the SSH command for git calls to use """
+
+        if self.__directory is None:
+            raise ValueError('Multiplexer is not open')
+
+        return '{} -o ControlMaster=auto -o {} -o ControlPersist={}'.format(
+            self.ssh,
+            shlex.quote('ControlPath={}'.format(
+                os.path.join(self.__directory, '%C'))),
+            self.__persist)
+
+    def environment(self, base: typing.Optional[dict] = None) -> dict:
+        """ Returns an environment for git calls sharing connections
+
+        :param base: Environment to extend. Defaults to the environment of
+        this process.
+        """
+
+        env = (base if base is not None else os.environ).copy()
+        env['GIT_SSH_COMMAND'] = self.command()
+        return env
+
+    def close(self):
+        """ Closes all shared connections and removes their sockets """
+
+        if self.__directory is None:
+            return
+
+        (directory, self.__directory) = (self.__directory, None)
+
+        ssh = shlex.split(self.ssh)
+        for name in sorted(os.listdir(directory)):
+            # as the control path is given explicitly, the host is only
+            # needed to make a valid command line
+            run.ProcessRun(ssh[0], *ssh[1:], '-o', 'ControlPath={}'.format(
+                os.path.join(directory, name)), '-O', 'exit', name).wait()
+
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def __enter__(self):
+        """ Opens this Multiplexer
+        :rtype: Multiplexer
+        """
+
+        self.open()
+        return self
+
+    def __exit__(self, *args: typing.Any):
+        self.close()
+
+
+__all__ = ["PERSIST_SECONDS", "Multiplexer"]
@@ -0,0 +1,73 @@
+import unittest
+import unittest.mock
+
+from GitManager.commands import clone
+from GitManager.repo import description
+from GitManager.utils import format
+
+
+class TestClone(unittest.TestCase):
+    """ Tests that the clone command works properly """
+
+    def test_url_to_description(self):
+        """ Tests that urls are turned into descriptions properly """
+
+        config = unittest.mock.Mock()
+        config.root = '/root'
+        config.find_remote.return_value = None
+
+        cmd = clone.Clone(format.TerminalLine(), config,
+                          'git@github.com:hello/world.git')
+
+        # a new repository goes into the root
+        self.assertEqual(
+            cmd.url_to_description('git@github.com:hello/world.git'),
+            description.RepositoryDescription(
+                'git@github.com:hello/world.git',
+                '/root/github.com/hello/world'))
+
+        # a configured repository keeps its folder, but the url that is
+        # cloned from is the given one
+        config.find_remote.return_value = description.RepositoryDescription(
+            'https://github.com/hello/world', '/elsewhere/world')
+
+        self.assertEqual(
+            cmd.url_to_description('git@github.com:hello/world.git'),
+            description.RepositoryDescription(
+                'git@github.com:hello/world.git', '/elsewhere/world'))
+
+    @unittest.mock.patch('builtins.print')
+    @unittest.mock.patch(
+        'GitManager.repo.implementation.RemoteRepository.clone')
+    @unittest.mock.patch(
+        'GitManager.repo.implementation.LocalRepository.exists',
+        return_value=False)
+    def test_save(self,
+                  LocalRepository_exists: unittest.mock.Mock,
+                  RemoteRepository_clone: unittest.mock.Mock,
+                  builtins_print: unittest.mock.Mock):
+        """ Tests that configured repositories are not saved again """
+
+        config = unittest.mock.Mock()
+        config.root = '/root'
+        config.find_remote.return_value = description.RepositoryDescription(
+            'https://github.com/hello/world', '/elsewhere/world')
+
+        clone.Clone(format.TerminalLine(), config, '--save',
+                    'git@github.com:hello/world.git')()
+
+        config.insert_repo_or_get.assert_not_called()
+        config.write.assert_not_called()
+        RemoteRepository_clone.assert_called_once()
+
+        # a new repository is saved
+        config.find_remote.return_value = None
+
+        clone.Clone(format.TerminalLine(), config, '--save',
+                    'git@github.com:hello/world.git')()
+
+        config.insert_repo_or_get.assert_called_once_with(
+            description.RepositoryDescription(
+                'git@github.com:hello/world.git',
+                '/root/github.com/hello/world'))
+        config.write.assert_called_once_with()
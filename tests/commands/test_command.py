@@ -1,3 +1,7 @@
+import collections
+import io
+import threading
+import time
 import unittest
 import unittest.mock
 
@@ -6,6 +10,79 @@ from GitManager.utils import format
 from GitManager.repo import description
 
 
+class TestSnapshot(unittest.TestCase):
+    """ Tests that the Snapshot class works properly """
+
+    @unittest.mock.patch(
+        'GitManager.repo.implementation.LocalRepository.exists',
+        side_effect=[False, True])
+    def test_snapshot(self, implementation_exists: unittest.mock.Mock):
+        """ Tests that a snapshot resolves repositories once """
+
+        repos = [
+            description.RepositoryDescription(
+                '/path/to/source', '/path/to/clone'),
+            description.RepositoryDescription(
+                '/path/to/other/source', '/path/to/other/clone'),
+            description.RepositoryDescription(
+                '/path/to/source', '/path/to/clone'),
+        ]
+
+        # a local snapshot only contains existing repositories
+        snapshot = commands.Snapshot(repos, lambda r: r.local.exists())
+        self.assertEqual(list(snapshot), repos[1:2])
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(snapshot[0], repos[1])
+        self.assertFalse(snapshot.exists(repos[0]))
+        self.assertTrue(snapshot.exists(repos[1]))
+
+        # duplicates are only checked once
+        self.assertEqual(implementation_exists.call_count, 2)
+
+        # a non-local snapshot does not check anything
+        snapshot = commands.Snapshot(repos, None)
+        self.assertEqual(list(snapshot), repos)
+        self.assertIsNone(snapshot.exists(repos[0]))
+        self.assertEqual(implementation_exists.call_count, 2)
+
+    def test_snapshot_lazy(self):
+        """ Tests that a snapshot resolves repositories only when needed """
+
+        repos = [
+            description.RepositoryDescription(
+                '/path/to/source/{}'.format(i), '/path/to/clone/{}'.format(i))
+            for i in range(3)
+        ]
+
+        produced = []
+
+        def produce():
+            for r in repos:
+                produced.append(r)
+                yield r
+
+        snapshot = commands.Snapshot(produce(), None)
+        self.assertEqual(produced, [])
+        self.assertIsNone(snapshot.total)
+
+        # the first repository is available before the others are produced
+        iterator = iter(snapshot)
+        self.assertEqual(next(iterator), repos[0])
+        self.assertEqual(produced, repos[:1])
+        self.assertIsNone(snapshot.total)
+
+        # indexing only resolves up to the index
+        self.assertEqual(snapshot[1], repos[1])
+        self.assertEqual(produced, repos[:2])
+
+        # the length resolves everything
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(snapshot.total, 3)
+        self.assertEqual(list(iterator), repos[1:])
+        self.assertEqual(list(snapshot), repos)
+        self.assertEqual(produced, repos)
+
+
 class TestCommand(unittest.TestCase):
     """ Tests that the command line works properly """
 
@@ -27,18 +104,60 @@ class TestCommand(unittest.TestCase):
                 '/path/to/other/source', '/path/to/other/clone')
         ]
 
-        # create a command object
-        cmd = commands.Command(line, repos)
-
         # if we have a local command, only show the existing one
         with unittest.mock.patch('GitManager.commands.Command.LOCAL',
                                  True):
+            cmd = commands.Command(line, repos)
+            self.assertEqual(cmd.repos, repos[0:1])
+
+            # the existence check is only run once
             self.assertEqual(cmd.repos, repos[0:1])
+            self.assertEqual(implementation_exists.call_count, 2)
+
+            # and the results are kept in the snapshot
+            self.assertTrue(cmd.exists(repos[0]))
+            self.assertFalse(cmd.exists(repos[1]))
+            self.assertEqual(implementation_exists.call_count, 2)
 
         # if we do not have a local command, show all
         with unittest.mock.patch('GitManager.commands.Command.LOCAL',
                                  False):
+            cmd = commands.Command(line, repos)
             self.assertEqual(cmd.repos, repos)
+            self.assertEqual(implementation_exists.call_count, 2)
+
+    @unittest.mock.patch('GitManager.utils.format.TerminalLine')
+    def test_filter(self, format_TerminalLine: unittest.mock.Mock):
+        """ Tests that repositories are filtered by patterns """
+
+        line = format.TerminalLine()
+        repos = [
+            description.RepositoryDescription(
+                'git@github.com:hello/world.git', '/path/to/world'),
+            description.RepositoryDescription(
+                'git@github.com:hello/mars.git', '/path/to/mars'),
+            description.RepositoryDescription(
+                'git@github.com:bye/earth.git', '/path/to/earth'),
+        ]
+
+        with unittest.mock.patch('GitManager.commands.Command.FILTER',
+                                 True):
+            self.assertEqual(commands.Command(line, repos).repos, repos)
+            self.assertEqual(commands.Command(line, repos, 'hello/*').repos,
+                             repos[:2])
+            self.assertEqual(
+                commands.Command(line, repos, 'hello/*', '!mars',
+                                 'earth').repos, [repos[0], repos[2]])
+
+            # unknown options are not taken as patterns
+            with self.assertRaises(ValueError):
+                commands.Command(line, repos, 'hello/*', '--rebase')
+            with self.assertRaises(ValueError):
+                commands.Command(line, repos, '--ssh-multplex')
+
+        # commands without filtering ignore patterns
+        self.assertEqual(commands.Command(line, repos, 'hello/*').repos,
+                         repos)
 
     @unittest.mock.patch('GitManager.utils.format.TerminalLine')
     @unittest.mock.patch('GitManager.commands.Command.parse')
@@ -132,6 +251,13 @@ class TestCommand(unittest.TestCase):
         cmd = commands.Command(line, repos)
         cmd._Command__idx = 2
 
+        # as long as the repositories are unknown, the total is unknown
+        cmd.write_with_counter('SOME TEXT')
+        format_TerminalLine.return_value.write \
+            .assert_called_with("[3/?] SOME TEXT")
+
+        # once they are, it is shown
+        self.assertEqual(len(cmd.snapshot), 11)
         cmd.write_with_counter('SOME TEXT')
         format_TerminalLine.return_value.write \
             .assert_called_with("[03/11] SOME TEXT")
@@ -175,6 +301,11 @@ class TestCommand(unittest.TestCase):
         cmd = commands.Command(line, repos)
         cmd._Command__idx = 2
 
+        cmd.write_path_with_counter('/path/to/clone')
+        format_TerminalLine.return_value.write \
+            .assert_called_with("[3/?] /path/to/clone")
+
+        self.assertEqual(len(cmd.snapshot), 11)
         cmd.write_path_with_counter('/path/to/clone')
         format_TerminalLine.return_value.write \
             .assert_called_with("[03/11] /path/.../...")
@@ -254,3 +385,233 @@ class TestCommand(unittest.TestCase):
 
             # it should have been cleaned afterwards
             format_TerminalLine.return_value.clean.assert_called_with()
+
+    def test_parse_jobs(self):
+        """ Tests that the jobs option is extracted properly """
+
+        self.assertEqual(commands.Command.parse_jobs(), (1, []))
+        self.assertEqual(commands.Command.parse_jobs('pattern'),
+                         (1, ['pattern']))
+        self.assertEqual(commands.Command.parse_jobs('-j', '4', 'pattern'),
+                         (4, ['pattern']))
+        self.assertEqual(commands.Command.parse_jobs('pattern', '--jobs', '2'),
+                         (2, ['pattern']))
+        self.assertEqual(commands.Command.parse_jobs('--jobs=8', '--aggr'),
+                         (8, ['--aggr']))
+        self.assertEqual(commands.Command.parse_jobs('-j3'), (3, []))
+
+        with self.assertRaises(ValueError):
+            commands.Command.parse_jobs('-j')
+        with self.assertRaises(ValueError):
+            commands.Command.parse_jobs('--jobs', 'many')
+        with self.assertRaises(ValueError):
+            commands.Command.parse_jobs('-j', '0')
+
+    @unittest.mock.patch('GitManager.utils.format.TerminalLine')
+    @unittest.mock.patch('GitManager.commands.Command.write_path_with_counter')
+    @unittest.mock.patch('GitManager.commands.Command.parse')
+    def test_call_jobs(self,
+                       command_parse: unittest.mock.Mock,
+                       command_write_path_with_counter: unittest.mock.Mock,
+                       format_TerminalLine: unittest.mock.Mock):
+        """ Tests that running in parallel gives the same results """
+
+        line = format.TerminalLine()
+
+        repos = [
+            description.RepositoryDescription(
+                '/path/to/source', '/path/to/clone/{}'.format(i))
+            for i in range(20)
+        ]
+
+        def run_mock(repo):
+            return int(repo.path.split('/')[-1]) % 3 == 0
+
+        with unittest.mock.patch('GitManager.commands.Command.run',
+                                 side_effect=run_mock) as command_run:
+            cmd = commands.Command(line, repos, '--jobs', '4')
+            self.assertEqual(cmd.jobs, 4)
+            command_parse.assert_called_with()
+
+            # run the command
+            self.assertEqual(cmd(), 7)
+
+            # each of the repositories should have been run exactly once
+            self.assertEqual(sorted(c[0][0] for c in
+                                    command_run.call_args_list),
+                             sorted(repos))
+            self.assertEqual(command_write_path_with_counter.call_count, 20)
+
+    @unittest.mock.patch('GitManager.commands.Command.parse')
+    def test_call_jobs_output(self, command_parse: unittest.mock.Mock):
+        """ Tests that the output of repositories running in parallel does
+        not interleave """
+
+        stdout = io.StringIO()
+        line = format.TerminalLine(fd=stdout)
+
+        repos = [
+            description.RepositoryDescription(
+                '/path/to/source', '/path/to/clone/{}'.format(i))
+            for i in range(8)
+        ]
+
+        def run_mock(repo):
+            name = repo.local.path.split('/')[-1]
+
+            # output of git and messages of the command are collected
+            output = cmd.output
+            time.sleep(0.001)
+            output('git {0}\ngit {0}\n'.format(name))
+            cmd.write('message {}'.format(name))
+            return True
+
+        with unittest.mock.patch('GitManager.commands.Command.run',
+                                 side_effect=run_mock), \
+                unittest.mock.patch('sys.stdout', stdout):
+            cmd = commands.Command(line, repos, '-j', '4')
+            self.assertEqual(cmd(), 8)
+
+        # the total is only known once all repositories have been listed
+        lines = stdout.getvalue().replace('/?] ', '/8] ').split('\n')
+
+        # each block follows the repository it belongs to
+        for (i, repo) in enumerate(repos):
+            idx = lines.index('[{}/8] {}'.format(i + 1, repo.local.path))
+            self.assertEqual(lines[idx + 1:idx + 3], ['git {}'.format(i)] * 2)
+
+            idx = lines.index('[{}/8] {}'.format(i + 1, repo.local.path),
+                              idx + 1)
+            self.assertEqual(lines[idx + 1], 'message {}'.format(i))
+
+        # when running one at a time, git writes to the terminal directly
+        self.assertIsNone(commands.Command(line, repos).output)
+
+    def test_parse_host_jobs(self):
+        """ Tests that the host jobs options are extracted properly """
+
+        self.assertEqual(commands.Command.parse_host_jobs(), (None, {}, []))
+        self.assertEqual(
+            commands.Command.parse_host_jobs('--host-jobs', '2', 'pattern'),
+            (2, {}, ['pattern']))
+        self.assertEqual(
+            commands.Command.parse_host_jobs(
+                '--host-jobs=Git.Example.com=8', '--host-jobs', '4', '-j4'),
+            (4, {'git.example.com': 8}, ['-j4']))
+
+        with self.assertRaises(ValueError):
+            commands.Command.parse_host_jobs('--host-jobs')
+        with self.assertRaises(ValueError):
+            commands.Command.parse_host_jobs('--host-jobs', 'example.com')
+        with self.assertRaises(ValueError):
+            commands.Command.parse_host_jobs('--host-jobs', 'example.com=0')
+
+    @unittest.mock.patch('GitManager.utils.format.TerminalLine')
+    @unittest.mock.patch('GitManager.commands.Command.write_path_with_counter')
+    @unittest.mock.patch('GitManager.commands.Command.parse')
+    def test_call_host_jobs(self,
+                            command_parse: unittest.mock.Mock,
+                            command_write_path_with_counter:
+                            unittest.mock.Mock,
+                            format_TerminalLine: unittest.mock.Mock):
+        """ Tests that the number of jobs per host is limited """
+
+        line = format.TerminalLine()
+
+        repos = [
+            description.RepositoryDescription(
+                'git@{}:user/repo{}.git'.format(host, i),
+                '/path/to/clone/{}/{}'.format(host, i))
+            for host in ['a.example.com', 'B.example.com'] for i in range(6)
+        ]
+
+        lock = threading.Lock()
+        running = collections.Counter()
+        maximum = collections.Counter()
+
+        def run_mock(repo):
+            host = repo.remote.components()[0]
+            with lock:
+                running[host] += 1
+                maximum[host] = max(maximum[host], running[host])
+            time.sleep(0.01)
+            with lock:
+                running[host] -= 1
+            return True
+
+        with unittest.mock.patch('GitManager.commands.Command.run',
+                                 side_effect=run_mock), \
+                unittest.mock.patch('GitManager.commands.Command.NETWORK',
+                                    True):
+            cmd = commands.Command(line, repos, '-j', '4', '--host-jobs',
+                                   '1', '--host-jobs', 'b.example.com=2')
+            command_parse.assert_called_with()
+
+            self.assertEqual(cmd.host(repos[6]), 'b.example.com')
+            self.assertEqual(cmd.host_jobs('a.example.com'), 1)
+            self.assertEqual(cmd.host_jobs('b.example.com'), 2)
+
+            self.assertEqual(cmd(), 12)
+            self.assertEqual(maximum['a.example.com'], 1)
+            self.assertEqual(maximum['B.example.com'], 2)
+
+        # commands that do not use the network do not take the option
+        cmd = commands.Command(line, repos, '--host-jobs', '1')
+        command_parse.assert_called_with('--host-jobs', '1')
+        self.assertIsNone(cmd.host_jobs('a.example.com'))
+
+    def test_parse_multiplex(self):
+        """ Tests that the multiplex flag is extracted properly """
+
+        self.assertEqual(commands.Command.parse_multiplex(), (False, []))
+        self.assertEqual(commands.Command.parse_multiplex('pattern'),
+                         (False, ['pattern']))
+        self.assertEqual(
+            commands.Command.parse_multiplex('--ssh-multiplex', 'pattern'),
+            (True, ['pattern']))
+
+    @unittest.mock.patch('GitManager.utils.ssh.Multiplexer')
+    @unittest.mock.patch('GitManager.utils.format.TerminalLine')
+    @unittest.mock.patch('GitManager.commands.Command.parse')
+    def test_call_multiplex(self, command_parse: unittest.mock.Mock,
+                            format_TerminalLine: unittest.mock.Mock,
+                            ssh_Multiplexer: unittest.mock.Mock):
+        """ Tests that connections are shared while running """
+
+        format_TerminalLine.return_value.width = 100
+        line = format.TerminalLine()
+        repos = [
+            description.RepositoryDescription(
+                'git@github.com:hello/world.git', '/path/to/world'),
+        ]
+
+        multiplexer = ssh_Multiplexer.return_value.__enter__.return_value
+        multiplexer.environment.return_value = {'GIT_SSH_COMMAND': 'ssh'}
+
+        environments = []
+
+        def run_mock(repo):
+            environments.append(cmd.environment)
+            return True
+
+        with unittest.mock.patch('GitManager.commands.Command.run',
+                                 side_effect=run_mock), \
+                unittest.mock.patch('GitManager.commands.Command.NETWORK',
+                                    True):
+
+            # without the flag, the environment is inherited
+            cmd = commands.Command(line, repos)
+            self.assertFalse(cmd.multiplex)
+            self.assertEqual(cmd(), 1)
+            self.assertEqual(environments, [None])
+            ssh_Multiplexer.assert_not_called()
+
+            # with it, a multiplexer is used while running
+            cmd = commands.Command(line, repos, '--ssh-multiplex')
+            command_parse.assert_called_with()
+            self.assertTrue(cmd.multiplex)
+            self.assertEqual(cmd(), 1)
+            self.assertEqual(environments[1], {'GIT_SSH_COMMAND': 'ssh'})
+            ssh_Multiplexer.return_value.__exit__.assert_called_once_with(
+                None, None, None)
+            self.assertIsNone(cmd.environment)
@@ -33,4 +33,13 @@ class TestFetch(unittest.TestCase):
         implementation_LocalRepository.return_value.exists.return_value = True
         implementation_LocalRepository.return_value.fetch.return_value = True
         self.assertTrue(cmd.run(repo))
-        implementation_LocalRepository.return_value.fetch.assert_called_with()
+        implementation_LocalRepository.return_value.fetch.assert_called_with(
+            environment=None, if_changed=False, output=None)
+
+        # with --if-changed, only changed repositories are fetched
+        cmd = fetch.Fetch(line, [repo], '--if-changed')
+        self.assertTrue(cmd.if_changed)
+        self.assertEqual(cmd.repos, [repo])
+        self.assertTrue(cmd.run(repo))
+        implementation_LocalRepository.return_value.fetch.assert_called_with(
+            environment=None, if_changed=True, output=None)
@@ -33,7 +33,8 @@ class TestGC(unittest.TestCase):
         implementation_LocalRepository.return_value.exists.return_value = True
         implementation_LocalRepository.return_value.gc.return_value = True
         self.assertTrue(cmd.run(repo))
-        implementation_LocalRepository.return_value.gc.assert_called_with()
+        implementation_LocalRepository.return_value.gc.assert_called_with(
+            output=None)
 
         # reset the mock and create a new mock
         implementation_LocalRepository.reset_mock()
@@ -43,4 +44,4 @@ class TestGC(unittest.TestCase):
         implementation_LocalRepository.return_value.gc.return_value = True
         self.assertTrue(cmd.run(repo))
         implementation_LocalRepository.return_value.gc.assert_called_with(
-            '--aggressive')
+            '--aggressive', output=None)
@@ -32,4 +32,5 @@ class TestPull(unittest.TestCase):
         implementation_LocalRepository.return_value.exists.return_value = True
         implementation_LocalRepository.return_value.pull.return_value = True
         self.assertTrue(cmd.run(repo))
-        implementation_LocalRepository.return_value.pull.assert_called_with()
+        implementation_LocalRepository.return_value.pull.assert_called_with(
+            environment=None, output=None)
@@ -1,13 +1,47 @@
+import io
+import os
+import tempfile
 import unittest
 import unittest.mock
 
-from GitManager.commands import state
-from GitManager.repo import description
+from GitManager.commands import reconfigure
 from GitManager.utils import format
-from GitManager.repo import implementation
 
 
 class TestReconfigure(unittest.TestCase):
     """ Tests that the reconfigure command works properly """
 
-    pass
+    @unittest.mock.patch('builtins.print')
+    def test_scan_cache(self, builtins_print: unittest.mock.Mock):
+        """ Tests that each directory has its own scan cache, which is only
+        written when not simulating """
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = os.path.join(tmp, 'cache', 'gitmanager')
+            (a, b) = (os.path.join(tmp, 'a'), os.path.join(tmp, 'b'))
+            os.mkdir(a)
+            os.mkdir(b)
+
+            def run(*args):
+                f = unittest.mock.Mock()
+                f.ignores = []
+                f.lines = []
+                line = format.TerminalLine(fd=io.StringIO())
+                reconfigure.Reconfigure(line, f, *args)()
+
+            with unittest.mock.patch.dict(
+                    'os.environ', {'XDG_CACHE_HOME': os.path.dirname(cache)}):
+
+                # simulating does not write a cache
+                run('--simulate', a)
+                self.assertFalse(os.path.exists(cache))
+
+                # but scanning does, one for each directory
+                run(a)
+                self.assertEqual(len(os.listdir(cache)), 1)
+
+                run(os.path.join(b, '..', 'a'))
+                self.assertEqual(len(os.listdir(cache)), 1)
+
+                run(b)
+                self.assertEqual(len(os.listdir(cache)), 2)
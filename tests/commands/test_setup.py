@@ -42,4 +42,5 @@ class TestFetch(unittest.TestCase):
         self.assertTrue(cmd.run(repo))
         format_TerminalLine.return_value.linebreak.assert_called_with()
         implementation_RemoteRepository.return_value.clone \
-            .assert_called_with(repo.local)
+            .assert_called_with(repo.local, environment=None,
+                                output=None)
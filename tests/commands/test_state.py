@@ -27,13 +27,35 @@ class TestState(unittest.TestCase):
         # and a command instance
         cmd = state.State(line, [repo], "--no-update")
 
-        # if we are up-to-date, nothing should have been printed
-        implementation_LocalRepository.return_value.exists.return_value = True
-        implementation_LocalRepository.return_value.remote_status \
-            .return_value = implementation.RemoteStatus.UP_TO_DATE
+        # without updating, the repository is only probed
+        implementation_LocalRepository.return_value.probe.return_value = \
+            implementation.RepoProbe('/path/to/clone', 'aaaaaa', 'master',
+                                     'origin/master', 0, 0, ())
         self.assertTrue(cmd.run(repo))
         implementation_LocalRepository.return_value.remote_status \
-            .assert_called_with(False)
+            .assert_not_called()
+        builtins_print.assert_not_called()
+
+        # reset the mock
+        implementation_LocalRepository.reset_mock()
+        builtins_print.reset_mock()
+
+        # if the upstream is ahead, we need to pull
+        implementation_LocalRepository.return_value.probe.return_value = \
+            implementation.RepoProbe('/path/to/clone', 'aaaaaa', 'master',
+                                     'origin/master', 0, 2, ())
+        self.assertFalse(cmd.run(repo))
+        builtins_print.assert_called_with(
+            format.Format.yellow('Upstream is ahead of your branch, '
+                                 'pull required. '))
+
+        # reset the mock
+        implementation_LocalRepository.reset_mock()
+        builtins_print.reset_mock()
+
+        # if the local repository does not exist, we do nothing
+        implementation_LocalRepository.return_value.probe.return_value = None
+        self.assertFalse(cmd.run(repo))
         builtins_print.assert_not_called()
 
         # reset the mock
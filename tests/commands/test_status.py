@@ -1,8 +1,10 @@
+import threading
 import unittest
 import unittest.mock
 
 from GitManager.commands import status
 from GitManager.repo import description
+from GitManager.repo import implementation
 from GitManager.utils import format
 
 
@@ -26,11 +28,9 @@ class TestStatus(unittest.TestCase):
         cmd = status.Status(line, [repo])
 
         # if the local repository does not exist, do nothing
-        implementation_LocalRepository.return_value.exists.return_value = False
-        implementation_LocalRepository.return_value.path.return_value = \
-            '/path/to/clone'
+        implementation_LocalRepository.return_value.probe.return_value = None
         self.assertFalse(cmd.run(repo))
-        implementation_LocalRepository.exists.assert_not_called()
+        run_gitrun.assert_not_called()
 
         # reset the mock
         format_TerminalLine.reset_mock()
@@ -38,11 +38,9 @@ class TestStatus(unittest.TestCase):
         run_gitrun.reset_mock()
 
         # local repository exists, but is clean
-        implementation_LocalRepository.return_value.exists.return_value = True
-        implementation_LocalRepository.return_value.path.return_value = \
-            '/path/to/clone'
-        implementation_LocalRepository.return_value.local_status.return_value \
-            = ''
+        implementation_LocalRepository.return_value.probe.return_value = \
+            implementation.RepoProbe('/path/to/clone', 'aaaaaa', 'master',
+                                     None, None, None, ())
         self.assertTrue(cmd.run(repo))
         run_gitrun.assert_not_called()
 
@@ -52,13 +50,50 @@ class TestStatus(unittest.TestCase):
         run_gitrun.reset_mock()
 
         # local repository exists, but is not clean
-        implementation_LocalRepository.return_value.exists.return_value = True
         implementation_LocalRepository.return_value.path = \
             '/path/to/clone'
-        implementation_LocalRepository.return_value.local_status.return_value \
-            = 'M some/file'
+        implementation_LocalRepository.return_value.probe.return_value = \
+            implementation.RepoProbe('/path/to/clone', 'aaaaaa', 'master',
+                                     None, None, None,
+                                     ((' M', 'some/file'),))
         self.assertFalse(cmd.run(repo))
         format_TerminalLine.return_value.linebreak.assert_called_with()
         run_gitrun.assert_called_with('status', cwd='/path/to/clone',
                                       pipe_stdout=True)
-        run_gitrun.return_value.wait.assert_called_with()
+        run_gitrun.return_value.finish.assert_called_with(None)
+
+    @unittest.mock.patch(
+        'GitManager.repo.implementation.LocalRepository')
+    @unittest.mock.patch('GitManager.utils.format.TerminalLine')
+    @unittest.mock.patch('GitManager.utils.run.GitRun')
+    def test_call(self,
+                  run_gitrun: unittest.mock.Mock,
+                  format_TerminalLine: unittest.mock.Mock,
+                  implementation_LocalRepository: unittest.mock.Mock):
+        """ Tests that each repository is only probed once, by the tasks
+        running in parallel """
+
+        repo = description.RepositoryDescription('/path/to/source',
+                                                 '/path/to/clone')
+
+        format_TerminalLine.return_value.width = 100
+        implementation_LocalRepository.return_value.path = '/path/to/clone'
+        implementation_LocalRepository.return_value.probe.return_value = \
+            implementation.RepoProbe('/path/to/clone', 'aaaaaa', 'master',
+                                     None, None, None, ())
+
+        threads = []
+        implementation_LocalRepository.return_value.probe.side_effect = \
+            lambda: threads.append(threading.current_thread()) or \
+            implementation.RepoProbe('/path/to/clone', 'aaaaaa', 'master',
+                                     None, None, None, ())
+
+        line = format.TerminalLine()
+        cmd = status.Status(line, [repo], '-j', '2')
+
+        self.assertEqual(cmd(), 1)
+        implementation_LocalRepository.return_value.probe \
+            .assert_called_once_with()
+        implementation_LocalRepository.return_value.exists \
+            .assert_called_once_with()
+        self.assertIsNot(threads[0], threading.main_thread())
@@ -1,3 +1,7 @@
+import os
+import shutil
+import tempfile
+import time
 import unittest
 import unittest.mock
 
@@ -45,6 +49,97 @@ class TestFile(unittest.TestCase):
         for (actual, intended) in zip(fn.lines, expected):
             self.assertEqual(actual, intended, "line parsed properly")
 
+    def test_read_cache(self):
+        """ Tests that reading uses the cache of unchanged files """
+
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+
+        patcher = unittest.mock.patch.dict('os.environ', {
+            "XDG_CACHE_HOME": os.path.join(tmp, "cache")
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        fn = os.path.join(tmp, "config")
+        with open(fn, "w") as fp:
+            fp.write("##root\n> something\n hello world\n")
+        os.utime(fn, (time.time() - 10, time.time() - 10))
+
+        # the first read parses the file and creates the cache
+        first = file.File(fn)
+        first.read()
+        self.assertEqual(os.listdir(os.path.join(tmp, "cache", "gitmanager")),
+                         [os.path.basename(first._File__cache_path())])
+
+        # the second one only parses lines once they are needed
+        with unittest.mock.patch('GitManager.config.line.ConfigLine.parse',
+                                 side_effect=line.ConfigLine.parse) as parse:
+            second = file.File(fn)
+            second.read()
+
+            self.assertEqual(list(second.repositories),
+                             list(first.repositories))
+            self.assertEqual(second.root, first.root)
+            parse.assert_not_called()
+
+            self.assertEqual(second.lines, first.lines)
+            self.assertEqual(parse.call_count, 3)
+
+        # changing the file invalidates the cache
+        with open(fn, "a") as fp:
+            fp.write(" hello other\n")
+        os.utime(fn, (time.time() - 5, time.time() - 5))
+
+        third = file.File(fn)
+        third.read()
+        self.assertEqual(len(list(third.repositories)), 2)
+        self.assertEqual(third.lines[-1],
+                         line.RepoLine(' ', 'hello', ' ', 'other', ''))
+
+        # and a corrupted cache is ignored
+        with open(third._File__cache_path(), "wb") as fp:
+            fp.write(b"corrupted")
+
+        fourth = file.File(fn)
+        fourth.read()
+        self.assertEqual(fourth.lines, third.lines)
+        self.assertEqual(list(fourth.repositories),
+                         list(third.repositories))
+
+    def test_read_cache_racy(self):
+        """ Tests that files modified just before reading them are not
+        cached """
+
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+
+        patcher = unittest.mock.patch.dict('os.environ', {
+            "XDG_CACHE_HOME": os.path.join(tmp, "cache")
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        fn = os.path.join(tmp, "config")
+        with open(fn, "w") as fp:
+            fp.write("> something\n hello world\n")
+
+        first = file.File(fn)
+        first.read()
+        self.assertFalse(os.path.exists(first._File__cache_path()))
+
+        # a change of the same size within the same tick of the mtime is
+        # hence read properly
+        stat = os.stat(fn)
+        with open(fn, "w") as fp:
+            fp.write("> something\n hello there\n")
+        os.utime(fn, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        second = file.File(fn)
+        second.read()
+        self.assertEqual(second.lines[-1],
+                         line.RepoLine(' ', 'hello', ' ', 'there', ''))
+
     @unittest.mock.patch('builtins.open')
     def test_write(self, builtins_open: unittest.mock.Mock):
         """ Tests that writing lines works properly """
@@ -1,3 +1,4 @@
+import time
 import unittest
 
 from GitManager.config import line
@@ -24,6 +25,25 @@ class TestConfigLine(unittest.TestCase):
                          line.RootLine('\t ', ' ', '/folder', ' '),
                          'parsing comments with tabs')
 
+    def test_parse_IgnoreLine(self):
+        """ Tests that IgnoreLines can be properly parsed """
+
+        self.assertEqual(line.ConfigLine.parse('#ignore:node_modules'),
+                         line.IgnoreLine('', '', 'node_modules', ''),
+                         'parsing ignore directive')
+
+        self.assertEqual(line.ConfigLine.parse('\t #ignore: build* '),
+                         line.IgnoreLine('\t ', ' ', 'build*', ' '),
+                         'parsing ignore directive with tabs')
+
+        self.assertEqual(line.ConfigLine.parse('#ignore: a b'),
+                         line.NOPLine('#ignore: a b'),
+                         'parsing ignore directive with two patterns')
+
+        self.assertEqual(line.ConfigLine.parse('#! important!'),
+                         line.NOPLine('#! important!'),
+                         'parsing comments that are not ignore directives')
+
     def test_parse_NOPLine(self):
         """ Tests that NOPLines can be correctly parsed """
 
@@ -98,6 +118,37 @@ class TestConfigLine(unittest.TestCase):
         with self.assertRaises(ValueError):
             line.ConfigLine.parse(">> hello world #things")
 
+    def test_parse_benchmark(self):
+        """ Tests that a large configuration file is parsed quickly """
+
+        # a synthetic configuration file with 100k lines
+        lines = []
+        for i in range(100000):
+            kind = i % 20
+            if kind == 0:
+                lines.append('> group{}'.format(i))
+            elif kind == 1:
+                lines.append('# comment {}'.format(i))
+            elif kind == 2:
+                lines.append('')
+            elif kind % 3 == 0:
+                lines.append('  git@example.com:org/repo{}.git  name{}'
+                             .format(i, i))
+            else:
+                lines.append('  git@example.com:org/repo{}.git'.format(i))
+
+        start = time.perf_counter()
+        parsed = [line.ConfigLine.parse(l) for l in lines]
+        duration = time.perf_counter() - start
+
+        self.assertEqual([l.write() for l in parsed], lines)
+        self.assertLess(duration, 10, 'parsing 100k lines takes less than '
+                                      '10 seconds')
+
+        # lines do not have a __dict__ and share their whitespace
+        self.assertFalse(hasattr(parsed[3], '__dict__'))
+        self.assertIs(parsed[3].indent, parsed[4].indent)
+
 
 class TestRootLine(unittest.TestCase):
     """ Tests that RootLine class works properly """
@@ -138,6 +189,40 @@ class TestRootLine(unittest.TestCase):
                          'folder', 'root of root line')
 
 
+class TestIgnoreLine(unittest.TestCase):
+    """ Tests that IgnoreLine class works properly """
+
+    def test_eq(self):
+        """ Checks that equality between IgnoreLines works properly """
+
+        self.assertEqual(line.IgnoreLine('', ' ', 'build', ''),
+                         line.IgnoreLine('', ' ', 'build', ''),
+                         'equality of ignore lines')
+
+        self.assertNotEqual(line.IgnoreLine('', ' ', 'build', ''),
+                            line.IgnoreLine('', '', 'build', ''),
+                            'inequality of ignore lines')
+
+        self.assertNotEqual(line.IgnoreLine('', '', 'root', ''),
+                            line.RootLine('', '', 'root', ''),
+                            'inequality of ignore and root lines')
+
+    def test_write(self):
+        """ Tests that writing IgnoreLines works properly """
+
+        self.assertEqual(line.IgnoreLine('', ' ', 'build', '').write(),
+                         '#ignore: build', 'writing ignore line')
+
+        self.assertEqual(line.IgnoreLine('\t ', '', '*/out', ' ').write(),
+                         '\t #ignore:*/out ', 'writing ignore line')
+
+    def test_pattern(self):
+        """ Tests that the pattern attribute is read correctly """
+
+        self.assertEqual(line.IgnoreLine('', ' ', 'build', '').pattern,
+                         'build', 'pattern of ignore line')
+
+
 class TestNOPLine(unittest.TestCase):
     """ Tests that NOPLine class works properly """
 
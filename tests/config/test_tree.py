@@ -1,3 +1,4 @@
+import time
 import unittest
 import unittest.mock
 
@@ -721,6 +722,39 @@ class TestTree(unittest.TestCase):
         for (r, a) in zip(results, actual):
             self.assertEqual(r, a)
 
+        # and using several patterns
+        self.assertEqual(list(t.find('*world', '!*else*')), [
+            d.RepositoryDescription(source='something/world',
+                                    path='/path/to/home/something/world')
+        ])
+
+    @unittest.mock.patch('os.path.expanduser',
+                         side_effect=lambda s: s.replace("~",
+                                                         "/path/to/home/"))
+    def test_find_remote(self, os_path_expanduser: unittest.mock.Mock):
+        """ Tests that repositories are found by their remote """
+
+        t = tree.Tree()
+        t.lines = [
+            line.RepoLine(' ', 'git@github.com:hello/world.git', '', '', ''),
+            line.RepoLine(' ', 'https://github.com/hello/world', ' ',
+                          'other', ''),
+        ]
+
+        world = d.RepositoryDescription('git@github.com:hello/world.git',
+                                        '/path/to/home/world')
+
+        self.assertEqual(t.find_remote('https://github.com/hello/world'),
+                         world)
+        self.assertIsNone(t.find_remote('https://github.com/hello/mars'))
+
+        # the cache is updated when the tree changes
+        mars = d.RepositoryDescription('git@github.com:hello/mars.git',
+                                       '/path/to/home/mars')
+        t.insert_repo_or_get(mars)
+        self.assertEqual(t.find_remote('https://github.com/hello/mars'),
+                         mars)
+
     @unittest.mock.patch('os.path.expanduser',
                          side_effect=lambda s: s.replace("~",
                                                          "/path/to/home/"))
@@ -764,3 +798,168 @@ class TestTree(unittest.TestCase):
         t.lines = [line.RootLine('', '', '/opt/root', '')]
         t.rebuild()
         self.assertEqual(t.lines, [line.RootLine('', '', '/opt/root', '')])
+
+        t = tree.Tree()
+        t.lines = [
+            line.BaseLine('', 1, ' ', 'base1', ''),
+            line.IgnoreLine('  ', '', 'build', ''),
+            line.RepoLine('  ', 'git@example.com:/example/repo', ' ',
+                          'example-repo', ''),
+        ]
+        t.rebuild()
+        self.assertEqual(t.lines, [
+            line.IgnoreLine('', ' ', 'build', ''),
+            line.BaseLine(' ', 1, ' ', 'base1', ''),
+            line.RepoLine('  ', 'git@example.com:/example/repo', ' ',
+                          'example-repo', ''),
+        ], 'keep ignored patterns')
+
+    def test_ignores(self):
+        """ Tests that the ignored patterns are read properly """
+
+        t = tree.Tree()
+        t.lines = [
+            line.IgnoreLine('', ' ', 'node_modules', ''),
+            line.NOPLine('# comment'),
+            line.BaseLine('', 1, ' ', 'base', ''),
+            line.IgnoreLine('  ', ' ', '*/build', ''),
+        ]
+
+        self.assertEqual(t.ignores, ['node_modules', '*/build'])
+
+    @unittest.mock.patch('os.path.expanduser',
+                         side_effect=lambda s: s.replace("~",
+                                                         "/path/to/home/"))
+    def test_index_incremental(self, os_path_expanduser: unittest.mock.Mock):
+        """ Tests that the index is kept up-to-date when changing a tree """
+
+        def assert_consistent(t: tree.Tree):
+            # a fresh tree with the same lines
+            fresh = tree.Tree()
+            fresh.lines = list(t.lines)
+
+            first = {}
+            for (i, dd) in fresh.descriptions:
+                first.setdefault(dd, i)
+
+            for (dd, i) in first.items():
+                self.assertEqual(t.index(dd), i)
+            self.assertEqual(list(t.descriptions), list(fresh.descriptions))
+
+        t = tree.Tree()
+        t.lines = [
+            line.NOPLine("# comment"),
+            line.RepoLine(' ', 'git@example.com:/example/top', '', '', ''),
+            line.BaseLine(' ', 1, ' ', 'base1', ''),
+            line.RepoLine('  ', 'git@example.com:/example/repo', ' ',
+                          'example-repo', ''),
+        ]
+
+        paths = ['base1/a/b/one', 'two', 'base1/three', 'base2/four',
+                 'base1/a/five', 'base2/x/y/six', 'base1/a/b/c/seven',
+                 'base1/eight']
+        for (i, pth) in enumerate(paths):
+            name = pth.split('/')[-1]
+            r = d.RepositoryDescription(
+                'git@example.com:/example/{}'.format(name),
+                '/path/to/home/{}'.format(pth))
+
+            self.assertFalse(t.contains(r))
+            idx = t.insert_repo_or_get(r)
+            self.assertEqual(t.index(r), idx)
+            self.assertTrue(t.contains(r))
+            assert_consistent(t)
+
+        # remove some of them again
+        for pth in ['base1/three', 'two', 'base1/a/b/c/seven', 'nothing']:
+            t.remove_local(LocalRepository('/path/to/home/{}'.format(pth)))
+            assert_consistent(t)
+
+        # removing the first of a duplicate repository finds the second
+        dup = d.RepositoryDescription('git@example.com:/example/top',
+                                      '/path/to/home/top')
+        t.lines = t.lines[:2] + [
+            line.RepoLine(' ', 'git@example.com:/example/top', '', '', '')
+        ] + t.lines[2:]
+        first = t.index(dup)
+        self.assertTrue(t.remove_local(LocalRepository('/path/to/home/top')))
+        self.assertEqual(t.index(dup), first)
+        assert_consistent(t)
+
+    def test_insert_scaling(self):
+        """ Tests that the time to insert repositories grows linearly with
+        their number """
+
+        def insert(n: int) -> float:
+            t = tree.Tree()
+
+            # spread the repositories over groups in an unordered way
+            repos = []
+            for j in range(n):
+                i = (7919 * j) % n
+                repos.append(d.RepositoryDescription(
+                    'git@example.com:user{}/repo{}'.format(i % 97, i),
+                    '{}/src/host{}/user{}/repo{}'.format(
+                        t.root, i % 3, i % 97, i)))
+
+            start = time.perf_counter()
+            for r in repos:
+                t.insert_repo_or_get(r)
+            duration = time.perf_counter() - start
+
+            self.assertEqual(len(list(t.repositories)), n)
+            return duration
+
+        small = min(insert(2000) for _ in range(2))
+        large = min(insert(8000) for _ in range(2))
+
+        # four times as many repositories would take sixteen times as long if
+        # every insert was linear
+        self.assertLess(large, 8 * small,
+                        'inserting repositories is not quadratic')
+
+    @unittest.mock.patch('os.path.expanduser',
+                         side_effect=lambda s: s.replace("~",
+                                                         "/path/to/home/"))
+    def test_rebuild_grouped(self, os_path_expanduser: unittest.mock.Mock):
+        """ Tests that rebuilding gives the same lines as inserting each
+        repository """
+
+        paths = ['/path/to/home/base1/a/b/one', '/path/to/home/two',
+                 '/path/to/home/base1/three', '/opt/four',
+                 '/path/to/home/base1/a/five', '/path/to/home2/x/six',
+                 '/path/to/home/base1/three', '/path/to/home/base2/seven',
+                 '/opt/sub/eight', '/path/to/home/base1/a/b/c/nine',
+                 '/path/to/home/base1/ten', '/path/to/home/other-name']
+
+        repos = [d.RepositoryDescription(
+            'git@example.com:/example/{}'.format(pth.split('/')[-1]), pth)
+            for pth in paths]
+        repos.append(d.RepositoryDescription(
+            'git@example.com:/example/renamed', paths[-1]))
+
+        # insert all of the repositories one-by-one
+        expected = tree.Tree()
+        expected.lines = [line.RootLine('', '', 'root', '')]
+        for r in repos:
+            expected.insert_repo_or_get(r)
+
+        # and rebuild a shuffled tree with the same repositories
+        t = tree.Tree()
+        t.lines = [line.RootLine('', '', 'root', '')] + [
+            line.RepoLine('   ', r.source, ' ', r.path, '') for r in repos]
+        t.rebuild()
+
+        self.assertEqual(t.lines, expected.lines)
+        self.assertEqual(list(t.repositories), list(expected.repositories))
+
+        # paths that can not be written exactly are inserted one-by-one
+        r = d.RepositoryDescription('git@example.com:/example/repo',
+                                    '/opt//repo')
+        expected = tree.Tree()
+        expected.insert_repo_or_get(r)
+
+        t = tree.Tree()
+        t.lines = [line.RepoLine(' ', r.source, ' ', r.path, '')]
+        t.rebuild()
+        self.assertEqual(t.lines, expected.lines)
@@ -63,6 +63,23 @@ class TestRepositoryDescription(unittest.TestCase):
                          implementation.RemoteRepository(
                              'git@github.com:/example/remote'))
 
+    def test_memoized(self):
+        """ Tests that the local and remote repositories are created once """
+
+        desc = description.RepositoryDescription(
+            'git@github.com:/example/remote', '/path/to/local')
+
+        self.assertIs(desc.local, desc.local)
+        self.assertIs(desc.remote, desc.remote)
+
+        # they do not change equality or hashing
+        other = description.RepositoryDescription(
+            'git@github.com:/example/remote', '/path/to/local')
+        self.assertEqual(desc, other)
+        self.assertEqual(hash(desc), hash(other))
+        self.assertEqual(tuple(desc), ('git@github.com:/example/remote',
+                                       '/path/to/local'))
+
     def test_to_repo_line(self):
         desc1 = description.RepositoryDescription(
             'git@github.com:/example/remote/repo', '/path/to/local/repo')
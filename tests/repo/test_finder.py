@@ -1,3 +1,6 @@
+import os
+import tempfile
+import time
 import unittest
 import unittest.mock
 
@@ -7,13 +10,13 @@ from GitManager.repo import finder, description
 class TestFinder(unittest.TestCase):
     """ Tests that the Finder() class works correctly """
 
-    @unittest.mock.patch("os.listdir")
+    @unittest.mock.patch("os.scandir")
     @unittest.mock.patch("os.path")
     @unittest.mock.patch("GitManager.repo.finder.Finder.get_from_path")
     def test_find_recursive(self,
                             Finder_get_from_path: unittest.mock.Mock,
                             os_path: unittest.mock.Mock,
-                            os_listdir: unittest.mock.Mock):
+                            os_scandir: unittest.mock.Mock):
         """ Tests that the find_recursive method works correctly """
 
         # Setup all the mocks
@@ -40,9 +43,18 @@ class TestFinder(unittest.TestCase):
         def join_mock(*args):
             return '/'.join(args).replace('//', '/')
 
+        def scandir_mock(d):
+            entries = []
+            for name in listings[d]:
+                entry = unittest.mock.Mock()
+                entry.name = name
+                entry.is_dir.return_value = join_mock(d, name) in dirs
+                entry.is_symlink.return_value = join_mock(d, name) in links
+                entries.append(entry)
+            return entries
+
         os_path.islink.side_effect = lambda l: l in links
-        os_path.isdir.side_effect = lambda d: d in dirs
-        os_listdir.side_effect = lambda d: listings[d]
+        os_scandir.side_effect = scandir_mock
         os_path.join.side_effect = join_mock
 
         def frompath_mock(path):
@@ -130,6 +142,196 @@ class TestFinder(unittest.TestCase):
                              )
                          ])
 
+        # the callback is called for each scanned directory, in order
+        scanned = []
+        os_path.islink.reset_mock()
+        list(finder.Finder.find_recursive('/', callback=scanned.append))
+        self.assertEqual(scanned, ['/', '/link', '/folder'])
+
+        # and only the top-level path is checked for being a link
+        os_path.islink.assert_called_once_with('/')
+
+        # scanning in parallel gives the same results in the same order
+        for allow_links in [False, True]:
+            for continue_in_repository in [False, True]:
+                self.assertEqual(
+                    list(finder.Finder.find_recursive(
+                        '/', allow_links=allow_links,
+                        continue_in_repository=continue_in_repository,
+                        jobs=4)),
+                    list(finder.Finder.find_recursive(
+                        '/', allow_links=allow_links,
+                        continue_in_repository=continue_in_repository)))
+
+        # and calls the callback in the same order
+        scanned = []
+        list(finder.Finder.find_recursive('/', callback=scanned.append,
+                                          jobs=4))
+        self.assertEqual(scanned, ['/', '/link', '/folder'])
+
+    @unittest.mock.patch("GitManager.repo.finder.Finder.get_from_path")
+    def test_find_recursive_cycles(self,
+                                   Finder_get_from_path: unittest.mock.Mock):
+        """ Tests that find_recursive visits every directory only once when
+        following links """
+
+        Finder_get_from_path.side_effect = ValueError()
+
+        with tempfile.TemporaryDirectory() as root:
+            # /a/b, with /a/b/up pointing back to /a and /a/b/self to /a/b
+            os.makedirs(os.path.join(root, 'a', 'b'))
+            os.symlink(os.path.join(root, 'a'),
+                       os.path.join(root, 'a', 'b', 'up'))
+            os.symlink(os.path.join(root, 'a', 'b'),
+                       os.path.join(root, 'a', 'b', 'self'))
+
+            for jobs in [1, 4]:
+                scanned = []
+                duplicates = []
+                list(finder.Finder.find_recursive(
+                    root, allow_links=True, callback=scanned.append,
+                    duplicate_callback=duplicates.append, jobs=jobs))
+
+                # the links are scanned, but not followed any further
+                self.assertEqual(scanned[:3], [
+                    root,
+                    os.path.join(root, 'a'),
+                    os.path.join(root, 'a', 'b'),
+                ])
+                self.assertEqual(sorted(scanned[3:]), [
+                    os.path.join(root, 'a', 'b', 'self'),
+                    os.path.join(root, 'a', 'b', 'up'),
+                ])
+                self.assertEqual(sorted(duplicates), sorted(scanned[3:]))
+
+    @unittest.mock.patch("GitManager.repo.finder.Finder.get_from_path")
+    def test_find_recursive_prune(self,
+                                  Finder_get_from_path: unittest.mock.Mock):
+        """ Tests that find_recursive does not search pruned directories """
+
+        Finder_get_from_path.side_effect = ValueError()
+
+        with tempfile.TemporaryDirectory() as root:
+            for d in ['a/node_modules/x', 'a/b/out', 'c/out']:
+                os.makedirs(os.path.join(root, *d.split('/')))
+
+            def scan(jobs=1, **kwargs):
+                scanned = []
+                list(finder.Finder.find_recursive(
+                    root, callback=scanned.append,
+                    prune=finder.Prune(**kwargs), jobs=jobs))
+                return sorted(os.path.relpath(s, root) for s in scanned)
+
+            for jobs in [1, 4]:
+                self.assertEqual(scan(jobs), [
+                    '.', 'a', 'a/b', 'a/b/out', 'a/node_modules',
+                    'a/node_modules/x', 'c', 'c/out'
+                ], 'no pruning')
+
+                self.assertEqual(scan(jobs, ignore=['node_*', 'c']), [
+                    '.', 'a', 'a/b', 'a/b/out'
+                ], 'ignoring names')
+
+                self.assertEqual(scan(jobs, ignore=['*/b/out']), [
+                    '.', 'a', 'a/b', 'a/node_modules',
+                    'a/node_modules/x', 'c', 'c/out'
+                ], 'ignoring paths')
+
+                self.assertEqual(scan(jobs, max_depth=1), ['.', 'a', 'c'],
+                                 'limiting depth')
+
+                self.assertEqual(scan(jobs, max_depth=0), ['.'],
+                                 'limiting depth to the root')
+
+            # pretend that 'c' is a mount point
+            device = os.stat(root).st_dev
+            stat = os.stat
+
+            def stat_mock(path, *args, **kwargs):
+                result = stat(path, *args, **kwargs)
+                if path.startswith(os.path.join(root, 'c')):
+                    return unittest.mock.Mock(st_dev=device + 1,
+                                              st_ino=result.st_ino)
+                return result
+
+            with unittest.mock.patch('os.stat', side_effect=stat_mock):
+                self.assertEqual(scan(one_file_system=True), [
+                    '.', 'a', 'a/b', 'a/b/out', 'a/node_modules',
+                    'a/node_modules/x'
+                ], 'staying on one file system')
+
+    @unittest.mock.patch("GitManager.repo.finder.Finder.get_from_path")
+    def test_find_recursive_cache(self,
+                                  Finder_get_from_path: unittest.mock.Mock):
+        """ Tests that find_recursive only scans changed directories when
+        given a cache """
+
+        def frompath_mock(path):
+            if os.path.basename(path) == 'repo':
+                return description.RepositoryDescription(
+                    'git@example.com:repo', path)
+            raise ValueError()
+
+        Finder_get_from_path.side_effect = frompath_mock
+
+        with tempfile.TemporaryDirectory() as root:
+            for d in ['a/repo/sub', 'b/c']:
+                os.makedirs(os.path.join(root, *d.split('/')))
+
+            # make modified directories old enough to be cached
+            def age():
+                old = time.time() - 100
+                for (d, _, _) in os.walk(root):
+                    if os.stat(d).st_mtime > old:
+                        os.utime(d, (old, old))
+            age()
+
+            fn = os.path.join(root, 'cache')
+
+            def scan(jobs=1):
+                cache = finder.ScanCache(fn)
+                cache.read()
+                Finder_get_from_path.reset_mock()
+
+                repos = list(finder.Finder.find_recursive(
+                    os.path.join(root, 'a'), cache=cache, jobs=jobs))
+                repos += list(finder.Finder.find_recursive(
+                    os.path.join(root, 'b'), cache=cache, jobs=jobs))
+
+                cache.write(os.path.join(root, 'b'))
+                probed = sorted(
+                    os.path.relpath(c[0][0], root)
+                    for c in Finder_get_from_path.call_args_list)
+
+                return repos, probed
+
+            repos = [description.RepositoryDescription(
+                'git@example.com:repo', os.path.join(root, 'a', 'repo'))]
+
+            # the first scan probes every directory
+            self.assertEqual(scan(), (repos, ['a', 'a/repo', 'b', 'b/c']))
+
+            # the second scan does not probe anything
+            for jobs in [1, 4]:
+                self.assertEqual(scan(jobs), (repos, []))
+
+            # a new directory only probes the changed parent and itself
+            os.makedirs(os.path.join(root, 'b', 'd'))
+            age()
+            self.assertEqual(scan(), (repos, ['b', 'b/d']))
+            self.assertEqual(scan(), (repos, []))
+
+            # recently modified directories are not cached
+            os.makedirs(os.path.join(root, 'b', 'e'))
+            self.assertEqual(scan(), (repos, ['b', 'b/e']))
+            self.assertEqual(scan(), (repos, ['b', 'b/e']))
+
+            # a corrupted cache is ignored
+            with open(fn, 'wb') as fp:
+                fp.write(b'corrupted')
+            self.assertEqual(scan()[1], ['a', 'a/repo', 'b', 'b/c', 'b/d',
+                                         'b/e'])
+
     @unittest.mock.patch("GitManager.repo.implementation.LocalRepository")
     def test_get_from_path(self,
                            implementation_LocalRepository: unittest.mock.Mock):
@@ -0,0 +1,360 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+
+from GitManager.repo import gitdir, implementation
+
+OID_A = 'a' * 40
+OID_B = 'b' * 40
+OID_C = 'c' * 40
+
+
+def make_file(path: str, content: str):
+    """ Creates a file with the given content, including parent folders """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fp:
+        fp.write(content)
+
+
+def make_gitdir(path: str, config: str = '') -> str:
+    """ Creates a minimal git directory """
+
+    os.makedirs(os.path.join(path, 'objects'))
+    os.makedirs(os.path.join(path, 'refs', 'heads'))
+    make_file(os.path.join(path, 'HEAD'), 'ref: refs/heads/master\n')
+    make_file(os.path.join(path, 'config'), config)
+    return path
+
+
+class TestConfig(unittest.TestCase):
+    """ Tests that the Config class works properly """
+
+    def test_parse(self):
+        """ Tests that configuration files are parsed properly """
+
+        config = gitdir.Config.parse('\n'.join([
+            '# a comment',
+            '[core]',
+            '\tbare = false ; another comment',
+            '\tFileMode',
+            '[remote "origin"]',
+            '\turl = git@example.com:hello/world.git',
+            '\tfetch = +refs/heads/*:refs/remotes/origin/*',
+            '[Remote "Up\\"stream"] url = "/some path"  # trailing',
+            '[branch.master]',
+            '\tremote = origin',
+            '\tmerge = refs/heads/\\',
+            'master',
+            '[alias]',
+            '\tsay = "echo \\"hi\\"\\t;"  ',
+        ]))
+
+        self.assertEqual(config.entries, [
+            ('core', None, 'bare', 'false'),
+            ('core', None, 'filemode', 'true'),
+            ('remote', 'origin', 'url', 'git@example.com:hello/world.git'),
+            ('remote', 'origin', 'fetch',
+             '+refs/heads/*:refs/remotes/origin/*'),
+            ('remote', 'Up"stream', 'url', '/some path'),
+            ('branch', 'master', 'remote', 'origin'),
+            ('branch', 'master', 'merge', 'refs/heads/master'),
+            ('alias', None, 'say', 'echo "hi"\t;'),
+        ])
+
+        self.assertEqual(config.get_all('remote', 'origin', 'url'),
+                         ['git@example.com:hello/world.git'])
+
+    def test_parse_unsupported(self):
+        """ Tests that unsupported files raise an UnsupportedError """
+
+        for content in ['key = value', '[include]\npath = other',
+                        '[section', '[core]\n= value',
+                        '[core]\nkey = "unterminated']:
+            with self.assertRaises(gitdir.UnsupportedError):
+                gitdir.Config.parse(content)
+
+
+class TestPackedRefs(unittest.TestCase):
+    """ Tests that the PackedRefs class works properly """
+
+    def test_get(self):
+        """ Tests that references are found properly """
+
+        refs = gitdir.PackedRefs('\n'.join([
+            '# pack-refs with: peeled fully-peeled sorted ',
+            '{} refs/heads/master'.format(OID_A),
+            '{} refs/heads/master-2'.format(OID_B),
+            '{} refs/tags/v1'.format(OID_C),
+            '^{}'.format(OID_A),
+            '{} refs/remotes/origin/master'.format(OID_B),
+        ]).encode('utf-8'))
+
+        self.assertEqual(refs.get('refs/heads/master'), OID_A)
+        self.assertEqual(refs.get('refs/heads/master-2'), OID_B)
+        self.assertEqual(refs.get('refs/tags/v1'), OID_C)
+        self.assertEqual(refs.get('refs/remotes/origin/master'), OID_B)
+        self.assertIsNone(refs.get('refs/heads/mast'))
+        self.assertIsNone(refs.get('refs/heads/other'))
+
+        self.assertEqual(list(refs.items()), [
+            ('refs/heads/master', OID_A),
+            ('refs/heads/master-2', OID_B),
+            ('refs/tags/v1', OID_C),
+            ('refs/remotes/origin/master', OID_B),
+        ])
+
+    def test_read(self):
+        """ Tests that packed-refs are read and cached properly """
+
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+
+        path = os.path.join(tmp, 'packed-refs')
+        make_file(path, '')
+        self.assertIsNone(gitdir.cached(path, gitdir.PackedRefs.read)
+                          .get('refs/heads/master'))
+
+        make_file(path, '{} refs/heads/master\n'.format(OID_A))
+        refs = gitdir.cached(path, gitdir.PackedRefs.read)
+        self.assertEqual(refs.get('refs/heads/master'), OID_A)
+
+        # an unchanged file is re-used
+        self.assertIs(gitdir.cached(path, gitdir.PackedRefs.read), refs)
+
+        # and a missing file gives None
+        self.assertIsNone(gitdir.cached(os.path.join(tmp, 'missing'),
+                                        gitdir.PackedRefs.read))
+
+    @unittest.skipIf(not os.path.isdir('/proc/self/fd'),
+                     'open files can not be counted')
+    def test_read_many(self):
+        """ Tests that reading many packed-refs files keeps no files open and
+        only remembers a bounded number of them """
+
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+
+        def open_files() -> int:
+            return len(os.listdir('/proc/self/fd'))
+
+        before = open_files()
+
+        with unittest.mock.patch('GitManager.repo.gitdir.CACHE_SIZE', 100):
+            for i in range(300):
+                path = os.path.join(tmp, str(i), 'packed-refs')
+                make_file(path, '{} refs/heads/master\n'.format(OID_A))
+                self.assertEqual(gitdir.cached(path, gitdir.PackedRefs.read)
+                                 .get('refs/heads/master'), OID_A)
+
+            self.assertLessEqual(len(gitdir._cache), 100)
+
+        self.assertEqual(open_files(), before)
+
+
+class TestGitDir(unittest.TestCase):
+    """ Tests that the GitDir class works properly """
+
+    def setUp(self):
+        self.tmp = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+        # do not read any global configuration
+        patcher = unittest.mock.patch(
+            'GitManager.repo.gitdir.GitDir.global_config_paths',
+            return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.path = os.path.join(self.tmp, 'repo')
+        make_gitdir(os.path.join(self.path, '.git'), '\n'.join([
+            '[core]',
+            '\tbare = false',
+            '[remote "origin"]',
+            '\turl = git@example.com:hello/world.git',
+            '\tfetch = +refs/heads/*:refs/remotes/origin/*',
+            '[remote "backup"]',
+            '\tfetch = +refs/heads/*:refs/backup/*',
+            '[branch "master"]',
+            '\tremote = origin',
+            '\tmerge = refs/heads/master',
+            '[branch "local"]',
+            '\tremote = .',
+            '\tmerge = refs/heads/master',
+            '',
+        ]))
+
+        make_file(os.path.join(self.path, '.git', 'refs', 'heads', 'master'),
+                  OID_A + '\n')
+        make_file(os.path.join(self.path, '.git', 'packed-refs'), '\n'.join([
+            '{} refs/heads/local'.format(OID_B),
+            '{} refs/heads/master'.format(OID_C),
+            '{} refs/remotes/origin/master'.format(OID_B),
+            '',
+        ]))
+
+    def test_find(self):
+        """ Tests that repositories are found properly """
+
+        repo = gitdir.GitDir.find(self.path)
+        self.assertEqual(repo.worktree, self.path)
+        self.assertEqual(repo.gitdir, os.path.join(self.path, '.git'))
+        self.assertEqual(repo.commondir, os.path.join(self.path, '.git'))
+
+        # no repository
+        self.assertIsNone(gitdir.GitDir.find(self.tmp))
+
+        # a linked worktree
+        worktree = os.path.join(self.tmp, 'worktree')
+        linked = os.path.join(self.path, '.git', 'worktrees', 'worktree')
+        make_file(os.path.join(worktree, '.git'), 'gitdir: {}\n'.format(
+            linked))
+        make_file(os.path.join(linked, 'HEAD'), OID_B + '\n')
+        make_file(os.path.join(linked, 'commondir'), '../..\n')
+
+        repo = gitdir.GitDir.find(worktree)
+        self.assertEqual(repo.gitdir, linked)
+        self.assertEqual(repo.commondir, os.path.join(self.path, '.git'))
+
+        # invalid repositories can not be read
+        invalid = os.path.join(self.tmp, 'invalid')
+        make_file(os.path.join(invalid, '.git'), 'something else')
+        with self.assertRaises(gitdir.UnsupportedError):
+            gitdir.GitDir.find(invalid)
+
+        # and neither can repositories with a custom work tree
+        custom = os.path.join(self.tmp, 'custom')
+        make_gitdir(os.path.join(custom, '.git'),
+                    '[core]\n\tworktree = /somewhere/else\n')
+        with self.assertRaises(gitdir.UnsupportedError):
+            gitdir.GitDir.find(custom)
+
+        # or when the environment changes things
+        with unittest.mock.patch.dict('os.environ', {'GIT_DIR': '/'}):
+            with self.assertRaises(gitdir.UnsupportedError):
+                gitdir.GitDir.find(self.path)
+
+    def test_refs(self):
+        """ Tests that references are read properly """
+
+        repo = gitdir.GitDir.find(self.path)
+
+        # symbolic references
+        self.assertEqual(repo.symbolic_ref('HEAD'), 'refs/heads/master')
+        self.assertIsNone(repo.symbolic_ref('refs/heads/master'))
+        self.assertIsNone(repo.symbolic_ref('refs/heads/missing'))
+
+        # loose refs take precedence over packed ones
+        self.assertEqual(repo.resolve('HEAD'), OID_A)
+        self.assertEqual(repo.resolve('refs/heads/master'), OID_A)
+        self.assertEqual(repo.resolve('refs/heads/local'), OID_B)
+        self.assertIsNone(repo.resolve('refs/heads/missing'))
+
+        with self.assertRaises(gitdir.UnsupportedError):
+            repo.resolve('refs/heads/../../config')
+
+        # shortening
+        self.assertEqual(repo.shorten_ref('refs/heads/master'), 'master')
+        self.assertEqual(repo.shorten_ref('refs/remotes/origin/master'),
+                         'origin/master')
+
+        # an ambiguous short name is not used
+        make_file(os.path.join(self.path, '.git', 'refs', 'tags', 'origin',
+                               'master'), OID_A + '\n')
+        self.assertEqual(repo.shorten_ref('refs/remotes/origin/master'),
+                         'remotes/origin/master')
+
+    @unittest.skipIf(shutil.which('git') is None, 'git is not installed')
+    def test_shorten_ref_git(self):
+        """ Tests that references are shortened like git does """
+
+        path = os.path.join(self.tmp, 'real')
+        env = dict(os.environ, HOME=self.tmp, XDG_CONFIG_HOME=self.tmp,
+                   GIT_CONFIG_NOSYSTEM='1')
+
+        def git(*args: str) -> str:
+            return subprocess.check_output(
+                ['git', '-c', 'user.name=Test', '-c',
+                 'user.email=test@example.com', *args],
+                cwd=path, env=env, stderr=subprocess.DEVNULL).decode('utf-8')
+
+        os.mkdir(path)
+        git('init', '--quiet')
+        git('commit', '--quiet', '--allow-empty', '-m', 'c')
+
+        # names that are ambiguous against an earlier, and a later rule
+        for ref in ['refs/heads/origin/master', 'refs/remotes/origin/master',
+                    'refs/tags/v1', 'refs/remotes/v1/HEAD', 'refs/heads/v1',
+                    'refs/remotes/origin/HEAD', 'refs/heads/plain']:
+            git('update-ref', ref, 'HEAD')
+
+        for warn in ['true', 'false']:
+            git('config', 'core.warnAmbiguousRefs', warn)
+            repo = gitdir.GitDir.find(path)
+
+            for entry in git('for-each-ref',
+                             '--format=%(refname) %(refname:short)') \
+                    .splitlines():
+                (ref, short) = entry.split(' ')
+                self.assertEqual(repo.shorten_ref(ref), short,
+                                 '{} with {}'.format(ref, warn))
+
+    def test_remotes(self):
+        """ Tests that remotes are read properly """
+
+        repo = gitdir.GitDir.find(self.path)
+
+        self.assertEqual(repo.remotes, ['backup', 'origin'])
+        self.assertEqual(repo.remote_url('origin'),
+                         'git@example.com:hello/world.git')
+        self.assertEqual(repo.remote_url('backup'), 'backup')
+        self.assertIsNone(repo.remote_url('missing'))
+
+        # upstreams are mapped through the refspec
+        self.assertEqual(repo.upstream('refs/heads/master'),
+                         'refs/remotes/origin/master')
+        self.assertEqual(repo.upstream('refs/heads/local'),
+                         'refs/heads/master')
+        self.assertIsNone(repo.upstream('refs/heads/missing'))
+
+        # remote references are mapped through the refspec
+        self.assertEqual(repo.tracking_ref('origin', 'refs/heads/x'),
+                         'refs/remotes/origin/x')
+        self.assertEqual(repo.tracking_ref('backup', 'refs/heads/x'),
+                         'refs/backup/x')
+        self.assertIsNone(repo.tracking_ref('origin', 'refs/tags/x'))
+        self.assertIsNone(repo.tracking_ref('missing', 'refs/heads/x'))
+
+    def test_remotes_unsupported(self):
+        """ Tests that rewritten urls are not read """
+
+        with open(os.path.join(self.path, '.git', 'config'), 'a') as fp:
+            fp.write('[url "https://example.com/"]\n'
+                     '\tinsteadOf = git@example.com:\n')
+
+        repo = gitdir.GitDir.find(self.path)
+        with self.assertRaises(gitdir.UnsupportedError):
+            repo.remote_url('origin')
+
+    def test_native_cached(self):
+        """ Tests that local repositories re-use their git directory """
+
+        repo = implementation.LocalRepository(self.path)
+
+        native = repo.native()
+        self.assertEqual(native.gitdir, os.path.join(self.path, '.git'))
+        self.assertIs(repo.native(), native)
+
+        # replacing the git directory reads it again
+        os.rename(os.path.join(self.path, '.git'),
+                  os.path.join(self.tmp, 'old'))
+        shutil.copytree(os.path.join(self.tmp, 'old'),
+                        os.path.join(self.path, '.git'))
+        self.assertIsNot(repo.native(), native)
+
+        # and removing it gives no repository
+        shutil.rmtree(os.path.join(self.path, '.git'))
+        self.assertIsNone(repo.native())
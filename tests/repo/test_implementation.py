@@ -1,7 +1,12 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
 import unittest
 import unittest.mock
 
-from GitManager.repo import implementation
+from GitManager.repo import description, implementation, gitdir
 
 
 class TestLocalRepository(unittest.TestCase):
@@ -70,6 +75,53 @@ class TestLocalRepository(unittest.TestCase):
             'repr() of a simple git repository'
         )
 
+    @unittest.mock.patch('GitManager.utils.run.GitRun')
+    @unittest.mock.patch('GitManager.repo.gitdir.GitDir.find')
+    @unittest.mock.patch('os.path.realpath', side_effect=lambda p: p)
+    @unittest.mock.patch('os.path.isdir', return_value=True)
+    def test_native(self, os_path_isdir: unittest.mock.Mock,
+                    os_path_realpath: unittest.mock.Mock,
+                    gitdir_find: unittest.mock.Mock,
+                    run_gitrun: unittest.mock.Mock):
+        """ checks that repositories are read without calling git """
+
+        repo = implementation.LocalRepository('/path/to/repository')
+        native = gitdir_find.return_value
+
+        native.remotes = ['origin']
+        native.remote_url.side_effect = lambda n: 'git@example.com:a/b' \
+            if n == 'origin' else None
+        native.symbolic_ref.return_value = 'refs/heads/master'
+        native.resolve.return_value = 'aaaaaa'
+        native.upstream.return_value = 'refs/remotes/origin/master'
+        native.shorten_ref.return_value = 'origin/master'
+
+        self.assertTrue(repo.exists())
+        self.assertEqual(repo.remotes, ['origin'])
+        self.assertEqual(repo.get_remote_url('origin'), 'git@example.com:a/b')
+        with self.assertRaises(ValueError):
+            repo.get_remote_url('upstream')
+        self.assertEqual(repo.symbolic_ref('HEAD'), 'refs/heads/master')
+        self.assertEqual(repo.ref_parse('HEAD'), 'aaaaaa')
+        self.assertEqual(repo.upstream_ref('refs/heads/master'),
+                         'origin/master')
+
+        gitdir_find.assert_called_with('/path/to/repository')
+        run_gitrun.assert_not_called()
+
+        # no repository at the given path
+        gitdir_find.return_value = None
+        self.assertFalse(repo.exists())
+        run_gitrun.assert_not_called()
+
+        # unsupported repositories fall back to calling git
+        gitdir_find.side_effect = gitdir.UnsupportedError()
+        run_gitrun.return_value.stdout = unittest.mock.mock_open(
+            read_data="/path/to/repository\n".encode("utf-8"))()
+        self.assertTrue(repo.exists())
+        run_gitrun.assert_called_with('rev-parse', '--show-toplevel',
+                                      cwd='/path/to/repository')
+
     @unittest.mock.patch('GitManager.utils.run.GitRun')
     def test_remotes(self, run_gitrun: unittest.mock.Mock):
         """ checks that remotes properly works as intended """
@@ -290,7 +342,7 @@ class TestLocalRepository(unittest.TestCase):
         run_gitrun.assert_called_with('fetch', '--all', '--quiet',
                                       cwd='/path/to/repository',
                                       pipe_stderr=True, pipe_stdin=True,
-                                      pipe_stdout=True)
+                                      pipe_stdout=True, environment=None)
 
     @unittest.mock.patch('GitManager.utils.run.GitRun')
     def test_pull(self, run_gitrun: unittest.mock.Mock):
@@ -308,7 +360,15 @@ class TestLocalRepository(unittest.TestCase):
         # check that we called the pull command properly
         run_gitrun.assert_called_with('pull', cwd='/path/to/repository',
                                       pipe_stderr=True, pipe_stdin=True,
-                                      pipe_stdout=True)
+                                      pipe_stdout=True, environment=None)
+
+        # the output can be collected instead
+        output = unittest.mock.Mock()
+        repo.pull(output=output)
+        run_gitrun.assert_called_with('pull', cwd='/path/to/repository',
+                                      pipe_stderr=False, pipe_stdin=True,
+                                      pipe_stdout=False, environment=None)
+        run_gitrun.return_value.finish.assert_called_with(output)
 
     @unittest.mock.patch('GitManager.utils.run.GitRun')
     def test_push(self, run_gitrun: unittest.mock.Mock):
@@ -326,64 +386,82 @@ class TestLocalRepository(unittest.TestCase):
         # check that we called the push command properly
         run_gitrun.assert_called_with('push', cwd='/path/to/repository',
                                       pipe_stderr=True, pipe_stdin=True,
-                                      pipe_stdout=True)
+                                      pipe_stdout=True, environment=None)
 
     @unittest.mock.patch('GitManager.utils.run.GitRun')
-    def test_local_status(self, run_gitrun: unittest.mock.Mock):
-        """ checks that local_status method makes an external call """
+    @unittest.mock.patch('os.path.isdir')
+    def test_probe(self, os_path_isdir: unittest.mock.Mock,
+                   run_gitrun: unittest.mock.Mock):
+        """ checks that probe makes a single external call """
 
         # create a repository
         repo = implementation.LocalRepository('/path/to/repository')
 
-        # mock the exists function
-        repo.exists = unittest.mock.MagicMock(return_value=False)
+        # if the directory does not exist, nothing is called
+        os_path_isdir.return_value = False
+        self.assertIsNone(repo.probe())
+        run_gitrun.assert_not_called()
+
+        # if the status call fails, there is no repository
+        os_path_isdir.return_value = True
+        run_gitrun.return_value.success = False
+        self.assertIsNone(repo.probe())
+
+        # the status call should only ever consider this repository
+        run_gitrun.assert_called_once()
+        (args, kwargs) = run_gitrun.call_args
+        self.assertEqual(args, ('status', '--porcelain=v2', '--branch',
+                                '-z'))
+        self.assertEqual(kwargs['cwd'], '/path/to/repository')
+        self.assertEqual(kwargs['environment']['GIT_CEILING_DIRECTORIES'],
+                         '/path/to')
+
+        # if it succeeds, we parse the output
+        run_gitrun.reset_mock()
+        run_gitrun.return_value.success = True
+        run_gitrun.return_value.communicate.return_value = \
+            "# branch.oid aaaaaa\0# branch.head master\0? new\0".encode(
+                "utf-8")
+
+        self.assertEqual(repo.probe(), implementation.RepoProbe(
+            '/path/to/repository', 'aaaaaa', 'master', None, None, None,
+            (('??', 'new'),)))
+        run_gitrun.assert_called_once()
+
+    @unittest.mock.patch(
+        'GitManager.repo.implementation.LocalRepository.probe')
+    def test_local_status(self, LocalRepository_probe: unittest.mock.Mock):
+        """ checks that local_status method uses a probe """
+
+        # create a repository
+        repo = implementation.LocalRepository('/path/to/repository')
 
         # local status and non-existence
+        LocalRepository_probe.return_value = None
         self.assertEqual(repo.local_status(), None, "local_status of "
                                                     "non-existing "
                                                     "repository")
 
-        # reset the mock and change the return value to True
-        repo.exists.reset_mock()
-        repo.exists.return_value = True
-
-        # setup the return value of the git run
-        run_gitrun.return_value.stdout = unittest.mock.mock_open(
-            read_data="".encode("utf-8"))()
-
-        # check that the local_status did print correctly
+        # a clean repository
+        LocalRepository_probe.return_value = implementation.RepoProbe(
+            '/path/to/repository', 'aaaaaa', 'master', None, None, None, ())
         self.assertEqual(repo.local_status(), "", "Reading status works "
                                                   "properly")
 
-        # check that we called the status command
-        run_gitrun.assert_called_with('status', '--porcelain',
-                                      cwd='/path/to/repository')
+        # a dirty repository
+        LocalRepository_probe.return_value = implementation.RepoProbe(
+            '/path/to/repository', 'aaaaaa', 'master', None, None, None,
+            ((' M', 'some/file'), ('??', 'new')))
+        self.assertEqual(repo.local_status(), " M some/file\n?? new\n",
+                         "Reading dirty status works properly")
 
     @unittest.mock.patch('GitManager.utils.run.GitRun')
+    @unittest.mock.patch('os.path.isdir', return_value=True)
     @unittest.mock.patch(
-        'GitManager.repo.implementation.LocalRepository.ref_parse',
-        side_effect=["aaaaaa", "bbbbbb", "aaaaaa", "bbbbbb", "aaaaaa",
-                     "bbbbbb", "aaaaaa", "bbbbbb", "aaaaaa", "bbbbbb"]
-    )
-    @unittest.mock.patch(
-        'GitManager.repo.implementation.LocalRepository.upstream_ref',
-        side_effect=["origin/master", "origin/master", "origin/master",
-                     "origin/master", "origin/master"]
-    )
-    @unittest.mock.patch(
-        'GitManager.repo.implementation.LocalRepository.symbolic_ref',
-        side_effect=["refs/heads/master", "refs/heads/master",
-                     "refs/heads/master", "refs/heads/master",
-                     "refs/heads/master"]
-    )
-    @unittest.mock.patch(
-        'GitManager.repo.implementation.LocalRepository.exists'
-    )
+        'GitManager.repo.implementation.LocalRepository.probe')
     def test_remote_status(self,
-                           LocalRepository_exists: unittest.mock.Mock,
-                           LocalRepository_symbolic_ref: unittest.mock.Mock,
-                           LocalRepository_upstream_ref: unittest.mock.Mock,
-                           LocalRepository_ref_parse: unittest.mock.Mock,
+                           LocalRepository_probe: unittest.mock.Mock,
+                           os_path_isdir: unittest.mock.Mock,
                            run_gitrun: unittest.mock.Mock):
         """ Tests that the remote_status command works properly """
 
@@ -394,87 +472,213 @@ class TestLocalRepository(unittest.TestCase):
         run_gitrun.return_value.success = False
         self.assertEqual(repo.remote_status(update=True), None)
         run_gitrun.assert_called_with('remote', 'update',
-                                      cwd='/path/to/repository')
+                                      cwd='/path/to/repository',
+                                      environment=unittest.mock.ANY)
+        LocalRepository_probe.assert_not_called()
 
         # reset all the mocks
-        LocalRepository_exists.reset_mock()
-        LocalRepository_symbolic_ref.reset_mock()
-        LocalRepository_upstream_ref.reset_mock()
-        LocalRepository_ref_parse.reset_mock()
         run_gitrun.reset_mock()
         run_gitrun.return_value.success = True
 
-        # merge base is aaaaaa (local)
-        LocalRepository_exists.return_value = False
+        # the repository does not exist
+        LocalRepository_probe.return_value = None
         self.assertEqual(repo.remote_status(), None)
 
-        # reset all the mocks
-        LocalRepository_exists.reset_mock()
-        LocalRepository_symbolic_ref.reset_mock()
-        LocalRepository_upstream_ref.reset_mock()
-        LocalRepository_ref_parse.reset_mock()
-        run_gitrun.reset_mock()
-
-        # merge base is local
-        LocalRepository_exists.return_value = True
-        run_gitrun.return_value.stdout = unittest.mock.mock_open(
-            read_data="aaaaaa\n".encode("utf-8"))()
-
-        self.assertEqual(repo.remote_status(update=False),
-                         implementation.RemoteStatus.REMOTE_NEWER)
-        run_gitrun.assert_called_with("merge-base", "aaaaaa", "bbbbbb",
-                                      cwd="/path/to/repository")
-        # reset all the mocks
-        LocalRepository_exists.reset_mock()
-        LocalRepository_symbolic_ref.reset_mock()
-        LocalRepository_upstream_ref.reset_mock()
-        LocalRepository_ref_parse.reset_mock()
-        run_gitrun.reset_mock()
-
-        # merge base is local
-        LocalRepository_exists.return_value = True
-        run_gitrun.return_value.stdout = unittest.mock.mock_open(
-            read_data="bbbbbb\n".encode("utf-8"))()
-
-        self.assertEqual(repo.remote_status(),
-                         implementation.RemoteStatus.LOCAL_NEWER)
-        run_gitrun.assert_called_with("merge-base", "aaaaaa", "bbbbbb",
-                                      cwd="/path/to/repository")
+        # no upstream
+        LocalRepository_probe.return_value = implementation.RepoProbe(
+            '/path/to/repository', 'aaaaaa', 'master', None, None, None, ())
+        self.assertEqual(repo.remote_status(), None)
 
-        # reset all the mocks
-        LocalRepository_exists.reset_mock()
-        LocalRepository_symbolic_ref.reset_mock()
-        LocalRepository_upstream_ref.reset_mock()
-        LocalRepository_ref_parse.reset_mock()
+        # the remaining cases are read from ahead / behind
+        for ((ahead, behind), status) in [
+            ((0, 0), implementation.RemoteStatus.UP_TO_DATE),
+            ((0, 1), implementation.RemoteStatus.REMOTE_NEWER),
+            ((2, 0), implementation.RemoteStatus.LOCAL_NEWER),
+            ((2, 1), implementation.RemoteStatus.DIVERGENCE),
+        ]:
+            LocalRepository_probe.return_value = implementation.RepoProbe(
+                '/path/to/repository', 'aaaaaa', 'master', 'origin/master',
+                ahead, behind, ())
+            self.assertEqual(repo.remote_status(update=False), status)
+
+        # updating makes two calls
         run_gitrun.reset_mock()
-
-        # merge base is ????
-        LocalRepository_exists.return_value = True
-        run_gitrun.return_value.stdout = unittest.mock.mock_open(
-            read_data="cccccc\n".encode("utf-8"))()
-
-        self.assertEqual(repo.remote_status(update=False),
+        self.assertEqual(repo.remote_status(update=True),
                          implementation.RemoteStatus.DIVERGENCE)
-        run_gitrun.assert_called_with("merge-base", "aaaaaa", "bbbbbb",
-                                      cwd="/path/to/repository")
+        run_gitrun.assert_called_once()
+        run_gitrun.assert_called_with('remote', 'update',
+                                      cwd='/path/to/repository',
+                                      environment=unittest.mock.ANY)
+
+
+@unittest.skipIf(shutil.which('git') is None, 'git is not installed')
+class TestChanged(unittest.TestCase):
+    """ Tests that changes of remotes are detected, and repositories are
+    probed, using real repositories """
+
+    def setUp(self):
+        self.tmp = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+        # do not read any configuration of the user
+        patcher = unittest.mock.patch.dict('os.environ', {
+            'HOME': self.tmp, 'XDG_CONFIG_HOME': self.tmp,
+            'GIT_CONFIG_NOSYSTEM': '1'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # a bare upstream, a repository pushing to it and a clone of it
+        self.upstream = os.path.join(self.tmp, 'upstream.git')
+        self.work = os.path.join(self.tmp, 'work')
+        self.clone = os.path.join(self.tmp, 'clone')
+
+        self.git(self.tmp, 'init', '--quiet', '--bare', self.upstream)
+        self.git(self.tmp, 'init', '--quiet', self.work)
+        self.push('refs/heads/main')
+        self.git(self.tmp, 'clone', '--quiet', 'file://' + self.upstream,
+                 self.clone)
+
+    @staticmethod
+    def git(cwd: str, *args: str) -> str:
+        """ Runs git and returns its output """
+
+        return subprocess.check_output(
+            ['git', '-c', 'user.name=Test', '-c',
+             'user.email=test@example.com', *args],
+            cwd=cwd, stderr=subprocess.DEVNULL).decode('utf-8')
+
+    def push(self, *refs: str):
+        """ Creates a new commit and pushes it to some upstream branches """
+
+        self.git(self.work, 'commit', '--quiet', '--allow-empty', '-m', 'c')
+        self.git(self.work, 'push', '--quiet', 'file://' + self.upstream,
+                 *['HEAD:' + ref for ref in refs])
+
+    def test_changed(self):
+        """ Tests that changed() compares remote-tracking references """
+
+        repo = implementation.LocalRepository(self.clone)
+        self.assertFalse(repo.changed())
+
+        # a new commit is a change
+        self.push('refs/heads/main')
+        self.assertTrue(repo.changed())
+
+        # which is gone after fetching
+        with unittest.mock.patch('GitManager.utils.run.GitRun',
+                                 wraps=implementation.run.GitRun) as gitrun:
+            self.assertTrue(repo.fetch(if_changed=True))
+            self.assertEqual(gitrun.call_args[0][0], 'fetch')
+        self.assertEqual(
+            self.git(self.clone, 'rev-parse', 'refs/remotes/origin/main'),
+            self.git(self.work, 'rev-parse', 'HEAD'))
+        self.assertFalse(repo.changed())
+
+        # when nothing changed, fetching is skipped
+        with unittest.mock.patch('GitManager.utils.run.GitRun',
+                                 wraps=implementation.run.GitRun) as gitrun:
+            self.assertTrue(repo.fetch(if_changed=True))
+            self.assertEqual(gitrun.call_args[0][0], 'ls-remote')
+
+        # a new branch is a change
+        self.push('refs/heads/feature')
+        self.assertTrue(repo.changed())
+        self.assertTrue(repo.fetch())
+        self.assertFalse(repo.changed())
+
+        # a deleted branch only is when pruning
+        self.git(self.work, 'push', '--quiet', 'file://' + self.upstream,
+                 ':refs/heads/feature')
+        self.assertFalse(repo.changed())
+        self.git(self.clone, 'config', 'fetch.prune', 'true')
+        self.assertTrue(repo.changed())
+
+    def test_probe_untracked(self):
+        """ Tests that probing a repository with more untracked files than
+        fit into a pipe does not block """
+
+        for i in range(6000):
+            open(os.path.join(self.clone, 'untracked-file-{}'.format(i)),
+                 'w').close()
+
+        # probe in a thread, so that a blocking probe fails the test instead
+        # of hanging it
+        result = []
+        thread = threading.Thread(target=lambda: result.append(
+            implementation.LocalRepository(self.clone).probe()), daemon=True)
+        thread.start()
+        thread.join(20)
+
+        self.assertFalse(thread.is_alive(), 'probe did not finish')
+        self.assertEqual(len(result[0].entries), 6000)
+
+    def test_changed_unknown(self):
+        """ Tests that changes are assumed if they can not be checked """
+
+        # an unreachable remote
+        shutil.rmtree(self.upstream)
+        self.assertTrue(implementation.LocalRepository(self.clone).changed())
+
+        # a repository that can not be read directly
+        with unittest.mock.patch.dict('os.environ', {'GIT_DIR': '.git'}):
+            self.assertTrue(
+                implementation.LocalRepository(self.work).changed())
+
+
+class TestRepoProbe(unittest.TestCase):
+    """ Tests that the RepoProbe class works properly """
+
+    def test_parse(self):
+        """ Tests that the output of git status is parsed properly """
+
+        output = '\0'.join([
+            '# branch.oid 112945518791aca5b4fe31aeff7a3845288c5a36',
+            '# branch.head master',
+            '# branch.upstream origin/master',
+            '# branch.ab +1 -0',
+            '1 .M N... 100644 100644 100644 aaaa aaaa some file',
+            '2 R. N... 100644 100644 100644 bbbb bbbb R100 h h',
+            'f',
+            'u UU N... 100644 100644 100644 100644 cccc dddd eeee merge',
+            '? new',
+            '! ignored',
+            '',
+        ])
 
-        # reset all the mocks
-        LocalRepository_exists.reset_mock()
-        LocalRepository_symbolic_ref.reset_mock()
-        LocalRepository_upstream_ref.reset_mock()
-        LocalRepository_ref_parse.reset_mock()
-        run_gitrun.reset_mock()
+        self.assertEqual(
+            implementation.RepoProbe.parse('/path/to/repository', output),
+            implementation.RepoProbe(
+                '/path/to/repository',
+                '112945518791aca5b4fe31aeff7a3845288c5a36', 'master',
+                'origin/master', 1, 0, (
+                    (' M', 'some file'),
+                    ('R ', 'h h'),
+                    ('UU', 'merge'),
+                    ('??', 'new'),
+                    ('!!', 'ignored'),
+                )
+            )
+        )
 
-        # both refs are equal
-        LocalRepository_ref_parse.side_effect = ["aaaaaa", "aaaaaa"]
-        LocalRepository_exists.return_value = True
-        run_gitrun.return_value.stdout = unittest.mock.mock_open(
-            read_data="aaaaaa\n".encode("utf-8"))()
+    def test_parse_special(self):
+        """ Tests that unborn and detached heads are parsed properly """
+
+        probe = implementation.RepoProbe.parse(
+            '/path', '# branch.oid (initial)\0# branch.head master\0')
+        self.assertIsNone(probe.oid)
+        self.assertEqual(probe.branch, 'master')
+        self.assertIsNone(probe.upstream)
+        self.assertFalse(probe.dirty)
+        self.assertIsNone(probe.remote_status)
 
-        self.assertEqual(repo.remote_status(update=False),
-                         implementation.RemoteStatus.UP_TO_DATE)
-        run_gitrun.assert_called_with("merge-base", "aaaaaa", "aaaaaa",
-                                      cwd="/path/to/repository")
+        probe = implementation.RepoProbe.parse(
+            '/path', '# branch.oid aaaaaa\0# branch.head (detached)\0'
+                     '# branch.upstream origin/gone\0? new\0')
+        self.assertEqual(probe.oid, 'aaaaaa')
+        self.assertIsNone(probe.branch)
+        self.assertEqual(probe.upstream, 'origin/gone')
+        self.assertTrue(probe.dirty)
+        self.assertIsNone(probe.remote_status)
 
 
 class TestRemoteRepository(unittest.TestCase):
@@ -537,6 +741,19 @@ class TestRemoteRepository(unittest.TestCase):
         self.assertFalse(repo.matches('git@github.com:halo/world.git'),
                          'not matching full url')
 
+    def test_key(self):
+        """ Tests that the key() of a RemoteRepository works properly """
+
+        ssh = implementation.RemoteRepository(
+            'git@github.com:hello/world.git')
+        https = implementation.RemoteRepository(
+            'https://github.com/hello/world')
+
+        self.assertNotEqual(ssh, https)
+        self.assertEqual(ssh.key(), https.key())
+        self.assertEqual(len({ssh, https, implementation.RemoteRepository(
+            'https://github.com/hello/world')}), 2)
+
     def test_str(self):
         """ Tests that the str() of a remoteRepository works properly """
 
@@ -602,7 +819,8 @@ class TestRemoteRepository(unittest.TestCase):
         run_gitrun.assert_called_with('clone',
                                       'git@github.com:hello/world.git',
                                       '/path/to/clone', pipe_stderr=True,
-                                      pipe_stdin=True, pipe_stdout=True)
+                                      pipe_stdin=True, pipe_stdout=True,
+                                      environment=None)
 
     def test_components(self):
         """ Checks that the components method works properly"""
@@ -668,3 +886,71 @@ class TestRemoteRepository(unittest.TestCase):
                 'git@github.com:hello/world//').humanish_part(),
             'world'
         )
+
+
+class TestPatternMatcher(unittest.TestCase):
+    """ Tests that the PatternMatcher class works properly """
+
+    def test_translate(self):
+        """ Tests that patterns are translated properly """
+
+        (length, regex) = implementation.PatternMatcher.translate('H*/w*')
+        self.assertEqual(length, 2)
+        self.assertRegex('hello/world', regex)
+
+        (length, _) = implementation.PatternMatcher.translate(
+            'git@github.com:hello/world.git')
+        self.assertEqual(length, 3)
+
+    def test_matches(self):
+        """ Tests that repositories are matched properly """
+
+        world = implementation.RemoteRepository(
+            'git@github.com:hello/world.git')
+        mars = implementation.RemoteRepository(
+            'https://github.com/hello/mars')
+        earth = implementation.RemoteRepository(
+            'git@gitlab.com:bye/earth.git')
+
+        # a single pattern
+        matcher = implementation.PatternMatcher('hello/*')
+        self.assertTrue(matcher.matches(world))
+        self.assertTrue(matcher.matches(mars))
+        self.assertFalse(matcher.matches(earth))
+
+        # several patterns of different lengths
+        matcher = implementation.PatternMatcher('world', 'gitlab.com/*/e*')
+        self.assertTrue(matcher.matches(world))
+        self.assertFalse(matcher.matches(mars))
+        self.assertTrue(matcher.matches(earth))
+
+        # excluding patterns
+        matcher = implementation.PatternMatcher('github.com', '!m*')
+        self.assertTrue(matcher.matches(world))
+        self.assertFalse(matcher.matches(mars))
+        self.assertFalse(matcher.matches(earth))
+
+        # only excluding patterns
+        matcher = implementation.PatternMatcher('!hello')
+        self.assertFalse(matcher.matches(world))
+        self.assertFalse(matcher.matches(mars))
+        self.assertTrue(matcher.matches(earth))
+
+        # no patterns at all
+        self.assertTrue(implementation.PatternMatcher().matches(world))
+
+    def test_filter(self):
+        """ Tests that repository descriptions are filtered properly """
+
+        repos = [
+            description.RepositoryDescription(
+                'git@github.com:hello/world.git', '/path/to/world'),
+            description.RepositoryDescription(
+                'git@github.com:hello/mars.git', '/path/to/mars'),
+            description.RepositoryDescription(
+                'git@github.com:hello/earth.git', '/path/to/earth'),
+        ]
+
+        self.assertEqual(
+            list(implementation.PatternMatcher('hello', '!mars').filter(
+                repos)), [repos[0], repos[2]])
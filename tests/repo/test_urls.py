@@ -0,0 +1,59 @@
+import unittest
+
+from GitManager.repo import urls
+
+
+class TestURLs(unittest.TestCase):
+    """ Tests that urls are parsed properly """
+
+    def test_parse(self):
+        """ Tests that urls are split into their parts """
+
+        self.assertEqual(urls.parse('git@github.com:hello/world.git'),
+                         urls.ParsedURL('github.com', None, None,
+                                        ('hello', 'world')))
+
+        self.assertEqual(urls.parse('https://user@github.com/hello/world/'),
+                         urls.ParsedURL('github.com', 'user', None,
+                                        ('hello', 'world')))
+
+        self.assertEqual(urls.parse('ssh://git@example.com:2222/hello/world'),
+                         urls.ParsedURL('example.com', None, '2222',
+                                        ('2222', 'hello', 'world')))
+
+        self.assertEqual(urls.parse('example.com:2222/world'),
+                         urls.ParsedURL('example.com', None, None,
+                                        ('2222', 'world')))
+
+    def test_components(self):
+        """ Tests that components are extracted properly """
+
+        self.assertEqual(urls.components('git@github.com:hello/world.git'),
+                         ('github.com', 'hello', 'world'))
+        self.assertEqual(urls.components('ssh://me@github.com/hello/world'),
+                         ('github.com', 'me', 'hello', 'world'))
+
+        # results are cached
+        self.assertIs(urls.components('git@github.com:hello/world.git'),
+                      urls.components('git@github.com:hello/world.git'))
+
+    def test_key(self):
+        """ Tests that the different forms of a url have the same key """
+
+        key = urls.Key('github.com', None, ('hello', 'world'))
+
+        for url in ['git@github.com:hello/world.git',
+                    'git@GitHub.com:hello/world',
+                    'https://github.com/hello/world.git',
+                    'https://github.com/hello/world/',
+                    'ssh://git@github.com/hello/world.git',
+                    'ssh://git@github.com:22/hello/world.git',
+                    'git@github.com:/hello/world.git',
+                    'ssh://git@github.com/hello/world',
+                    'https://github.com//hello/world']:
+            self.assertEqual(urls.key(url), key, url)
+
+        for url in ['git@github.com:hello/mars.git',
+                    'git@gitlab.com:hello/world.git',
+                    'me@github.com:hello/world.git']:
+            self.assertNotEqual(urls.key(url), key, url)
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+root_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+
+# maximal time all imports of 'git-manager ls' may take, in microseconds
+IMPORT_BUDGET = 250000
+
+# modules that are slow to import, and not needed by 'git-manager ls'
+SLOW_MODULES = ('argparse', 'subprocess', 'concurrent.futures', 'tempfile',
+                'logging', 'GitManager.commands.reconfigure',
+                'GitManager.repo.finder')
+
+
+class StartupTest(unittest.TestCase):
+    """ Checks the time it takes to start 'git-manager ls' """
+
+    @staticmethod
+    def importtime(tmp: str) -> dict:
+        """ Runs 'git-manager ls' and returns a dictionary mapping each
+        imported module to the time it took to import it (excluding its
+        own imports) in microseconds
+
+        :param tmp: Temporary directory to keep the configuration in
+        """
+
+        config = os.path.join(tmp, 'config')
+        if not os.path.exists(config):
+            with open(config, 'w') as fp:
+                fp.write('https://github.com/tkw1536/GitManager\n')
+
+        env = os.environ.copy()
+        env['PYTHONPATH'] = root_path
+        env['GIT_MANAGER_CONFIG'] = config
+        env['XDG_CACHE_HOME'] = tmp
+
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'GitManager', 'ls'],
+            env=env, cwd=tmp, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        assert process.returncode == 0, process.stderr
+
+        times = {}
+        for l in process.stderr.splitlines():
+            if not l.startswith('import time:') or '|' not in l:
+                continue
+
+            (own, _, name) = l[len('import time:'):].split('|')
+            if own.strip().isdigit():
+                times[name.strip()] = int(own)
+
+        return times
+
+    def test_importtime(self):
+        """ Checks that 'git-manager ls' imports quickly """
+
+        with tempfile.TemporaryDirectory() as tmp:
+
+            # the first run creates the cache of the configuration file
+            StartupTest.importtime(tmp)
+
+            # take the fastest of a few runs, to not depend on a busy machine
+            runs = [StartupTest.importtime(tmp) for _ in range(3)]
+
+        self.assertIn('GitManager.commands.lister', runs[0])
+
+        for module in SLOW_MODULES:
+            self.assertNotIn(module, runs[0],
+                             '{} is imported by ls'.format(module))
+
+        self.assertLess(min(sum(t.values()) for t in runs), IMPORT_BUDGET)
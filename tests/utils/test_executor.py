@@ -0,0 +1,213 @@
+import collections
+import threading
+import time
+import unittest
+
+from GitManager.utils import executor
+
+
+class TestExecutor(unittest.TestCase):
+    """ Tests that the Executor class works properly """
+
+    def test_init(self):
+        """ Tests that the number of jobs is validated """
+
+        self.assertEqual(executor.Executor().jobs, 1)
+        self.assertEqual(executor.Executor(4).jobs, 4)
+
+        with self.assertRaises(ValueError):
+            executor.Executor(0)
+
+    def test_create(self):
+        """ Tests that create() picks the right kind of executor """
+
+        self.assertIs(type(executor.Executor.create(1)), executor.Executor)
+        self.assertIs(type(executor.Executor.create(3)),
+                      executor.ThreadedExecutor)
+
+    def test_map(self):
+        """ Tests that map() runs items in order """
+
+        calls = []
+
+        def task(i, item):
+            calls.append((i, item))
+            return item * 2
+
+        self.assertEqual(list(executor.Executor().map(task, [1, 2, 3])),
+                         [2, 4, 6])
+        self.assertEqual(calls, [(0, 1), (1, 2), (2, 3)])
+
+
+class TestThreadedExecutor(unittest.TestCase):
+    """ Tests that the ThreadedExecutor class works properly """
+
+    def test_map(self):
+        """ Tests that map() returns results in the order of the items """
+
+        def task(i, item):
+            # finish the later items first
+            time.sleep((10 - i) * 0.001)
+            return (i, item)
+
+        items = list(range(10))
+        self.assertEqual(list(executor.ThreadedExecutor(4).map(task, items)),
+                         list(enumerate(items)))
+
+    def test_map_concurrency(self):
+        """ Tests that map() never runs more than jobs tasks at once """
+
+        lock = threading.Lock()
+        state = {'running': 0, 'max': 0}
+
+        def task(i, item):
+            with lock:
+                state['running'] += 1
+                state['max'] = max(state['max'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+            return item
+
+        list(executor.ThreadedExecutor(3).map(task, range(12)))
+
+        self.assertGreater(state['max'], 1)
+        self.assertLessEqual(state['max'], 3)
+
+    def test_map_error(self):
+        """ Tests that errors within a task are raised by map() """
+
+        def task(i, item):
+            if item == 2:
+                raise ValueError()
+            return item
+
+        with self.assertRaises(ValueError):
+            list(executor.ThreadedExecutor(2).map(task, range(5)))
+
+    def test_map_streaming(self):
+        """ Tests that map() starts tasks before all items are known """
+
+        started = threading.Event()
+
+        def items():
+            yield 0
+
+            # the first task runs before the next item is produced
+            self.assertTrue(started.wait(1))
+            yield 1
+
+        def task(i, item):
+            started.set()
+            return item
+
+        self.assertEqual(list(executor.ThreadedExecutor(2).map(task, items())),
+                         [0, 1])
+
+    def test_map_backlog(self):
+        """ Tests that map() does not start tasks far ahead of the results
+        that have been consumed """
+
+        lock = threading.Lock()
+        state = {'started': 0}
+
+        def task(i, item):
+            with lock:
+                state['started'] += 1
+            return item
+
+        results = executor.ThreadedExecutor(3).map(task, range(100))
+
+        for (i, result) in enumerate(results):
+            self.assertEqual(result, i)
+
+            # wait for tasks to be started, if any more would be
+            time.sleep(0.002)
+            with lock:
+                self.assertLessEqual(state['started'],
+                                     i + 1 + executor.BACKLOG * 3)
+
+        self.assertEqual(state['started'], 100)
+
+    def test_map_grouped(self):
+        """ Tests that map() limits the number of tasks per group """
+
+        lock = threading.Lock()
+        running = collections.Counter()
+        state = {'max': 0, 'started': []}
+        maximum = collections.Counter()
+
+        def task(i, item):
+            with lock:
+                state['started'].append(item)
+                running[item[0]] += 1
+                maximum[item[0]] = max(maximum[item[0]], running[item[0]])
+                state['max'] = max(state['max'], sum(running.values()))
+            time.sleep(0.01)
+            with lock:
+                running[item[0]] -= 1
+            return item
+
+        # most items belong to group 'a', which may run only one task
+        items = [('a', i) for i in range(6)] + [('b', i) for i in range(3)] \
+            + [('c', i) for i in range(3)]
+        limits = {'a': 1, 'b': 2}
+
+        runner = executor.ThreadedExecutor(3, lambda item: item[0],
+                                           limits.get)
+        self.assertEqual(list(runner.map(task, items)), items)
+
+        self.assertEqual(maximum['a'], 1)
+        self.assertLessEqual(maximum['b'], 2)
+        self.assertLessEqual(state['max'], 3)
+
+        # the other groups are not held up by group 'a'
+        self.assertLess(state['started'].index(('b', 1)),
+                        state['started'].index(('a', 1)))
+
+    def test_map_grouped_error(self):
+        """ Tests that errors within a grouped task are raised by map() """
+
+        def task(i, item):
+            if item == 2:
+                raise ValueError()
+            return item
+
+        runner = executor.ThreadedExecutor(2, lambda item: item % 2,
+                                           lambda group: 1)
+        with self.assertRaises(ValueError):
+            list(runner.map(task, range(5)))
+
+    def test_map_grouped_backlog(self):
+        """ Tests that a slow task does not let the results of the tasks
+        after it pile up """
+
+        lock = threading.Lock()
+        state = {'ahead': 0, 'started': 0}
+        finished = threading.Event()
+
+        def task(i, item):
+            if i == 0:
+                time.sleep(0.2)
+                finished.set()
+                return item
+
+            with lock:
+                state['started'] += 1
+                if not finished.is_set():
+                    state['ahead'] += 1
+            return item
+
+        items = [('a', 0)] + [('b', i) for i in range(1, 100)]
+        runner = executor.ThreadedExecutor(2, lambda item: item[0])
+
+        self.assertEqual(list(runner.map(task, items)), items)
+        self.assertEqual(state['started'], 99)
+        self.assertLess(state['ahead'], executor.BACKLOG * 2)
+
+        # tasks are no longer started once the results are not needed
+        state['started'] = 0
+        results = runner.map(task, items)
+        next(results)
+        results.close()
+        self.assertLessEqual(state['started'], executor.BACKLOG * 2)
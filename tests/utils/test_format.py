@@ -1,3 +1,6 @@
+import signal
+import threading
+import time
 import unittest
 import unittest.mock
 
@@ -7,6 +10,9 @@ from GitManager.utils import format
 class TestFormat(unittest.TestCase):
     """ Tests that the Format() class works properly """
 
+    def setUp(self):
+        format.Format._Format__short_path.cache_clear()
+
     def test_init(self):
         """ Tests that format can not be instantiated """
 
@@ -136,6 +142,40 @@ class TestFormat(unittest.TestCase):
             'bbbbb/aaaaaa...', 'shorten path from the start'
         )
 
+        self.assertEqual(
+            format.Format.short_rel_path('aaaaaaaaaabbbbbbbbbb', 15),
+            '...aabbbbbbbbbb', 'shorten a single component'
+        )
+
+    def test_short_rel_path_benchmark(self):
+        """ Tests that short_rel_path() takes linear time on deep paths """
+
+        pth = '/'.join('component{}'.format(i) for i in range(1000))
+
+        start = time.time()
+        for _ in range(100):
+            result = format.Format.short_rel_path(pth, 60)
+        self.assertLess(time.time() - start, 0.5)
+
+        self.assertEqual(result, 'component0/component1/.../'
+                                 'component998/component999')
+
+    @unittest.mock.patch.object(format.Format, 'short_rel_path',
+                                return_value='hello/world')
+    def test_short_path_cached(self,
+                               format_short_rel_path: unittest.mock.Mock):
+        """ Tests that the short_path() method remembers paths """
+
+        for _ in range(10):
+            self.assertEqual(format.Format.short_path('hello/world', 15),
+                             'hello/world')
+        format_short_rel_path.assert_called_once_with('hello/world', 15)
+
+        # a different length is a different path
+        format.Format.short_path('hello/world', 16)
+        format_short_rel_path.assert_called_with('hello/world', 16)
+        self.assertEqual(format_short_rel_path.call_count, 2)
+
     @unittest.mock.patch.object(format.Format, 'short_rel_path',
                                 return_value='hello/world')
     @unittest.mock.patch.object(format.Format, 'short_abs_path',
@@ -184,6 +224,86 @@ class TestTerminalLine(unittest.TestCase):
                                                           "TerminalLine")
         shutil_get_terminal_size.assert_called_with()
 
+    @unittest.mock.patch('shutil.get_terminal_size')
+    def test_width_cached(self,
+                          shutil_get_terminal_size: unittest.mock.Mock):
+        """ Tests that the width is only read again after a resize """
+
+        shutil_get_terminal_size.return_value.columns = 20
+
+        line = format.TerminalLine()
+        self.assertEqual(line.width, 20)
+        self.assertEqual(line.width, 20)
+        shutil_get_terminal_size.assert_called_once_with()
+
+        # resizing the terminal invalidates the width
+        shutil_get_terminal_size.return_value.columns = 30
+        signal.getsignal(signal.SIGWINCH)(signal.SIGWINCH, None)
+
+        self.assertEqual(line.width, 30)
+        self.assertEqual(line.width, 30)
+        self.assertEqual(shutil_get_terminal_size.call_count, 2)
+
+    @unittest.mock.patch('shutil.get_terminal_size')
+    @unittest.mock.patch(
+        'GitManager.utils.format.TerminalLine._TerminalLine__watching', None)
+    def test_width_threads(self,
+                           shutil_get_terminal_size: unittest.mock.Mock):
+        """ Tests that the width is cached when written to from other
+        threads """
+
+        handler = signal.getsignal(signal.SIGWINCH)
+        self.addCleanup(signal.signal, signal.SIGWINCH, handler)
+
+        shutil_get_terminal_size.return_value.columns = 20
+
+        def write_from_thread(line: format.TerminalLine):
+            thread = threading.Thread(target=lambda: [
+                line.write('Hello world') for _ in range(10)])
+            thread.start()
+            thread.join()
+
+        with unittest.mock.patch('sys.stdout') as sys_stdout:
+            sys_stdout.isatty.return_value = True
+
+            # a line created by the main thread is notified of resizes
+            line = format.TerminalLine()
+            write_from_thread(line)
+            shutil_get_terminal_size.assert_called_once_with()
+
+            # a line created by another thread can not be notified
+            with unittest.mock.patch(
+                    'GitManager.utils.format.TerminalLine'
+                    '._TerminalLine__watching', None):
+                lines = []
+                thread = threading.Thread(
+                    target=lambda: lines.append(format.TerminalLine()))
+                thread.start()
+                thread.join()
+
+                shutil_get_terminal_size.reset_mock()
+                write_from_thread(lines[0])
+                self.assertEqual(shutil_get_terminal_size.call_count, 10)
+
+                # until the main thread creates one
+                format.TerminalLine()
+                shutil_get_terminal_size.reset_mock()
+                write_from_thread(lines[0])
+                shutil_get_terminal_size.assert_not_called()
+
+    @unittest.mock.patch('sys.stdout')
+    def test_isatty(self, sys_stdout: unittest.mock.Mock):
+        """ Tests that isatty is only checked once """
+
+        sys_stdout.isatty.return_value = True
+
+        line = format.TerminalLine()
+        for _ in range(10):
+            line.write('Hello world')
+
+        self.assertTrue(line.isatty)
+        sys_stdout.isatty.assert_called_once_with()
+
     @unittest.mock.patch.object(format.TerminalLine, 'width', 20)
     @unittest.mock.patch.object(format.TerminalLine, 'append')
     @unittest.mock.patch('sys.stdout.isatty')
@@ -207,7 +327,7 @@ class TestTerminalLine(unittest.TestCase):
         line = format.TerminalLine()
         line.clean()
         format_terminal_line_append.assert_not_called()
-        self.assertEqual(line._TerminalLine__cache, '')
+        self.assertEqual(line._TerminalLine__pending, [])
 
     @unittest.mock.patch.object(format.TerminalLine, 'append')
     def test_linebreak(self,
@@ -248,7 +368,7 @@ class TestTerminalLine(unittest.TestCase):
 
         sys_stdout.write.assert_called_with('Hello world')
         TerminalLine_flush.assert_called_with()
-        self.assertEqual(tl._TerminalLine__cache, "")
+        self.assertEqual(tl._TerminalLine__pending, [])
 
         # reset all the mocks
         TerminalLine_flush.reset_mock()
@@ -263,7 +383,7 @@ class TestTerminalLine(unittest.TestCase):
 
         sys_stdout.write.assert_not_called()
         TerminalLine_flush.assert_called_with()
-        self.assertEqual(tl._TerminalLine__cache, "Hello world")
+        self.assertEqual(tl._TerminalLine__pending, ["Hello world"])
 
         # reset all the mocks
         TerminalLine_flush.reset_mock()
@@ -276,7 +396,7 @@ class TestTerminalLine(unittest.TestCase):
 
         # make a terminal line and write hello world
         tl = format.TerminalLine()
-        tl._TerminalLine__cache = "Hello\nWorld"
+        tl._TerminalLine__pending = ["Hello\nWorld"]
         tl.flush()
 
         sys_stdout.write.assert_not_called()
@@ -290,9 +410,105 @@ class TestTerminalLine(unittest.TestCase):
 
         # make a terminal line and write hello world
         tl = format.TerminalLine()
-        tl._TerminalLine__cache = "Hello\nWorld"
+        tl._TerminalLine__pending = ["Hello\nWorld"]
         tl.flush()
 
         sys_stdout.write.assert_called_with("Hello\n")
         sys_stdout.flush.assert_called_with()
-        self.assertEqual(tl._TerminalLine__cache, "World")
+        self.assertEqual(tl._TerminalLine__pending, ["World"])
+
+    def test_output_no_tty(self):
+        """ Tests that output is written in complete lines when not on a
+        terminal """
+
+        fd = unittest.mock.Mock()
+        fd.isatty.return_value = False
+
+        tl = format.TerminalLine(fd)
+        tl.write('progress')
+        tl.write('Hello ')
+        tl.append('World')
+        tl.linebreak()
+        tl.append('a\nb\n')
+        tl.append('c')
+        tl.append('d\ne')
+
+        self.assertEqual(fd.write.call_args_list, [
+            unittest.mock.call('Hello World\n'),
+            unittest.mock.call('a\nb\n'),
+            unittest.mock.call('cd\n'),
+        ])
+        self.assertEqual(tl._TerminalLine__pending, ['e'])
+
+    def test_output_benchmark(self):
+        """ Tests that writing many lines takes linear time """
+
+        fd = unittest.mock.Mock()
+        fd.isatty.return_value = False
+        tl = format.TerminalLine(fd)
+
+        start = time.time()
+        tl.append('line\n' * 200000 + 'rest')
+        for _ in range(20000):
+            tl.append('x')
+        self.assertLess(time.time() - start, 1)
+
+        fd.write.assert_called_once_with('line\n' * 200000)
+
+
+class TestProgressLine(unittest.TestCase):
+    """ Tests that the ProgressLine() class works properly """
+
+    @unittest.mock.patch('time.monotonic')
+    def test_update(self, time_monotonic: unittest.mock.Mock):
+        """ Tests that progress is only rendered at a limited rate """
+
+        line = unittest.mock.Mock(isatty=True, width=40)
+        progress = format.ProgressLine(line, '[{}/{}] ', rate=20)
+
+        # the first update is drawn immediately
+        time_monotonic.return_value = 100.0
+        progress.update('a/b', 1, 0)
+        line.write.assert_called_once_with('[1/0] a/b')
+
+        # updates within the interval are not drawn
+        line.reset_mock()
+        for i in range(100):
+            time_monotonic.return_value = 100.0 + i / 10000
+            progress.update('a/c', i + 2, 1)
+        line.write.assert_not_called()
+
+        # but once it has passed they are
+        time_monotonic.return_value = 100.06
+        progress.update('a/d', 200, 2)
+        line.write.assert_called_once_with('[200/2] a/d')
+
+        # the path is shortened to the width of the line
+        line.reset_mock()
+        progress.render()
+        line.width = 20
+        progress.update('/some/very/long/path/to/a/file', 201, 2)
+        progress.render()
+        line.write.assert_called_with('[201/2] ' + format.Format.short_path(
+            '/some/very/long/path/to/a/file', 12))
+
+        # and finishing removes the progress
+        progress.finish()
+        line.clean.assert_called_once_with()
+
+    @unittest.mock.patch('time.monotonic')
+    def test_update_no_tty(self, time_monotonic: unittest.mock.Mock):
+        """ Tests that progress is not rendered when not on a terminal """
+
+        time_monotonic.return_value = 100.0
+
+        line = unittest.mock.Mock(isatty=False, width=40)
+        progress = format.ProgressLine(line, '[{}/{}] ')
+
+        progress.update('a/b', 1, 0)
+        progress.render()
+        progress.finish()
+
+        line.write.assert_not_called()
+        line.clean.assert_not_called()
+        time_monotonic.assert_not_called()
@@ -253,6 +253,55 @@ class TestRun(unittest.TestCase):
         subprocess_popen.assert_not_called()
         subprocess_popen.return_value.wait.assert_called_with(timeout=100)
 
+    @unittest.mock.patch('subprocess.Popen')
+    @unittest.mock.patch('os.getcwd', return_value='/')
+    @unittest.mock.patch('os.environ.copy', return_value={})
+    def test_finish(self, os_environ_copy: unittest.mock.Mock,
+                    os_getcwd_mock: unittest.mock.Mock,
+                    subprocess_popen: unittest.mock.Mock):
+        """ Makes sure that the finish call works properly """
+
+        subprocess_popen.return_value.communicate.return_value = \
+            (b'out\n', b'err\n')
+        subprocess_popen.return_value.returncode = 0
+
+        # the output is passed on at once
+        output = unittest.mock.Mock()
+        self.assertTrue(run.ProcessRun("echo").finish(output))
+        subprocess_popen.return_value.communicate.assert_called_with()
+        output.assert_called_once_with('out\nerr\n')
+
+        # without any output, nothing is passed on
+        output.reset_mock()
+        subprocess_popen.return_value.communicate.return_value = (None, None)
+        subprocess_popen.return_value.returncode = 1
+        self.assertFalse(run.ProcessRun("echo", pipe_stdout=True,
+                                        pipe_stderr=True).finish(output))
+        output.assert_not_called()
+
+        # and it may be ignored
+        self.assertFalse(run.ProcessRun("echo").finish())
+
+    @unittest.mock.patch('subprocess.Popen')
+    @unittest.mock.patch('os.getcwd', return_value='/')
+    @unittest.mock.patch('os.environ.copy', return_value={})
+    def test_communicate(self, os_environ_copy: unittest.mock.Mock,
+                         os_getcwd_mock: unittest.mock.Mock,
+                         subprocess_popen: unittest.mock.Mock):
+        """ Makes sure that the communicate call works properly """
+
+        subprocess_popen.return_value.communicate.return_value = \
+            (b'out\n', b'err\n')
+
+        # the output is read while the process runs
+        self.assertEqual(run.ProcessRun("echo").communicate(), b'out\n')
+        subprocess_popen.return_value.communicate.assert_called_with()
+
+        # unless it is piped to the parent
+        subprocess_popen.return_value.communicate.return_value = (None, None)
+        self.assertEqual(run.ProcessRun("echo", pipe_stdout=True)
+                         .communicate(), b'')
+
     @unittest.mock.patch('subprocess.Popen')
     @unittest.mock.patch('os.getcwd', return_value='/')
     @unittest.mock.patch('os.environ.copy', return_value={})
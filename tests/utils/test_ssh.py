@@ -0,0 +1,112 @@
+import os
+import shlex
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+
+from GitManager.utils import ssh
+
+# an ssh that records how it is called, and that creates (or, with '-O exit',
+# removes) a file in place of the socket of a shared connection
+FAKE_SSH = r"""#!/bin/sh
+echo "$@" >> "$FAKE_SSH_LOG"
+
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -o) case "$2" in ControlPath=*) control="${2#ControlPath=}";; esac
+            shift 2;;
+        -O) command="$2"; shift 2;;
+        *) host="$1"; break;;
+    esac
+done
+
+socket=$(echo "$control" | sed "s/%C/$host/")
+if [ "$command" = "exit" ]; then
+    rm "$socket"
+else
+    touch "$socket"
+fi
+"""
+
+
+class TestMultiplexer(unittest.TestCase):
+    """ Tests that the Multiplexer class works properly """
+
+    @unittest.mock.patch.dict('os.environ', {'GIT_SSH_COMMAND': 'myssh -v'})
+    def test_init(self):
+        """ Tests that the SSH command is picked properly """
+
+        self.assertEqual(ssh.Multiplexer().ssh, 'myssh -v')
+        self.assertEqual(ssh.Multiplexer('other').ssh, 'other')
+
+        with unittest.mock.patch.dict('os.environ', clear=True):
+            self.assertEqual(ssh.Multiplexer().ssh, 'ssh')
+
+    def test_environment(self):
+        """ Tests that the environment uses a shared connection """
+
+        multiplexer = ssh.Multiplexer('ssh', persist=10)
+
+        with self.assertRaises(ValueError):
+            multiplexer.environment()
+
+        with multiplexer:
+            directory = multiplexer.directory
+            self.assertTrue(os.path.isdir(directory))
+
+            env = multiplexer.environment({'HOME': '/home/user'})
+            self.assertEqual(env, {
+                'HOME': '/home/user',
+                'GIT_SSH_COMMAND': 'ssh -o ControlMaster=auto '
+                                   '-o ControlPath={} -o ControlPersist=10'
+                                   .format(os.path.join(directory, '%C'))
+            })
+
+        self.assertIsNone(multiplexer.directory)
+        self.assertFalse(os.path.exists(directory))
+
+    def test_lifecycle(self):
+        """ Tests that shared connections are closed """
+
+        with tempfile.TemporaryDirectory() as tmp:
+            fake = os.path.join(tmp, 'ssh')
+            with open(fake, 'w') as fp:
+                fp.write(FAKE_SSH)
+            os.chmod(fake, 0o755)
+
+            log = os.path.join(tmp, 'log')
+
+            # sockets are kept in a directory with a space in its name
+            sockets = os.path.join(tmp, 'with space')
+            os.mkdir(sockets)
+
+            with unittest.mock.patch.dict('os.environ',
+                                          {'FAKE_SSH_LOG': log}), \
+                    unittest.mock.patch('tempfile.tempdir', sockets):
+                with ssh.Multiplexer(fake) as multiplexer:
+                    directory = multiplexer.directory
+                    env = multiplexer.environment()
+
+                    # call ssh like git does
+                    for host in ['a.example.com', 'a.example.com',
+                                 'b.example.com']:
+                        subprocess.check_call([
+                            'sh', '-c', env['GIT_SSH_COMMAND'] + ' "$@"',
+                            env['GIT_SSH_COMMAND'], host, 'git-upload-pack',
+                            shlex.quote('user/repo')], env=env)
+
+                    self.assertEqual(sorted(os.listdir(directory)),
+                                     ['a.example.com', 'b.example.com'])
+
+            # all connections have been closed, and the directory removed
+            self.assertFalse(os.path.exists(directory))
+
+            with open(log) as fp:
+                calls = fp.read().splitlines()
+
+            self.assertEqual(len(calls), 5)
+            self.assertEqual(calls[3:], [
+                '-o ControlPath={} -O exit {}'.format(
+                    os.path.join(directory, host), host)
+                for host in ['a.example.com', 'b.example.com']])